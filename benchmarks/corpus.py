@@ -0,0 +1,158 @@
+"""
+Deterministic synthetic corpus for the benchmark suite.
+
+Generates Python/Go/JavaScript/Java source files of several sizes and unified-diff patches that modify a
+few regions of each file, so static analysis and review stages can be measured without any repository.
+"""
+import random
+from typing import Dict, List, Tuple
+
+# Approximate number of functions per generated file, by size bucket.
+SIZES = {"small": 5, "medium": 60, "large": 500}
+
+LANGUAGE_EXTENSIONS = {"python": ".py", "go": ".go", "javascript": ".js", "java": ".java"}
+
+
+def _python_function(index: int, rng: random.Random) -> List[str]:
+    return [
+        f"def compute_{index}(values, threshold={rng.randint(1, 99)}):",
+        f'    """Aggregates values above threshold (variant {index})."""',
+        "    total = 0",
+        "    for value in values:",
+        "        if value > threshold:",
+        f"            total += value * {rng.randint(2, 9)}",
+        "        elif value < 0:",
+        "            continue",
+        "    return total",
+        "",
+    ]
+
+
+def _go_function(index: int, rng: random.Random) -> List[str]:
+    return [
+        f"func Compute{index}(values []int, threshold int) int {{",
+        "\ttotal := 0",
+        "\tfor _, value := range values {",
+        "\t\tif value > threshold {",
+        f"\t\t\ttotal += value * {rng.randint(2, 9)}",
+        "\t\t} else if value < 0 {",
+        "\t\t\tcontinue",
+        "\t\t}",
+        "\t}",
+        "\treturn total",
+        "}",
+        "",
+    ]
+
+
+def _javascript_function(index: int, rng: random.Random) -> List[str]:
+    return [
+        f"function compute{index}(values, threshold = {rng.randint(1, 99)}) {{",
+        "  let total = 0;",
+        "  for (const value of values) {",
+        "    if (value > threshold) {",
+        f"      total += value * {rng.randint(2, 9)};",
+        "    } else if (value < 0) {",
+        "      continue;",
+        "    }",
+        "  }",
+        "  return total;",
+        "}",
+        "",
+    ]
+
+
+def _java_method(index: int, rng: random.Random) -> List[str]:
+    return [
+        f"    public int compute{index}(int[] values, int threshold) {{",
+        "        int total = 0;",
+        "        for (int value : values) {",
+        "            if (value > threshold) {",
+        f"                total += value * {rng.randint(2, 9)};",
+        "            } else if (value < 0) {",
+        "                continue;",
+        "            }",
+        "        }",
+        "        return total;",
+        "    }",
+        "",
+    ]
+
+
+def generate_source(language: str, function_count: int, seed: int = 0) -> str:
+    """
+    Returns a syntactically valid source file with `function_count` functions.
+    """
+    rng = random.Random(f"{language}-{function_count}-{seed}")
+    if language == "python":
+        lines = ["import os", "import json", ""]
+        for index in range(function_count):
+            lines.extend(_python_function(index, rng))
+    elif language == "go":
+        lines = ["package bench", "", 'import "fmt"', ""]
+        for index in range(function_count):
+            lines.extend(_go_function(index, rng))
+        lines.append('func unused() { fmt.Println("bench") }')
+    elif language == "javascript":
+        lines = ["import fs from 'fs';", ""]
+        for index in range(function_count):
+            lines.extend(_javascript_function(index, rng))
+    elif language == "java":
+        lines = ["import java.util.List;", "", "public class Bench {"]
+        for index in range(function_count):
+            lines.extend(_java_method(index, rng))
+        lines.append("}")
+    else:
+        raise ValueError(f"Unsupported benchmark language: {language}")
+    return "\n".join(lines) + "\n"
+
+
+def generate_patch(filename: str, content: str, hunk_count: int = 3, hunk_size: int = 2, seed: int = 0) -> Tuple[str, str]:
+    """
+    Builds a unified diff that replaces `hunk_size` lines in `hunk_count` evenly spread places.
+
+    Returns:
+        Tuple[str, str]: (patch text as served by the GitHub API, new file content).
+    """
+    rng = random.Random(f"{filename}-{seed}")
+    old_lines = content.splitlines()
+    new_lines = list(old_lines)
+    patch_lines = []
+    step = max(len(old_lines) // (hunk_count + 1), hunk_size + 7)
+    for hunk in range(hunk_count):
+        start = min(step * (hunk + 1), max(len(old_lines) - hunk_size - 3, 3))
+        context_before = old_lines[start - 3:start]
+        removed = old_lines[start:start + hunk_size]
+        added = [f"{line}  # edited {rng.randint(0, 9999)}" if filename.endswith(".py") else f"{line} // edited {rng.randint(0, 9999)}" for line in removed]
+        context_after = old_lines[start + hunk_size:start + hunk_size + 3]
+        old_count = len(context_before) + len(removed) + len(context_after)
+        new_count = len(context_before) + len(added) + len(context_after)
+        patch_lines.append(f"@@ -{start - 2},{old_count} +{start - 2},{new_count} @@")
+        patch_lines.extend(f" {line}" for line in context_before)
+        patch_lines.extend(f"-{line}" for line in removed)
+        patch_lines.extend(f"+{line}" for line in added)
+        patch_lines.extend(f" {line}" for line in context_after)
+        new_lines[start:start + hunk_size] = added
+    return "\n".join(patch_lines), "\n".join(new_lines) + "\n"
+
+
+def build_corpus(seed: int = 0) -> List[Dict[str, str]]:
+    """
+    Returns one entry per (language, size) with `filename`, `language`, `size`, `content`, `patch` and `new_content`.
+    """
+    corpus = []
+    for language, ext in LANGUAGE_EXTENSIONS.items():
+        for size, function_count in SIZES.items():
+            filename = f"src/{size}/bench_{language}{ext}"
+            content = generate_source(language, function_count, seed)
+            patch, new_content = generate_patch(filename, content, seed=seed)
+            corpus.append({
+                "filename": filename,
+                "language": language,
+                "ext": ext,
+                "size": size,
+                "content": content,
+                "patch": patch,
+                "new_content": new_content,
+            })
+    return corpus
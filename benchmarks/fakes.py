@@ -0,0 +1,131 @@
+"""
+Offline stand-ins for the GitHub and Gemini backends used by the benchmark suite.
+
+The fakes mimic only the attributes the review pipeline touches (PyGithub file/pull request/repository
+objects and Gemini `generate_content` responses) and add a fixed, configurable latency so end-to-end
+numbers stay stable between runs without any network access.
+"""
+import json
+import re
+import time
+from contextlib import contextmanager
+from types import SimpleNamespace
+from typing import Any, Dict, List, Optional
+
+from github.GithubException import GithubException
+
+
+class FakeGithubFile:
+    """
+    Mimics a PyGithub `File` from `pull_request.get_files()`.
+    """
+
+    def __init__(self, filename: str, patch: str, content: str, fetch_latency: float = 0.0):
+        self.filename = filename
+        self.patch = patch
+        self.additions = sum(1 for line in patch.splitlines() if line.startswith("+"))
+        self.deletions = sum(1 for line in patch.splitlines() if line.startswith("-"))
+        self.changes = self.additions + self.deletions
+        self.status = "modified"
+        self._content = content.encode("utf-8")
+        self._fetch_latency = fetch_latency
+
+    @property
+    def decoded_content(self) -> bytes:
+        if self._fetch_latency:
+            time.sleep(self._fetch_latency)
+        return self._content
+
+
+class FakePullRequest:
+    """
+    Mimics a PyGithub `PullRequest`; records posted reviews instead of calling the API.
+    """
+
+    def __init__(self, number: int = 1, files: Optional[List[FakeGithubFile]] = None, post_latency: float = 0.0):
+        self.number = number
+        self.files = files or []
+        self.reviews: List[Dict[str, Any]] = []
+        self._post_latency = post_latency
+
+    def get_files(self) -> List[FakeGithubFile]:
+        return self.files
+
+    def create_review(self, body: str, event: str, comments: List[Dict[str, Any]]):
+        if self._post_latency:
+            time.sleep(self._post_latency)
+        self.reviews.append({"body": body, "event": event, "comments": comments})
+        return SimpleNamespace(id=len(self.reviews))
+
+
+class FakeRepository:
+    """
+    Mimics a PyGithub `Repository` that has no dependency manifests.
+    """
+
+    def __init__(self, full_name: str = "bench/repo", pull_request: Optional[FakePullRequest] = None):
+        self.full_name = full_name
+        self.pull_request = pull_request or FakePullRequest()
+
+    def get_pull(self, number: int) -> FakePullRequest:
+        return self.pull_request
+
+    def get_contents(self, path: str, ref: Optional[str] = None):
+        raise GithubException(404, {"message": "Not Found"}, None)
+
+
+class FakeGeminiModel:
+    """
+    Mimics `genai.GenerativeModel`. Returns a few review comments anchored on `+` lines of the patches found
+    in the prompt, honouring the single-file and batched (`path`) response schemas.
+    """
+
+    def __init__(self, latency: float = 0.0, comments_per_file: int = 2):
+        self.latency = latency
+        self.comments_per_file = comments_per_file
+        self.calls = 0
+
+    def _respond(self, contents: List[Dict[str, Any]], generation_config: Dict[str, Any]):
+        self.calls += 1
+        if self.latency:
+            time.sleep(self.latency)
+        prompt = contents[0]["parts"][0]["text"]
+        batched = "path" in json.dumps(generation_config.get("response_schema", {}))
+        sections = re.split(r"### File: (\S+)", prompt) if batched else [None, None, prompt]
+        comments = []
+        for path, section in zip(sections[1::2], sections[2::2]):
+            added_lines = [line.strip()[1:] for line in section.splitlines() if line.strip().startswith("+") and not line.strip().startswith("+++")]
+            for line in added_lines[:self.comments_per_file]:
+                comment = {"body": "Performance: benchmark comment.", "line": line, "severity": "Low", "rationale": "Synthetic."}
+                if batched:
+                    comment["path"] = path
+                comments.append(comment)
+        text = json.dumps(comments)
+        return SimpleNamespace(
+            candidates=[SimpleNamespace(content=SimpleNamespace(parts=[SimpleNamespace(text=text)]))],
+            usage_metadata=SimpleNamespace(prompt_token_count=len(prompt) // 4, candidates_token_count=len(text) // 4),
+        )
+
+    def generate_content(self, contents, generation_config=None, **kwargs):
+        return self._respond(contents, generation_config or {})
+
+    async def generate_content_async(self, contents, generation_config=None, **kwargs):
+        return self._respond(contents, generation_config or {})
+
+
+@contextmanager
+def fake_backends(gemini_model: FakeGeminiModel, repository: FakeRepository):
+    """
+    Routes the pull request model's GitHub and Gemini clients to the given fakes for the duration of the block.
+    """
+    import github_access.models.pull_request as pull_request_module
+
+    original_gemini = pull_request_module.get_gemini_model
+    original_github = pull_request_module.get_github_client
+    pull_request_module.get_gemini_model = lambda model_name="gemini-1.5-flash": gemini_model
+    pull_request_module.get_github_client = lambda: SimpleNamespace(get_repo=lambda full_name: repository)
+    try:
+        yield
+    finally:
+        pull_request_module.get_gemini_model = original_gemini
+        pull_request_module.get_github_client = original_github
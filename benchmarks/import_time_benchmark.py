@@ -0,0 +1,74 @@
+"""
+Import-time benchmark for the application entry points.
+
+Imports each module in a fresh interpreter with `-X importtime`, repeats the measurement, and reports the
+median wall-clock time plus the slowest imported packages as JSON. Pass `--max-ms` to exit non-zero when
+the median import time of any module regresses past a threshold.
+
+Usage:
+    python benchmarks/import_time_benchmark.py --runs 5 --max-ms 1500
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_MODULES = ["main", "github_access.models.pull_request", "github_access.utils.static_analyzer"]
+
+
+def _parse_importtime(stderr: str) -> dict:
+    """
+    Parses `-X importtime` output into the largest cumulative microseconds seen per top-level package.
+    """
+    cumulative = {}
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative_us, name = line.split("|", 2)
+        if not name.strip():
+            continue
+        package = name.strip().split(".")[0]
+        cumulative[package] = max(cumulative.get(package, 0), int(cumulative_us))
+    return cumulative
+
+
+def measure(module: str, runs: int) -> dict:
+    wall_ms = []
+    packages = {}
+    for _ in range(runs):
+        start = time.perf_counter()
+        result = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+            cwd=REPO_ROOT, capture_output=True, text=True, check=False,
+        )
+        wall_ms.append((time.perf_counter() - start) * 1000)
+        if result.returncode != 0:
+            return {"error": result.stderr.strip().splitlines()[-1] if result.stderr else "import failed"}
+        packages = _parse_importtime(result.stderr)
+    slowest = sorted(packages.items(), key=lambda item: item[1], reverse=True)[:10]
+    return {
+        "median_ms": round(statistics.median(wall_ms), 1),
+        "min_ms": round(min(wall_ms), 1),
+        "slowest_packages_ms": {name: round(us / 1000, 1) for name, us in slowest},
+    }
+
+
+if __name__ == "__main__":
+    arg_parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    arg_parser.add_argument("modules", nargs="*", default=DEFAULT_MODULES, help="Modules to import.")
+    arg_parser.add_argument("--runs", type=int, default=5, help="Fresh interpreters per module.")
+    arg_parser.add_argument("--max-ms", type=float, default=None, help="Fail if any median import time exceeds this.")
+    args = arg_parser.parse_args()
+
+    report = {module: measure(module, args.runs) for module in args.modules}
+    print(json.dumps(report, indent=2))
+
+    if args.max_ms is not None:
+        regressions = [m for m, r in report.items() if "error" in r or r["median_ms"] > args.max_ms]
+        if regressions:
+            print(f"Import time regression (> {args.max_ms} ms or failed): {', '.join(regressions)}", file=sys.stderr)
+            sys.exit(1)
@@ -0,0 +1,176 @@
+"""
+Reproducible benchmark suite for static analysis and the PR review pipeline.
+
+Runs entirely offline against a generated corpus (see corpus.py) and fake GitHub/Gemini backends
+(see fakes.py). Reports per-stage throughput, latency percentiles and peak RSS as JSON that can be
+diffed between commits.
+
+Usage:
+    python benchmarks/run_benchmarks.py --iterations 5 --output bench.json
+    python benchmarks/run_benchmarks.py --compare before.json after.json
+"""
+import argparse
+import json
+import os
+import platform
+import resource
+import shutil
+import statistics
+import subprocess
+import sys
+import time
+from typing import Any, Callable, Dict, List
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from corpus import build_corpus
+from fakes import FakeGeminiModel, FakeGithubFile, FakePullRequest, FakeRepository, fake_backends
+
+from github_access.utils.diff_checker import find_line_info, get_changed_line_ranges
+from github_access.utils.static_analyzer import perform_static_analysis
+
+LINTERS = ["pylint", "bandit", "eslint", "checkstyle", "reuse"]
+
+
+def _percentile(samples: List[float], percentile: float) -> float:
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, max(0, int(round(percentile / 100 * len(ordered))) - 1))
+    return ordered[index]
+
+
+def _peak_rss_mb() -> float:
+    # ru_maxrss is reported in kilobytes on Linux and bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return round(peak / (1024 * 1024) if platform.system() == "Darwin" else peak / 1024, 1)
+
+
+def measure(iterations: int, operation: Callable[[], Any], work_bytes: int = 0) -> Dict[str, float]:
+    """
+    Runs `operation` once to warm up, then `iterations` times, and summarizes the latencies.
+    """
+    operation()
+    latencies = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        operation()
+        latencies.append(time.perf_counter() - start)
+    total = sum(latencies)
+    stats = {
+        "iterations": iterations,
+        "p50_ms": round(_percentile(latencies, 50) * 1000, 3),
+        "p90_ms": round(_percentile(latencies, 90) * 1000, 3),
+        "p99_ms": round(_percentile(latencies, 99) * 1000, 3),
+        "mean_ms": round(statistics.mean(latencies) * 1000, 3),
+        "ops_per_second": round(iterations / total, 2) if total else None,
+    }
+    if work_bytes:
+        stats["mb_per_second"] = round(work_bytes * iterations / total / (1024 * 1024), 3) if total else None
+    return stats
+
+
+def bench_static_analysis(corpus: List[Dict[str, str]], iterations: int) -> Dict[str, Any]:
+    results = {}
+    for entry in corpus:
+        key = f"{entry['language']}/{entry['size']}"
+        changed_ranges = get_changed_line_ranges(entry["patch"])
+        results[key] = {
+            "lines": entry["new_content"].count("\n"),
+            "full_file": measure(iterations, lambda: perform_static_analysis(entry["new_content"], entry["ext"]), len(entry["new_content"])),
+            "diff_scoped": measure(iterations, lambda: perform_static_analysis(entry["new_content"], entry["ext"], changed_ranges=changed_ranges), len(entry["new_content"])),
+        }
+    return results
+
+
+def bench_find_line_info(corpus: List[Dict[str, str]], iterations: int) -> Dict[str, Any]:
+    results = {}
+    for entry in corpus:
+        targets = [line[1:] for line in entry["patch"].splitlines() if line.startswith("+")]
+        results[f"{entry['language']}/{entry['size']}"] = measure(
+            iterations, lambda: [find_line_info(entry["patch"], target) for target in targets], len(entry["patch"]) * len(targets)
+        )
+    return results
+
+
+def bench_review_pipeline(corpus: List[Dict[str, str]], iterations: int, gemini_latency: float, github_latency: float) -> Dict[str, Any]:
+    from github_access.models.pull_request import PullRequest
+
+    files = [FakeGithubFile(entry["filename"], entry["patch"], entry["new_content"], fetch_latency=github_latency) for entry in corpus]
+    results = {}
+    for label, pr_files in (("small_files_only", [f for f in files if "/small/" in f.filename]), ("all_files", files)):
+        gemini_model = FakeGeminiModel(latency=gemini_latency)
+        pull_request = FakePullRequest(files=pr_files, post_latency=github_latency)
+        repository = FakeRepository(pull_request=pull_request)
+        pr_model = PullRequest(id=1, number=1, repository={"full_name": repository.full_name})
+        with fake_backends(gemini_model, repository):
+            stats = measure(iterations, lambda: pr_model.create_and_post_review(pr_files, pull_request, {}, static_analysis_enabled=True))
+        stats["files"] = len(pr_files)
+        stats["gemini_calls_per_review"] = round(gemini_model.calls / (iterations + 1), 2)
+        stats["comments_per_review"] = len(pull_request.reviews[-1]["comments"]) if pull_request.reviews else 0
+        results[label] = stats
+    return results
+
+
+def _git_revision() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip()
+    except Exception:
+        return "unknown"
+
+
+def run(iterations: int, gemini_latency: float, github_latency: float, stages: List[str]) -> Dict[str, Any]:
+    corpus = build_corpus()
+    report: Dict[str, Any] = {
+        "revision": _git_revision(),
+        "python": platform.python_version(),
+        "linters_available": {tool: shutil.which(tool) is not None for tool in LINTERS},
+        "stages": {},
+    }
+    if "static_analysis" in stages:
+        report["stages"]["static_analysis"] = bench_static_analysis(corpus, iterations)
+    if "find_line_info" in stages:
+        report["stages"]["find_line_info"] = bench_find_line_info(corpus, iterations)
+    if "review_pipeline" in stages:
+        report["stages"]["review_pipeline"] = bench_review_pipeline(corpus, iterations, gemini_latency, github_latency)
+    report["peak_rss_mb"] = _peak_rss_mb()
+    return report
+
+
+def compare(before: Dict[str, Any], after: Dict[str, Any], path: str = "") -> List[str]:
+    """
+    Lists p50 changes between two reports, e.g. `static_analysis.python/large.full_file: 120.0 -> 80.0 ms (0.67x)`.
+    """
+    lines = []
+    for key, value in after.items():
+        child_path = f"{path}.{key}" if path else key
+        if isinstance(value, dict) and "p50_ms" in value and isinstance(before.get(key), dict) and "p50_ms" in before[key]:
+            old, new = before[key]["p50_ms"], value["p50_ms"]
+            ratio = f"{new / old:.2f}x" if old else "n/a"
+            lines.append(f"{child_path}: {old} -> {new} ms ({ratio})")
+        elif isinstance(value, dict) and isinstance(before.get(key), dict):
+            lines.extend(compare(before[key], value, child_path))
+    return lines
+
+
+if __name__ == "__main__":
+    arg_parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    arg_parser.add_argument("--iterations", type=int, default=5, help="Measured iterations per case.")
+    arg_parser.add_argument("--stages", nargs="*", default=["static_analysis", "find_line_info", "review_pipeline"])
+    arg_parser.add_argument("--gemini-latency", type=float, default=0.0, help="Simulated seconds per Gemini call.")
+    arg_parser.add_argument("--github-latency", type=float, default=0.0, help="Simulated seconds per GitHub call.")
+    arg_parser.add_argument("--output", help="Write the JSON report to this file instead of stdout.")
+    arg_parser.add_argument("--compare", nargs=2, metavar=("BEFORE", "AFTER"), help="Compare two saved reports.")
+    args = arg_parser.parse_args()
+
+    if args.compare:
+        with open(args.compare[0]) as before_file, open(args.compare[1]) as after_file:
+            print("\n".join(compare(json.load(before_file)["stages"], json.load(after_file)["stages"])))
+        sys.exit(0)
+
+    report = run(args.iterations, args.gemini_latency, args.github_latency, args.stages)
+    if args.output:
+        with open(args.output, "w") as output_file:
+            json.dump(report, output_file, indent=2)
+    else:
+        print(json.dumps(report, indent=2))
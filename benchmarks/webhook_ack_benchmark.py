@@ -0,0 +1,93 @@
+"""
+Load-test benchmark for the `/webhook` acknowledgement path.
+
+Sends signed webhook deliveries for events the service does not act on (pushes, closed/labeled pull
+requests, pings, duplicate redeliveries) and reports p50/p99 ack latency per scenario as JSON.
+
+Usage:
+    python benchmarks/webhook_ack_benchmark.py --requests 2000
+"""
+import argparse
+import hashlib
+import hmac
+import json
+import os
+import statistics
+import sys
+import time
+import uuid
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from config import get_settings
+from github_access.routers.webhook import router
+
+
+def _pull_request_payload(action: str) -> bytes:
+    files = [{"filename": f"src/module_{i}.py", "additions": i, "deletions": 0} for i in range(200)]
+    return json.dumps({
+        "action": action,
+        "number": 42,
+        "pull_request": {"id": 1, "number": 42, "head": {"sha": "0" * 40}, "body": "x" * 20000, "files": files},
+        "repository": {"full_name": "octo/bench"},
+    }).encode("utf-8")
+
+
+def _percentile(samples, percentile: float) -> float:
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, max(0, int(round(percentile / 100 * len(ordered))) - 1))
+    return ordered[index]
+
+
+def run(requests_per_scenario: int) -> dict:
+    app = FastAPI()
+    app.include_router(router)
+    client = TestClient(app)
+    secret = get_settings().WEBHOOK_SECRET.encode("utf-8")
+    duplicate_id = str(uuid.uuid4())
+
+    scenarios = {
+        "ping": ("ping", b'{"zen": "Design for failure."}', None),
+        "push": ("push", json.dumps({"ref": "refs/heads/main", "commits": [{"id": "0" * 40}] * 100}).encode("utf-8"), None),
+        "pull_request.closed": ("pull_request", _pull_request_payload("closed"), None),
+        "pull_request.labeled": ("pull_request", _pull_request_payload("labeled"), None),
+        "pull_request.duplicate_delivery": ("pull_request", _pull_request_payload("opened"), duplicate_id),
+    }
+
+    # Mark the duplicate delivery as already accepted so only the drop path is measured
+    from github_access.utils.webhook import get_delivery_deduplicator
+    get_delivery_deduplicator().check_and_mark(duplicate_id)
+
+    report = {"requests_per_scenario": requests_per_scenario, "scenarios": {}}
+    for name, (event, body, delivery_id) in scenarios.items():
+        signature = "sha256=" + hmac.new(secret, body, hashlib.sha256).hexdigest()
+        latencies_ms = []
+        for _ in range(requests_per_scenario):
+            headers = {
+                "X-GitHub-Event": event,
+                "X-Hub-Signature-256": signature,
+                "X-GitHub-Delivery": delivery_id or str(uuid.uuid4()),
+                "Content-Type": "application/json",
+            }
+            start = time.perf_counter()
+            response = client.post("/webhook", content=body, headers=headers)
+            latencies_ms.append((time.perf_counter() - start) * 1000)
+            if response.status_code != 200:
+                raise RuntimeError(f"Scenario {name} failed with {response.status_code}: {response.text}")
+        report["scenarios"][name] = {
+            "p50_ms": round(_percentile(latencies_ms, 50), 3),
+            "p99_ms": round(_percentile(latencies_ms, 99), 3),
+            "mean_ms": round(statistics.mean(latencies_ms), 3),
+            "body_bytes": len(body),
+        }
+    return report
+
+
+if __name__ == "__main__":
+    arg_parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    arg_parser.add_argument("--requests", type=int, default=1000, help="Requests sent per scenario.")
+    args = arg_parser.parse_args()
+    print(json.dumps(run(args.requests), indent=2))
@@ -3,12 +3,16 @@ from pydantic_settings import BaseSettings, SettingsConfigDict
 from functools import lru_cache
 import os
 from pydantic import BaseModel
-from typing import Dict, Any,List,Optional
+from typing import Dict, Any,List,Literal,Optional
 from github_access.utils.static_analyzer import FunctionSignature, ClassHierarchy 
 
 class CodeAnalysisRequest(BaseModel):
     filename: str  
     code_content: str
+    facets: Optional[List[str]] = None  # Analysis facets to compute (ast, complexity, halstead, linters, context, license); all if omitted
+
+class StaticAnalysisBatchRequest(BaseModel):
+    files: List[CodeAnalysisRequest]
 
 class Settings(BaseSettings):
     GITHUB_APP_ID: str
@@ -16,6 +20,83 @@ class Settings(BaseSettings):
     WEBHOOK_SECRET: str
     GEMINI_API_KEY: str
     REVIEW_LIMIT: int = 50
+    REVIEW_COMMENT_CHUNK_SIZE: int = 30 # Comments per create_review call; larger reviews are split into several
+    REVIEW_POST_MAX_ATTEMPTS: int = 5  # Attempts per chunk when GitHub answers with a secondary rate limit
+    REVIEW_WORKERS: int = 4            # Webhook-triggered reviews running at the same time
+    REVIEW_REPO_MAX_CONCURRENCY: int = 2 # Reviews of one repository running at the same time
+    REVIEW_REPO_WEIGHTS: Dict[str, float] = {} # Fair-queuing weight per repository full name (JSON; default 1)
+    REVIEW_FILE_COST: int = 50         # Cost of one changed file, in changed lines, when ordering reviews by size
+    REVIEW_QUEUE_AGING_SECONDS: float = 600.0 # A queued review's cost halves after waiting this long (0 disables aging)
+    REVIEW_MAX_FILE_BYTES: int = 524288 # Larger changed files are skipped before analysis
+    REVIEW_MINIFIED_LINE_LENGTH: int = 1000 # Files with lines this long (and long lines on average) are treated as minified
+    REVIEW_SKIP_PATH_PATTERNS: List[str] = [] # Extra .gitattributes-style path patterns skipped as vendored (JSON list)
+    DIFF_SCOPED_ANALYSIS: bool = True  # Analyze only the functions/classes touched by a PR patch
+    DIFF_CONTEXT_RADIUS: int = 3       # Lines around each hunk for which linter issues are kept
+    BATCH_REVIEW_ENABLED: bool = True  # Pack small file patches into shared Gemini requests
+    BATCH_TOKEN_BUDGET: int = 8000     # Estimated file-specific tokens per batched request
+    BATCH_SMALL_FILE_TOKENS: int = 1500 # Files whose prompt section is estimated above this are reviewed on their own
+    REVIEW_MODEL: str = "gemini-1.5-flash"       # Model for standard and batched reviews (and the triage call)
+    REVIEW_PROMPT: str = "standard"              # Registered prompt builder for standard single-file reviews
+    REVIEW_CASCADE_ENABLED: bool = False         # Score every file's risk first and escalate the riskiest to REVIEW_ESCALATION_MODEL
+    REVIEW_TRIAGE_MODEL_ENABLED: bool = False    # Add a short REVIEW_MODEL risk rating of each patch to the local risk score
+    REVIEW_TRIAGE_PATCH_TOKENS: int = 400        # Patch tokens per file sent to the triage call
+    REVIEW_ESCALATION_MODEL: str = "gemini-1.5-pro"
+    REVIEW_ESCALATION_PROMPT: str = "full_context" # Registered prompt builder for escalated files
+    REVIEW_ESCALATION_MIN_RISK: float = 8.0      # Files scoring below this are never escalated
+    REVIEW_ESCALATION_TOKEN_BUDGET: int = 60000  # Estimated patch and file tokens shared by the escalated files of one review
+    REVIEW_ESCALATION_FILE_TOKENS: int = 16000   # Full file content in an escalated prompt is cut to this estimate
+    PR_SNAPSHOT_ENABLED: bool = True             # Load a PR's files, manifests and .gitattributes with batched GraphQL blob queries
+    COMMIT_BLOB_CONCURRENCY: int = 8             # Blobs created in parallel by /submit-github-files
+    COMMIT_MAX_ATTEMPTS: int = 5                 # Tree/commit rebuilds when the branch moves during a commit
+    GIT_MIRROR_ENABLED: bool = False             # Compute PR diffs and file contents from local bare mirrors
+    GIT_MIRROR_ROOT: str = "git_mirrors"         # Directory of the bare mirrors (owner/name.git)
+    GIT_MIRROR_MAX_BYTES: int = 5368709120       # Least recently used mirrors are deleted above this total size
+    GIT_MIRROR_REMOTE_URL: str = "https://github.com/{repo}.git" # Fetch URL; {repo} is the repository's full name
+    GIT_MIRROR_TIMEOUT_SECONDS: float = 600.0    # Limit of each git command, including the first full fetch
+    GITHUB_HTTP_CACHE_ENABLED: bool = True       # Revalidate cached GitHub GET responses with ETag/Last-Modified (304s are not rate limited)
+    GITHUB_HTTP_CACHE_BACKEND: Literal["memory", "sqlite", "redis"] = "memory"
+    GITHUB_HTTP_CACHE_MAX_BYTES: int = 67108864  # Size of cached response bodies kept in memory or SQLite
+    GITHUB_HTTP_CACHE_PATH: str = "github_http_cache.sqlite3" # Database of the sqlite backend
+    GITHUB_HTTP_CACHE_TTL_SECONDS: int = 604800  # Expiry of cached responses in Redis
+    GITHUB_RATE_LIMIT_PACING: bool = True        # Track X-RateLimit-* per token and pace background GitHub requests
+    GITHUB_RATE_LIMIT_INTERACTIVE_RESERVE: float = 0.1 # Fraction of the hourly budget background requests leave to interactive ones
+    GITHUB_RATE_LIMIT_MAX_INTERACTIVE_WAIT_SECONDS: float = 60.0 # Longest an interactive request waits for an exhausted budget
+    REDIS_URL: Optional[str] = None    # Shared store for webhook delivery deduplication (in-memory LRU if unset)
+    WEBHOOK_DEDUPE_SIZE: int = 10000   # Number of recent X-GitHub-Delivery IDs remembered in memory
+    WEBHOOK_DEDUPE_TTL_SECONDS: int = 86400
+    WARM_CLIENTS_ON_STARTUP: bool = False # Create GitHub/Gemini clients and grammars at startup instead of first use
+    PROFILING_ENABLED: bool = False    # Allow X-Profile/sampled request profiling and the /debug/profiles endpoints
+    PROFILING_SAMPLE_RATE: float = 0.0 # Fraction of requests profiled without an X-Profile header
+    PROFILE_DIR: str = "profiles"      # Where .prof/.json profiles are saved
+    PROFILE_MAX_FILES: int = 200       # Oldest profiles beyond this count are deleted
+    STATIC_BATCH_CONCURRENCY: int = 4  # Files analyzed in parallel per /static-analyze-batch request
+    STATIC_BATCH_MAX_FILES: int = 1000 # Maximum files per batch request or archive
+    STATIC_BATCH_MAX_FILE_BYTES: int = 1048576   # Larger files (archive members or JSON entries) are skipped
+    STATIC_BATCH_MAX_BYTES: int = 52428800       # Maximum request body / total source size per batch
+    ANALYSIS_CACHE_MAX_BYTES: int = 67108864     # In-memory cache of encoded analysis results (0 disables caching)
+    ANALYSIS_CACHE_TTL_SECONDS: int = 3600       # Expiry of cached results when REDIS_URL is set
+    LINTER_TIMEOUT_SECONDS: float = 60.0         # Wall-clock limit per linter run; the process group is killed after it
+    LINTER_MEMORY_LIMIT_MB: int = 1024           # RLIMIT_AS (RLIMIT_DATA for ESLint/Checkstyle) per linter; 0 disables
+    LINTER_CPU_LIMIT_SECONDS: int = 60           # RLIMIT_CPU per linter; 0 disables
+    LINTER_MAX_OUTPUT_BYTES: int = 10485760      # Combined stdout/stderr cap per linter run
+    SCRATCH_DIR: Optional[str] = None            # Where linters needing a real file get one (/dev/shm if writable, else the temp dir)
+    SCRATCH_MAX_AGE_SECONDS: int = 3600          # Scratch directories older than this are removed as leaked at startup
+    SYMBOL_INDEX_ENABLED: bool = False           # Index each reviewed commit and add cross-file symbol context to review prompts
+    SYMBOL_INDEX_PATH: str = "symbol_index.sqlite3" # SQLite database holding the symbol index
+    SYMBOL_INDEX_MAX_SNAPSHOTS: int = 20         # Indexed commits kept per repository; blobs no kept commit uses are deleted
+    SYMBOL_INDEX_MAX_FILE_BYTES: int = 1048576   # Larger files are left out of the index
+    SYMBOL_INDEX_MAX_FILES: int = 20000          # Indexed files per commit
+    INDEX_FETCH_CONCURRENCY: int = 8             # Blobs fetched from GitHub in parallel by the symbol and retrieval indexes
+    SYMBOL_CONTEXT_MAX_ENTRIES: int = 20         # Referenced signatures (and call sites) added per reviewed file
+    RETRIEVAL_INDEX_ENABLED: bool = False        # Keep a local BM25/trigram index of each repository and add related snippets to reviews
+    RETRIEVAL_INDEX_DIR: str = "retrieval_index" # One SQLite database per repository
+    RETRIEVAL_INDEX_MMAP_BYTES: int = 268435456  # Memory-mapped size of each index database, shared by workers through the page cache
+    RETRIEVAL_INDEX_MAX_OPEN: int = 32           # Index databases kept open per process; the least recently used is closed
+    RETRIEVAL_INDEX_MAX_FILE_BYTES: int = 262144 # Larger files are left out of the retrieval index
+    RETRIEVAL_INDEX_MAX_FILES: int = 20000       # Indexed files per repository
+    RETRIEVAL_CHUNK_LINES: int = 40              # Lines per indexed snippet (neighbouring snippets overlap by a quarter)
+    RETRIEVAL_TOP_K: int = 5                     # Snippets retrieved per hunk
+    RETRIEVAL_TOKEN_BUDGET: int = 1500           # Estimated tokens of retrieved snippets per reviewed file
 
     model_config = SettingsConfigDict(env_file=".env")
 
@@ -38,6 +119,16 @@ class CodeSubmission(BaseModel):
     commit_message: str # Commit message for the new file
     branch: str = "main" # Target branch (default: main)
 
+class SubmittedFile(BaseModel):
+    filename: str       # e.g., "src/main.py"
+    file_content: str   # The code content
+
+class MultiFileCodeSubmission(BaseModel):
+    repo_full_name: str  # e.g., "owner/repo"
+    files: List[SubmittedFile]
+    commit_message: str # Message of the single commit holding all files
+    branch: str = "main" # Target branch (default: main)
+
 class CodeContextResult(BaseModel):
     filename: str
     language: str
@@ -1,14 +1,26 @@
 from pydantic import BaseModel
-from typing import Dict, Any, List, Optional
-from github import Auth, GithubIntegration
+from typing import Callable, Dict, Any, List, Optional, Tuple
 from github.GithubException import GithubException
 from config import get_settings
-import google.generativeai as genai
-from github_access.utils.diff_checker import find_line_info
-from github_access.utils.static_analyzer import perform_static_analysis, StaticAnalysisResult 
+from github_access.utils.clients import get_github_client, get_gemini_model
+from github_access.utils.diff_checker import find_line_info, get_changed_line_ranges
+from github_access.utils.static_analyzer import StaticAnalysisResult 
+from github_access.utils.analysis_cache import cached_static_analysis
+from github_access.utils.review_batcher import estimate_tokens, pack_review_batches, truncate_to_tokens
+from github_access.utils.language_registry import get_language_name, supported_extensions
+from github_access.utils.metrics import observe, timed, increment, record_gemini_usage
+from github_access.utils.review_poster import ReviewPoster, validate_review_comments
+from github_access.utils.symbol_index import get_symbol_index, index_commit, build_symbol_context
+from github_access.utils.retrieval_index import get_retrieval_index, refresh_repository_index, retrieve_related_snippets, format_related_snippets
+from github_access.utils.file_classifier import FileClassifier, decode_source, format_skipped_summary
+from github_access.utils.review_triage import assess_file_risk, select_escalations
+from github_access.utils.pr_snapshot import MANIFEST_PATHS, files_with_content, load_pull_request_snapshot
+from github_access.utils.git_mirror import get_git_mirror_cache, snapshot_from_mirror
+from github_access.utils.github_commit import commit_files
 import logging
 import json
 import os
+import time
 import subprocess
 import re 
 import xml.etree.ElementTree as ET
@@ -20,25 +32,137 @@ from fastapi import HTTPException
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-# Configure Gemini API
-genai.configure(api_key=get_settings().GEMINI_API_KEY)
-
-supported_languages_ext = {".py", ".go", ".js", ".java", ".ts"} 
-
-try:
-    auth = Auth.AppAuth(get_settings().GITHUB_APP_ID, get_settings().get_private_key())
-    gi = GithubIntegration(auth=auth)
-    installations = gi.get_installations()
-    if not installations:
-        logger.error("No installations found for GitHub App ID: %s", get_settings().GITHUB_APP_ID)
-        raise Exception("No installations found for the GitHub App. Please ensure the app is installed on a repository.")
-    
-    installation = installations[0]
-    g = installation.get_github_for_installation()
-    logger.info("GitHub App authenticated successfully.")
-except Exception as e:
-    logger.error(f"GitHub authentication failed: {str(e)} at {datetime.now().strftime('%I:%M %p IST on %B %d, %Y')}", exc_info=True)
-    raise
+supported_languages_ext = set(supported_extensions())
+
+# The PR review prompts include the AST, metrics and linter/license findings but not the code context.
+REVIEW_ANALYSIS_FACETS = {"ast", "complexity", "halstead", "linters", "license"}
+
+REVIEW_FOCUS_AREAS = """1.  **Syntax & Style**: Adherence to language conventions, formatting, naming.
+                2.  **Logic & Correctness**: Potential bugs, edge case handling, error handling, off-by-one errors.
+                3.  **Architecture & Design**: Design pattern violations, SOLID principles, code duplication, modularity, maintainability.
+                4.  **Performance**: Algorithm efficiency, potential bottlenecks, memory usage, async/await patterns.
+                5.  **Security**: Common vulnerabilities (e.g., injection, XSS, insecure deserialization), insecure configurations.
+                6.  **Readability & Maintainability**: Clarity, comments, complexity, documentation.
+                7.  **Testability**: Suggestions for improving test coverage or structure.
+                8.  **Type Safety**: For Python, Go, Java, JavaScript/TypeScript, validate type hints/annotations.
+                9.  **Control Flow**: Analyze potential issues in the flow of execution, infinite loops, unreachable code.
+                10. **Data Flow**: Identify potential issues with data propagation, uninitialized variables, data leaks."""
+
+def _build_batch_file_section(entry: Dict[str, Any]) -> str:
+    """
+    Builds one file's section of the batched review prompt. Batches are packed by the size of these sections.
+    """
+    file_data = entry["file_data"]
+    static_result = entry["static_result"]
+    language = get_language_name(os.path.splitext(file_data.filename)[1].lower())
+    symbol_context_line = f"- **Cross-file Context**:\n{entry['symbol_context']}" if entry.get("symbol_context") else ""
+    return f"""
+                ### File: {file_data.filename} ({language})
+                ```diff
+                {file_data.patch}
+                ```
+                - **AST (S-expression)**: `{static_result.ast_sexp}`
+                - **Cyclomatic Complexity**: {static_result.cyclomatic_complexity}
+                - **Cognitive Complexity**: {static_result.cognitive_complexity}
+                - **Halstead Metrics**: {json.dumps(static_result.halstead_metrics)}
+                - **Issues from Linters/Scanners**: {json.dumps(static_result.issues)}
+                {symbol_context_line}
+                """
+
+def _build_file_review_prompt(review_input: Dict[str, Any], extra_sections: str = "") -> str:
+    """
+    Builds the single-file review prompt shared by the registered prompt builders.
+    """
+    filename = review_input["filename"]
+    language = review_input["language"]
+    file_patch = review_input["patch"]
+    dependencies = review_input["dependencies"]
+    static_result = review_input["static_result"]
+    symbol_context = review_input.get("symbol_context", "")
+    related_code = review_input.get("related_code", "")
+    symbol_context_section = f"**Cross-file Context (from the repository symbol index)**:\n{symbol_context}\n" if symbol_context else ""
+    related_code_section = f"**Related Code from the Repository (lexical search; may be only partly relevant)**:\n{related_code}\n" if related_code else ""
+    return f"""
+                You are an intelligent code review assistant. Your goal is to provide actionable, constructive, and context-aware feedback on code changes.
+                Analyze the provided code patch, considering the programming language, project dependencies, and static analysis results.
+
+                **Programming Language**: {language}
+                **File Name**: {filename}
+
+                **Project Dependencies (if available)**:
+                ```json
+                {json.dumps(dependencies, indent=2)}
+                ```
+
+                **Code Patch (diff format)**:
+                ```diff
+                {file_patch}
+                ```
+
+                **Static Analysis Results**:
+                - **AST (S-expression)**:
+                  ```
+                  {static_result.ast_sexp}
+                  ```
+                - **Cyclomatic Complexity**: {static_result.cyclomatic_complexity}
+                - **Cognitive Complexity**: {static_result.cognitive_complexity}
+                - **Halstead Metrics**: {json.dumps(static_result.halstead_metrics, indent=2)}
+                - **Issues from Linters/Scanners**:
+                ```json
+                {json.dumps(static_result.issues, indent=2)}
+                ```
+                {symbol_context_section}
+                {related_code_section}
+                {extra_sections}
+                **Review Focus Areas**:
+                {REVIEW_FOCUS_AREAS}
+
+                **Output Format**:
+                Provide a JSON array of review comments. Each object in the array MUST have the following properties:
+                -   `body`: (string) The detailed review comment, including code suggestions if applicable (use markdown code blocks for suggestions).
+                -   `line`: (string) The exact line of code (from the `+` or context lines in the patch) that the comment applies to. This line MUST be present in the provided `file_patch`.
+                -   `severity`: (string) The severity level of the issue. Choose one of: "Critical", "High", "Medium", "Low".
+                -   `rationale`: (string) A concise explanation of *why* this change is suggested and its impact.
+
+                **Constraints**:
+                -   Ensure the `line` property refers to an *actual line* from the `file_patch` (either a `+` added line or a ` ` context line). Do NOT provide line numbers that are not in the diff.
+                -   Keep comments concise but informative.
+                -   Prioritize critical and high-severity issues.
+                -   If no issues are found, return an empty array `[]`.
+                -   Do not include any conversational text outside the JSON array.
+                """
+
+def build_standard_review_prompt(review_input: Dict[str, Any]) -> str:
+    """
+    Reviews the patch with its static analysis results and, when available, symbol and related-code context.
+    """
+    return _build_file_review_prompt(review_input)
+
+
+def build_full_context_review_prompt(review_input: Dict[str, Any]) -> str:
+    """
+    The standard prompt plus the full file at the PR head and the triage signals that made the file risky;
+    used for files escalated to the stronger model.
+    """
+    sections = []
+    if review_input.get("risk_reasons"):
+        sections.append(f"**Why This File Was Escalated**: {'; '.join(review_input['risk_reasons'])}. Look closely at these areas.\n")
+    if review_input.get("file_content"):
+        sections.append(f"""**Full File After the Change** (for context; comment only on lines present in the patch):
+                ```{review_input["language"].lower()}
+                {review_input["file_content"]}
+                ```
+                """)
+    return _build_file_review_prompt(review_input, extra_sections="".join(sections))
+
+
+# Prompt builders selectable with REVIEW_PROMPT and REVIEW_ESCALATION_PROMPT. A builder takes the review input
+# (filename, language, patch, dependencies, static_result, symbol_context, related_code, file_content,
+# risk_reasons) and returns the prompt text; the response must follow the single-file comment schema.
+REVIEW_PROMPT_BUILDERS: Dict[str, Callable[[Dict[str, Any]], str]] = {
+    "standard": build_standard_review_prompt,
+    "full_context": build_full_context_review_prompt,
+}
 
 class ReviewComment(BaseModel): 
     path: str
@@ -74,194 +198,546 @@ class PullRequest(BaseModel):
             project_wide (bool): If True, review all files in the project.
             static_analysis_enabled (bool): If True, perform static analysis with external tools.
         """
-        repo = g.get_repo(self.repository["full_name"])
+        # Lazy: the repository's own attributes are not needed, only its URL
+        repo = get_github_client().get_repo(self.repository["full_name"], lazy=True)
         pull_request = repo.get_pull(self.number)
 
         files_to_review = []
+        snapshot = None
         if commit_ref:
-            files_to_review = self.get_commit_files(repo, commit_ref)
+            snapshot = self.load_mirror_snapshot(repo, pull_request, commit_sha=commit_ref) or self.load_snapshot(repo, pull_request, commit_sha=commit_ref)
+            files_to_review = snapshot.files if snapshot else self.get_commit_files(repo, commit_ref)
             logger.info(f"Reviewing {len(files_to_review)} files from commit {commit_ref}")
         elif project_wide:
             files_to_review = self.get_project_files(repo)
             logger.info(f"Reviewing {len(files_to_review)} files project-wide.")
         else:
-            files_to_review = pull_request.get_files()
+            snapshot = self.load_mirror_snapshot(repo, pull_request) or self.load_snapshot(repo, pull_request)
+            files_to_review = snapshot.files if snapshot else files_with_content(
+                repo, self.repository["full_name"], [file.raw_data for file in pull_request.get_files()]
+            )
             logger.info(f"Reviewing {len(files_to_review)} files from pull request #{self.number}")
-        
-        dependencies = self.parse_dependencies(repo)
-        self.create_and_post_review(files_to_review, pull_request, dependencies, static_analysis_enabled)
 
-    def create_and_post_review(self, files, pull_request, dependencies: Dict[str, Any], static_analysis_enabled: bool):
+        if snapshot:
+            dependencies = self.parse_dependency_manifests(snapshot.manifests)
+            gitattributes = snapshot.gitattributes
+        else:
+            dependencies = self.parse_dependencies(repo)
+            gitattributes = self.load_gitattributes(repo, commit_ref or pull_request.head.sha)
+        symbol_snapshot = self.index_symbols(repo, commit_ref or pull_request.head.sha)
+        self.ensure_retrieval_index(repo, pull_request.base.sha)
+        self.create_and_post_review(files_to_review, pull_request, dependencies, static_analysis_enabled, symbol_snapshot=symbol_snapshot,
+                                    gitattributes=gitattributes)
+
+    def load_mirror_snapshot(self, repo, pull_request, commit_sha: Optional[str] = None):
+        """
+        Computes the pull request's (or one commit's) changed files, manifests and `.gitattributes` from the local git
+        mirror. Returns None if mirrors are disabled or the mirror cannot be used.
+        """
+        if not get_settings().GIT_MIRROR_ENABLED:
+            return None
+        try:
+            # git authenticates with the same installation token as the API requests
+            token = getattr(repo._requester.auth, "token", None)
+            return snapshot_from_mirror(get_git_mirror_cache(), self.repository["full_name"], pull_request, token=token, commit_sha=commit_sha)
+        except Exception as e:
+            logger.warning(f"Git mirror unavailable for PR #{self.number}; fetching its files from the API: {str(e)}", exc_info=True)
+            return None
+
+    def load_snapshot(self, repo, pull_request, commit_sha: Optional[str] = None):
+        """
+        Loads the pull request's (or one commit's) changed files, dependency manifests and `.gitattributes` in batched
+        requests. Returns None if snapshots are disabled or loading fails, in which case the review reads them one by one.
+        """
+        if not get_settings().PR_SNAPSHOT_ENABLED:
+            return None
+        try:
+            return load_pull_request_snapshot(
+                repo, self.repository["full_name"], pull_request,
+                blob_filter=lambda path: os.path.splitext(path)[1].lower() in supported_languages_ext, commit_sha=commit_sha,
+            )
+        except Exception as e:
+            logger.warning(f"Could not load a snapshot of PR #{self.number}; fetching its files individually: {str(e)}", exc_info=True)
+            return None
+
+    def load_gitattributes(self, repo, ref: str) -> Optional[str]:
+        """
+        Returns the repository's root `.gitattributes` at the given ref, or None if it has none.
+        Its `linguist-generated` and `linguist-vendored` rules decide which files are skipped before review.
+        """
+        try:
+            return repo.get_contents(".gitattributes", ref=ref).decoded_content.decode("utf-8", errors="replace")
+        except GithubException as e:
+            if e.status != 404:
+                logger.warning(f"Could not read .gitattributes at {ref}: {str(e)}")
+            return None
+
+    def index_symbols(self, repo, commit_sha: str) -> Optional[str]:
+        """
+        Brings the symbol index up to date for the reviewed commit (fetching only files not indexed yet).
+        Returns the commit SHA to look symbols up in, or None if the index is disabled or could not be built.
+        """
+        settings = get_settings()
+        if not settings.SYMBOL_INDEX_ENABLED:
+            return None
+        try:
+            index_commit(
+                get_symbol_index(), repo, self.repository["full_name"], commit_sha,
+                max_file_bytes=settings.SYMBOL_INDEX_MAX_FILE_BYTES,
+                max_files=settings.SYMBOL_INDEX_MAX_FILES,
+                concurrency=settings.INDEX_FETCH_CONCURRENCY,
+            )
+            return commit_sha
+        except Exception as e:
+            logger.warning(f"Symbol index unavailable for {self.repository['full_name']}@{commit_sha}; reviewing without cross-file context: {str(e)}", exc_info=True)
+            return None
+
+    def ensure_retrieval_index(self, repo, base_sha: str) -> None:
+        """
+        Builds the repository's retrieval index from the PR's base commit if it was never built.
+        Afterwards it is kept current by push events rather than by reviews.
+        """
+        if not get_settings().RETRIEVAL_INDEX_ENABLED:
+            return
+        repo_name = self.repository["full_name"]
+        try:
+            if get_retrieval_index(repo_name).indexed_commit() is None:
+                refresh_repository_index(repo_name, base_sha, repo=repo)
+        except Exception as e:
+            logger.warning(f"Retrieval index unavailable for {repo_name}; reviewing without related snippets: {str(e)}", exc_info=True)
+
+    def retrieve_related_code(self, file_data) -> str:
+        """
+        Returns the repository snippets most related to the file's hunks, formatted for the prompt,
+        or an empty string when retrieval is disabled or the index has not been built.
+        """
+        settings = get_settings()
+        if not settings.RETRIEVAL_INDEX_ENABLED or not file_data.patch:
+            return ""
+        try:
+            index = get_retrieval_index(self.repository["full_name"])
+            if index.indexed_commit() is None:
+                return ""
+            snippets = retrieve_related_snippets(index, file_data.patch, exclude_path=file_data.filename,
+                                                 top_k=settings.RETRIEVAL_TOP_K, token_budget=settings.RETRIEVAL_TOKEN_BUDGET)
+            return format_related_snippets(snippets)
+        except Exception as e:
+            logger.warning(f"Snippet retrieval failed for {file_data.filename}: {str(e)}")
+            return ""
+
+    def create_and_post_review(self, files, pull_request, dependencies: Dict[str, Any], static_analysis_enabled: bool, symbol_snapshot: Optional[str] = None,
+                               gitattributes: Optional[str] = None):
         """
         Generates review comments for given files and posts them to the pull request.
+        When `symbol_snapshot` names an indexed commit, each prompt also gets the file's cross-file symbol context.
+        With REVIEW_CASCADE_ENABLED, the riskiest files are reviewed with full context on REVIEW_ESCALATION_MODEL.
+        Vendored, generated, minified, binary and oversized files are skipped before any analysis or Gemini call
+        and reported with counts in the review body.
         """
+        settings = get_settings()
+        repo_name = self.repository.get("full_name")
+        review_start = time.perf_counter()
         review_comments_for_pr = []
+        reviewable_files = []
+        classifier = FileClassifier(
+            gitattributes,
+            extra_skip_patterns=settings.REVIEW_SKIP_PATH_PATTERNS,
+            max_file_bytes=settings.REVIEW_MAX_FILE_BYTES,
+            minified_line_length=settings.REVIEW_MINIFIED_LINE_LENGTH,
+        )
+        skipped: Dict[str, List[str]] = {}
+
+        def skip(file_data, reason: str):
+            logger.info(f"Skipping {reason.replace('_', ' ')} file: {file_data.filename}")
+            skipped.setdefault(reason, []).append(file_data.filename)
+            increment("review_files_skipped_total", reason=reason, repo=repo_name)
+
         for file_data in files:
             ext = os.path.splitext(file_data.filename)[1].lower()
             if ext not in supported_languages_ext: 
                 logger.info(f"Skipping unsupported file: {file_data.filename}")
                 continue
-            
-            try:
-                file_content = file_data.decoded_content.decode('utf-8')
-            except UnicodeDecodeError:
-                logger.warning(f"Could not decode {file_data.filename} with utf-8, trying latin-1.")
-                file_content = file_data.decoded_content.decode('latin-1', errors='ignore')
+            reason = classifier.classify_path(file_data.filename)
+            if reason:
+                skip(file_data, reason)
+                continue
+            reviewable_files.append(file_data)
+
+        def prepare(file_data) -> Optional[Dict[str, Any]]:
+            ext = os.path.splitext(file_data.filename)[1].lower()
+            with timed("github_file_fetch_seconds", repo=repo_name):
+                raw_content = file_data.decoded_content
+            reason = classifier.classify_content(file_data.filename, raw_content)
+            if reason:
+                skip(file_data, reason)
+                return None
+            file_content = decode_source(raw_content)
             static_result = StaticAnalysisResult(cyclomatic_complexity=0, cognitive_complexity=0, halstead_metrics={}, issues=[], ast_sexp="")
             if static_analysis_enabled:
-                static_result = perform_static_analysis(file_content, ext)
-            
-            gemini_generated_comments = self.generate_review(
-                file_data.patch, file_data.filename, dependencies, static_result
-            )
-            
-            for review_comment in gemini_generated_comments:
-                line_to_comment_on = review_comment.line
-                
-                line_info = find_line_info(file_data.patch, line_to_comment_on)
-                
-                if line_info and "line" in line_info:
-                    review_comments_for_pr.append(
-                        {
-                            "path": file_data.filename,
-                            "body": f"**Severity**: {review_comment.severity}\n**Rationale**: {review_comment.rationale or 'N/A'}\n\n{review_comment.body}",
-                            "line": line_info["line"],
-                            "start_line": line_info.get("start_line", line_info["line"]),
-                            "start_side": line_info.get("start_side", "RIGHT"),
-                            "side": line_info.get("side", "RIGHT")
-                        }
+                changed_ranges = None
+                if settings.DIFF_SCOPED_ANALYSIS and file_data.patch:
+                    changed_ranges = get_changed_line_ranges(file_data.patch)
+                static_result = cached_static_analysis(file_content, ext, changed_ranges=changed_ranges, context_radius=settings.DIFF_CONTEXT_RADIUS,
+                                                        facets=REVIEW_ANALYSIS_FACETS)
+            symbol_context = ""
+            if symbol_snapshot and file_data.patch:
+                try:
+                    symbol_context = build_symbol_context(
+                        get_symbol_index(), repo_name, symbol_snapshot, file_data.filename,
+                        get_changed_line_ranges(file_data.patch), limit=settings.SYMBOL_CONTEXT_MAX_ENTRIES,
                     )
-                else:
-                    logger.warning(f"Could not find line info for comment on line '{line_to_comment_on}' in file '{file_data.filename}'. Skipping comment.")
-
-            if len(review_comments_for_pr) >= get_settings().REVIEW_LIMIT:
-                logger.info(f"Reached review limit of {get_settings().REVIEW_LIMIT}. Stopping further comment generation.")
+                except Exception as e:
+                    logger.warning(f"Symbol context lookup failed for {file_data.filename}: {str(e)}")
+            return {"file_data": file_data, "file_content": file_content, "static_result": static_result, "symbol_context": symbol_context}
+
+        def pack(token_counts: List[int]) -> List[List[int]]:
+            # Pack small files into shared Gemini requests; large files are still reviewed one by one.
+            if not settings.BATCH_REVIEW_ENABLED:
+                return [[index] for index in range(len(token_counts))]
+            return pack_review_batches(list(enumerate(token_counts)), settings.BATCH_TOKEN_BUDGET, settings.BATCH_SMALL_FILE_TOKENS)
+
+        def pack_entries(entries: List[Dict[str, Any]]) -> List[List[Dict[str, Any]]]:
+            # Sized by the rendered prompt section: AST, metrics, linter issues and symbol context often outweigh the patch
+            batches = pack([estimate_tokens(_build_batch_file_section(entry)) for entry in entries])
+            return [[entries[index] for index in batch] for batch in batches]
+
+        # Yields (escalated, entries) per Gemini request. Without the cascade, files are grouped by patch size (a lower
+        # bound of their section) and prepared group by group so analysis stops with generation at REVIEW_LIMIT; each
+        # group is then packed again by its rendered sections. With the cascade, every file is analyzed and scored first,
+        # and the escalated files are reviewed before the rest so the comment limit is spent on the riskiest changes.
+        def review_requests():
+            if not settings.REVIEW_CASCADE_ENABLED:
+                for group in pack([estimate_tokens(file_data.patch or "") for file_data in reviewable_files]):
+                    entries = [entry for entry in (prepare(reviewable_files[index]) for index in group) if entry]
+                    for batch in pack_entries(entries):
+                        yield False, batch
+                return
+            entries = [entry for entry in map(prepare, reviewable_files) if entry]
+            escalated, remaining = self.triage_review_entries(entries)
+            for entry in escalated:
+                yield True, [entry]
+            for batch in pack_entries(remaining):
+                yield False, batch
+
+        for escalated, batch_entries in review_requests():
+            if not batch_entries:
+                continue
+            if escalated:
+                entry = batch_entries[0]
+                model_name = settings.REVIEW_ESCALATION_MODEL
+                comments_by_path = {
+                    entry["file_data"].filename: self.generate_review(
+                        entry["file_data"].patch, entry["file_data"].filename, dependencies, entry["static_result"], entry["symbol_context"],
+                        self.retrieve_related_code(entry["file_data"]), model_name=model_name, prompt_name=settings.REVIEW_ESCALATION_PROMPT,
+                        file_content=truncate_to_tokens(entry["file_content"], settings.REVIEW_ESCALATION_FILE_TOKENS),
+                        risk_reasons=entry["risk"].reasons,
+                    )
+                }
+            elif len(batch_entries) == 1:
+                entry = batch_entries[0]
+                model_name = settings.REVIEW_MODEL
+                # Retrieved snippets are only added to single-file prompts; batches are packed to a token budget
+                comments_by_path = {
+                    entry["file_data"].filename: self.generate_review(
+                        entry["file_data"].patch, entry["file_data"].filename, dependencies, entry["static_result"], entry["symbol_context"],
+                        self.retrieve_related_code(entry["file_data"]),
+                    )
+                }
+            else:
+                model_name = settings.REVIEW_MODEL
+                comments_by_path = self.generate_batched_review(batch_entries, dependencies)
+
+            for entry in batch_entries:
+                file_data = entry["file_data"]
+                for review_comment in comments_by_path.get(file_data.filename, []):
+                    line_to_comment_on = review_comment.line
+                    
+                    with timed("find_line_info_seconds", repo=repo_name):
+                        line_info = find_line_info(file_data.patch, line_to_comment_on)
+                    
+                    if line_info and "line" in line_info:
+                        increment("review_comments_generated_total", model=model_name, repo=repo_name)
+                        review_comments_for_pr.append(
+                            {
+                                "path": file_data.filename,
+                                "body": f"**Severity**: {review_comment.severity}\n**Rationale**: {review_comment.rationale or 'N/A'}\n\n{review_comment.body}",
+                                "line": line_info["line"],
+                                "start_line": line_info.get("start_line", line_info["line"]),
+                                "start_side": line_info.get("start_side", "RIGHT"),
+                                "side": line_info.get("side", "RIGHT")
+                            }
+                        )
+                    else:
+                        logger.warning(f"Could not find line info for comment on line '{line_to_comment_on}' in file '{file_data.filename}'. Skipping comment.")
+
+            if len(review_comments_for_pr) >= settings.REVIEW_LIMIT:
+                logger.info(f"Reached review limit of {settings.REVIEW_LIMIT}. Stopping further comment generation.")
                 break
 
-        self.post_review_comments(pull_request, review_comments_for_pr)
+        self.post_review_comments(pull_request, review_comments_for_pr, {file_data.filename: file_data.patch for file_data in reviewable_files},
+                                  summary_note=format_skipped_summary(skipped))
+        observe("review_total_seconds", time.perf_counter() - review_start, repo=repo_name)
         return review_comments_for_pr 
 
-    def post_review_comments(self, pull_request, review_comments: List[Dict]):
+    def triage_review_entries(self, entries: List[Dict[str, Any]]) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
+        """
+        Scores each prepared file's risk (plus the triage model's rating when REVIEW_TRIAGE_MODEL_ENABLED) and splits the
+        files into those escalated to the stronger model, highest risk first, and the rest in PR order.
+        Each entry gets its `risk` assessment.
+        """
+        settings = get_settings()
+        repo_name = self.repository.get("full_name")
+        model_scores = self.generate_triage_scores(entries) if settings.REVIEW_TRIAGE_MODEL_ENABLED and entries else {}
+        candidates = []
+        for index, entry in enumerate(entries):
+            file_data = entry["file_data"]
+            assessment = assess_file_risk(file_data.patch, entry["static_result"])
+            if file_data.filename in model_scores:
+                assessment.score += model_scores[file_data.filename]
+                assessment.reasons.append(f"triage model risk {model_scores[file_data.filename]:g}/10")
+            entry["risk"] = assessment
+            observe("review_risk_score", assessment.score, repo=repo_name)
+            prompt_tokens = estimate_tokens(file_data.patch or "") + min(estimate_tokens(entry["file_content"]), settings.REVIEW_ESCALATION_FILE_TOKENS)
+            candidates.append((index, assessment.score, prompt_tokens))
+
+        selected = select_escalations(candidates, settings.REVIEW_ESCALATION_MIN_RISK, settings.REVIEW_ESCALATION_TOKEN_BUDGET)
+        increment("review_files_escalated_total", len(selected), repo=repo_name)
+        for index in selected:
+            logger.info(f"Escalating {entries[index]['file_data'].filename} (risk {entries[index]['risk'].score:g}: {', '.join(entries[index]['risk'].reasons)}) to {settings.REVIEW_ESCALATION_MODEL}.")
+        selected_indexes = set(selected)
+        return [entries[index] for index in selected], [entry for index, entry in enumerate(entries) if index not in selected_indexes]
+
+    def generate_triage_scores(self, entries: List[Dict[str, Any]]) -> Dict[str, float]:
+        """
+        Asks REVIEW_MODEL for a 0-10 risk rating of each file from a short prompt with the (truncated) patches only.
+        Returns ratings keyed by file path; on any error, no ratings, so triage falls back to the local score.
+        """
+        settings = get_settings()
+        model_name = settings.REVIEW_MODEL
+        try:
+            file_sections = "".join(
+                f"### {entry['file_data'].filename}\n```diff\n{truncate_to_tokens(entry['file_data'].patch or '', settings.REVIEW_TRIAGE_PATCH_TOKENS)}\n```\n"
+                for entry in entries
+            )
+            prompt = (
+                "Rate how likely each of the following code changes is to contain a bug, security issue or design problem "
+                "that a careful reviewer would flag, from 0 (trivial or mechanical) to 10 (almost certainly). "
+                "Return one object per file with its `path` exactly as given in the heading and an integer `risk`.\n\n" + file_sections
+            )
+            with timed("gemini_request_seconds", model=model_name, repo=self.repository.get("full_name")):
+                response = get_gemini_model(model_name).generate_content(
+                    contents=[{"role": "user", "parts": [{"text": prompt}]}],
+                    generation_config={
+                        "response_mime_type": "application/json",
+                        "response_schema": {
+                            "type": "array",
+                            "items": {
+                                "type": "object",
+                                "properties": {"path": {"type": "string"}, "risk": {"type": "integer"}},
+                                "required": ["path", "risk"]
+                            }
+                        }
+                    }
+                )
+            record_gemini_usage(response, model_name, repo=self.repository.get("full_name"))
+            ratings = json.loads(response.candidates[0].content.parts[0].text)
+            return {rating["path"]: float(min(max(rating["risk"], 0), 10)) for rating in ratings if "path" in rating and "risk" in rating}
+        except Exception as e:
+            logger.warning(f"Triage model call failed; using local risk scores only: {str(e)}")
+            return {}
+
+    def post_review_comments(self, pull_request, review_comments: List[Dict], patches_by_path: Optional[Dict[str, Optional[str]]] = None,
+                             summary_note: str = ""):
         """
         Posts the generated review comments to the GitHub pull request.
+        Comments are checked against the file patches first (when given) and posted in chunks of
+        REVIEW_COMMENT_CHUNK_SIZE, with retries on secondary rate limits; comments GitHub still
+        rejects are dropped individually instead of failing the whole review.
+        `summary_note` (e.g. the skipped-file counts) is appended to the review body, and is posted on its own
+        when there are no comments.
         """
-        if not review_comments:
+        if pull_request is None:
+            logger.info(f"No pull request to post {len(review_comments)} review comments to; returning them only.")
+            return
+        if patches_by_path is not None:
+            review_comments, rejected = validate_review_comments(review_comments, patches_by_path)
+            if rejected:
+                logger.warning(f"Dropping {len(rejected)} review comments with positions outside the diff of PR #{pull_request.number}.")
+                increment("review_comments_dropped_total", len(rejected), reason="invalid_position", repo=self.repository.get("full_name"))
+        if not review_comments and not summary_note:
             logger.info(f"No review comments to post for PR #{pull_request.number}.")
             return
 
+        settings = get_settings()
         try:
-            pull_request.create_review(
-                body=f"Automated code review by Gemini at {datetime.now().strftime('%I:%M %p IST on %B %d, %Y')}",
-                event="COMMENT", # Use 'COMMENT' to just add comments, 'APPROVE' or 'REQUEST_CHANGES' for final review state
-                comments=review_comments,
+            poster = ReviewPoster(
+                pull_request,
+                repo_name=self.repository.get("full_name"),
+                chunk_size=settings.REVIEW_COMMENT_CHUNK_SIZE,
+                max_attempts=settings.REVIEW_POST_MAX_ATTEMPTS,
             )
-            logger.info(f"Successfully posted {len(review_comments)} review comments to PR #{pull_request.number}.")
+            # Reviews are posted with event 'COMMENT' to just add comments, not 'APPROVE' or 'REQUEST_CHANGES'
+            review_body = f"Automated code review by Gemini at {datetime.now().strftime('%I:%M %p IST on %B %d, %Y')}"
+            if summary_note:
+                review_body += f"\n\n{summary_note}"
+            outcome = poster.post(review_body, review_comments)
+            logger.info(f"Posted {outcome['posted']} review comments in {outcome['reviews']} review(s) to PR #{pull_request.number}; {outcome['dropped']} rejected by GitHub.")
         except Exception as e:
             logger.error(f"Error posting review comments to PR #{pull_request.number}: {str(e)}", exc_info=True)
             raise
 
-    def generate_review(self, file_patch: str, filename: str, dependencies: Dict[str, Any], static_result: StaticAnalysisResult) -> List[ReviewComment]:
+    def generate_review(self, file_patch: str, filename: str, dependencies: Dict[str, Any], static_result: StaticAnalysisResult,
+                        symbol_context: str = "", related_code: str = "", model_name: Optional[str] = None, prompt_name: Optional[str] = None,
+                        file_content: str = "", risk_reasons: Optional[List[str]] = None) -> List[ReviewComment]:
         """
-        Generates code review comments using the Gemini API based on the patch, dependencies, and static analysis.
+        Generates code review comments using the Gemini API based on the patch, dependencies, and static analysis,
+        plus the cross-file symbol context and related repository snippets when available.
+        `model_name` and `prompt_name` (a key of REVIEW_PROMPT_BUILDERS) default to REVIEW_MODEL and REVIEW_PROMPT.
         """
+        settings = get_settings()
+        model_name = model_name or settings.REVIEW_MODEL
         try:
             ext = os.path.splitext(filename)[1].lower()
-            language = {'.py': 'Python', '.go': 'Go', '.js': 'JavaScript', '.java': 'Java', '.ts': 'TypeScript'}.get(ext, 'Unknown')
+            language = get_language_name(ext)
+
+            prompt_start = time.perf_counter()
+            review_input = {
+                "filename": filename, "language": language, "patch": file_patch, "dependencies": dependencies,
+                "static_result": static_result, "symbol_context": symbol_context, "related_code": related_code,
+                "file_content": file_content, "risk_reasons": risk_reasons or [],
+            }
+            prompt_name = prompt_name or settings.REVIEW_PROMPT
+            if prompt_name not in REVIEW_PROMPT_BUILDERS:
+                raise ValueError(f"Unknown review prompt '{prompt_name}'; registered prompts: {', '.join(REVIEW_PROMPT_BUILDERS)}")
+            prompt = REVIEW_PROMPT_BUILDERS[prompt_name](review_input)
+            observe("prompt_build_seconds", time.perf_counter() - prompt_start, repo=self.repository.get("full_name"), language=language)
+
+            with timed("gemini_request_seconds", model=model_name, repo=self.repository.get("full_name")):
+                response = get_gemini_model(model_name).generate_content(
+                    contents=[{"role": "user", "parts": [{"text": prompt}]}],
+                    generation_config={
+                        "response_mime_type": "application/json",
+                        "response_schema": {
+                            "type": "array",
+                            "items": {
+                                "type": "object",
+                                "properties": {
+                                    "body": {"type": "string"},
+                                    "line": {"type": "string"},
+                                    "severity": {"type": "string", "enum": ["Critical", "High", "Medium", "Low"]},
+                                    "rationale": {"type": "string"}
+                                },
+                                "required": ["body", "line", "severity", "rationale"]
+                            }
+                        }
+                    }
+                )
+            record_gemini_usage(response, model_name, repo=self.repository.get("full_name"))
+            # Parse the JSON response and validate against ReviewComment model
+            raw_comments = json.loads(response.candidates[0].content.parts[0].text)
+            return [ReviewComment(**{"path": filename, **comment}) for comment in raw_comments]
+        except Exception as e:
+            logger.error(f"Gemini API error for {filename}: {str(e)} at {datetime.now().strftime('%I:%M %p IST on %B %d, %Y')}", exc_info=True)
+            # If Gemini fails, return an empty list of comments to avoid breaking the PR review
+            return []
+
+    def generate_batched_review(self, batch_entries: List[Dict[str, Any]], dependencies: Dict[str, Any]) -> Dict[str, List[ReviewComment]]:
+        """
+        Generates review comments for several small files with a single Gemini request.
+        The shared preamble and dependency JSON are sent once; each returned comment carries the `path`
+        of the file it belongs to and is split back per file.
+
+        Args:
+            batch_entries (List[Dict[str, Any]]): Entries with `file_data` (PyGithub-like file) and `static_result`.
+            dependencies (Dict[str, Any]): Parsed project dependencies.
+
+        Returns:
+            Dict[str, List[ReviewComment]]: Review comments keyed by file path.
+        """
+        filenames = [entry["file_data"].filename for entry in batch_entries]
+        try:
+            prompt_start = time.perf_counter()
+            file_sections = [_build_batch_file_section(entry) for entry in batch_entries]
 
             prompt = f"""
                 You are an intelligent code review assistant. Your goal is to provide actionable, constructive, and context-aware feedback on code changes.
-                Analyze the provided code patch, considering the programming language, project dependencies, and static analysis results.
-
-                **Programming Language**: {language}
-                **File Name**: {filename}
+                Analyze each of the provided code patches below, considering the programming language, project dependencies, and static analysis results.
 
                 **Project Dependencies (if available)**:
                 ```json
                 {json.dumps(dependencies, indent=2)}
                 ```
 
-                **Code Patch (diff format)**:
-                ```diff
-                {file_patch}
-                ```
-
-                **Static Analysis Results**:
-                - **AST (S-expression)**:
-                  ```
-                  {static_result.ast_sexp}
-                  ```
-                - **Cyclomatic Complexity**: {static_result.cyclomatic_complexity}
-                - **Cognitive Complexity**: {static_result.cognitive_complexity}
-                - **Halstead Metrics**: {json.dumps(static_result.halstead_metrics, indent=2)}
-                - **Issues from Linters/Scanners**:
-                ```json
-                {json.dumps(static_result.issues, indent=2)}
-                ```
+                **Files Under Review**:
+                {"".join(file_sections)}
 
                 **Review Focus Areas**:
-                1.  **Syntax & Style**: Adherence to language conventions, formatting, naming.
-                2.  **Logic & Correctness**: Potential bugs, edge case handling, error handling, off-by-one errors.
-                3.  **Architecture & Design**: Design pattern violations, SOLID principles, code duplication, modularity, maintainability.
-                4.  **Performance**: Algorithm efficiency, potential bottlenecks, memory usage, async/await patterns.
-                5.  **Security**: Common vulnerabilities (e.g., injection, XSS, insecure deserialization), insecure configurations.
-                6.  **Readability & Maintainability**: Clarity, comments, complexity, documentation.
-                7.  **Testability**: Suggestions for improving test coverage or structure.
-                8.  **Type Safety**: For Python, Go, Java, JavaScript/TypeScript, validate type hints/annotations.
-                9.  **Control Flow**: Analyze potential issues in the flow of execution, infinite loops, unreachable code.
-                10. **Data Flow**: Identify potential issues with data propagation, uninitialized variables, data leaks.
-
+                {REVIEW_FOCUS_AREAS}
 
                 **Output Format**:
-                Provide a JSON array of review comments. Each object in the array MUST have the following properties:
+                Provide a JSON array of review comments covering all files. Each object in the array MUST have the following properties:
+                -   `path`: (string) The file path the comment applies to, exactly as given in the `### File:` heading.
                 -   `body`: (string) The detailed review comment, including code suggestions if applicable (use markdown code blocks for suggestions).
-                -   `line`: (string) The exact line of code (from the `+` or context lines in the patch) that the comment applies to. This line MUST be present in the provided `file_patch`.
+                -   `line`: (string) The exact line of code (from the `+` or context lines in that file's patch) that the comment applies to.
                 -   `severity`: (string) The severity level of the issue. Choose one of: "Critical", "High", "Medium", "Low".
                 -   `rationale`: (string) A concise explanation of *why* this change is suggested and its impact.
 
                 **Constraints**:
-                -   Ensure the `line` property refers to an *actual line* from the `file_patch` (either a `+` added line or a ` ` context line). Do NOT provide line numbers that are not in the diff.
+                -   Ensure the `line` property refers to an *actual line* from the patch of the file named in `path`.
                 -   Keep comments concise but informative.
                 -   Prioritize critical and high-severity issues.
                 -   If no issues are found, return an empty array `[]`.
                 -   Do not include any conversational text outside the JSON array.
                 """
-
-            response = genai.generate_content(
-                model="gemini-1.5-flash", # Using flash for speed, can switch to pro if more complex reasoning needed
-                contents=[{"role": "user", "parts": [{"text": prompt}]}],
-                generation_config={
-                    "response_mime_type": "application/json",
-                    "response_schema": {
-                        "type": "array",
-                        "items": {
-                            "type": "object",
-                            "properties": {
-                                "body": {"type": "string"},
-                                "line": {"type": "string"},
-                                "severity": {"type": "string", "enum": ["Critical", "High", "Medium", "Low"]},
-                                "rationale": {"type": "string"}
-                            },
-                            "required": ["body", "line", "severity", "rationale"]
+            observe("prompt_build_seconds", time.perf_counter() - prompt_start, repo=self.repository.get("full_name"), language="batch")
+
+            model_name = get_settings().REVIEW_MODEL
+            with timed("gemini_request_seconds", model=model_name, repo=self.repository.get("full_name")):
+                response = get_gemini_model(model_name).generate_content(
+                    contents=[{"role": "user", "parts": [{"text": prompt}]}],
+                    generation_config={
+                        "response_mime_type": "application/json",
+                        "response_schema": {
+                            "type": "array",
+                            "items": {
+                                "type": "object",
+                                "properties": {
+                                    "path": {"type": "string"},
+                                    "body": {"type": "string"},
+                                    "line": {"type": "string"},
+                                    "severity": {"type": "string", "enum": ["Critical", "High", "Medium", "Low"]},
+                                    "rationale": {"type": "string"}
+                                },
+                                "required": ["path", "body", "line", "severity", "rationale"]
+                            }
                         }
                     }
-                }
-            )
-            # Parse the JSON response and validate against ReviewComment model
+                )
+            record_gemini_usage(response, model_name, repo=self.repository.get("full_name"))
             raw_comments = json.loads(response.candidates[0].content.parts[0].text)
-            return [ReviewComment(**comment) for comment in raw_comments]
+
+            comments_by_path: Dict[str, List[ReviewComment]] = {filename: [] for filename in filenames}
+            for comment in raw_comments:
+                review_comment = ReviewComment(**comment)
+                if review_comment.path not in comments_by_path:
+                    logger.warning(f"Batched Gemini review returned a comment for unknown path '{review_comment.path}'. Skipping comment.")
+                    continue
+                comments_by_path[review_comment.path].append(review_comment)
+            logger.info(f"Batched Gemini review of {len(filenames)} files returned {len(raw_comments)} comments.")
+            return comments_by_path
         except Exception as e:
-            logger.error(f"Gemini API error for {filename}: {str(e)} at {datetime.now().strftime('%I:%M %p IST on %B %d, %Y')}", exc_info=True)
-            # If Gemini fails, return an empty list of comments to avoid breaking the PR review
-            return []
+            logger.error(f"Gemini API error for batched review of {', '.join(filenames)}: {str(e)} at {datetime.now().strftime('%I:%M %p IST on %B %d, %Y')}", exc_info=True)
+            # If Gemini fails, return no comments to avoid breaking the PR review
+            return {}
 
     @retry(stop=stop_after_attempt(3), wait=wait_exponential(multiplier=1, min=4, max=10))
     def get_commit_files(self, repo, commit_ref: str) -> List[Any]:
         """
-        Fetches files changed in a specific commit.
+        Fetches files changed in a specific commit; their content is fetched from the blob API on first access.
         """
         try:
             commit = repo.get_commit(commit_ref)
-            return commit.files
+            return files_with_content(repo, self.repository["full_name"], [file.raw_data for file in commit.files])
         except Exception as e:
             logger.error(f"Error fetching commit files for {commit_ref}: {str(e)}", exc_info=True)
             return []
@@ -292,6 +768,23 @@ class PullRequest(BaseModel):
         Parses common dependency files (e.g., requirements.txt, package.json, go.mod, pom.xml)
         to provide context to the review engine.
         """
+        manifests = {}
+        for path in MANIFEST_PATHS:
+            try:
+                manifests[path] = repo.get_contents(path).decoded_content.decode()
+            except GithubException as e:
+                if e.status != 404: # Ignore 404 (file not found)
+                    logger.warning(f"Error fetching {path}: {e}", exc_info=True)
+                manifests[path] = None
+            except Exception as e:
+                logger.warning(f"Unexpected error fetching {path}: {e}", exc_info=True)
+                manifests[path] = None
+        return self.parse_dependency_manifests(manifests)
+
+    def parse_dependency_manifests(self, manifests: Dict[str, Optional[str]]) -> Dict[str, Any]:
+        """
+        Parses the texts of dependency files keyed by path; missing files are None.
+        """
         dependencies = {
             "python": [],
             "go": [],
@@ -301,60 +794,49 @@ class PullRequest(BaseModel):
         
         # Python dependencies (requirements.txt)
         try:
-            req_content = repo.get_contents("requirements.txt")
-            req_text = req_content.decoded_content.decode()
-            # Simple parsing for demonstration; a dedicated library like `requirements-parser` would be better
-            dependencies["python"] = [{"name": line.strip(), "version": "unknown"} for line in req_text.splitlines() if line.strip() and not line.strip().startswith('#')]
-        except GithubException as e:
-            if e.status != 404: # Ignore 404 (file not found)
-                logger.warning(f"Error parsing requirements.txt: {e}", exc_info=True)
+            req_text = manifests.get("requirements.txt")
+            if req_text is not None:
+                # Simple parsing for demonstration; a dedicated library like `requirements-parser` would be better
+                dependencies["python"] = [{"name": line.strip(), "version": "unknown"} for line in req_text.splitlines() if line.strip() and not line.strip().startswith('#')]
         except Exception as e:
             logger.warning(f"Unexpected error parsing requirements.txt: {e}", exc_info=True)
 
         # Go dependencies (go.mod)
         try:
-            go_mod_content = repo.get_contents("go.mod")
-            go_mod_text = go_mod_content.decoded_content.decode()
-            dependencies["go"] = [
-                {"module": line.split()[0], "version": line.split()[1]}
-                for line in go_mod_text.splitlines()
-                if line.strip().startswith("require ") and len(line.split()) >= 2
-            ]
-        except GithubException as e:
-            if e.status != 404:
-                logger.warning(f"Error parsing go.mod: {e}", exc_info=True)
+            go_mod_text = manifests.get("go.mod")
+            if go_mod_text is not None:
+                dependencies["go"] = [
+                    {"module": line.split()[0], "version": line.split()[1]}
+                    for line in go_mod_text.splitlines()
+                    if line.strip().startswith("require ") and len(line.split()) >= 2
+                ]
         except Exception as e:
             logger.warning(f"Unexpected error parsing go.mod: {e}", exc_info=True)
 
         # JavaScript dependencies (package.json)
         try:
-            package_json = repo.get_contents("package.json")
-            package_data = json.loads(package_json.decoded_content.decode())
-            dependencies["javascript"] = package_data.get("dependencies", {})
-            dependencies["javascript"].update(package_data.get("devDependencies", {})) # Include dev dependencies
-        except GithubException as e:
-            if e.status != 404:
-                logger.warning(f"Error parsing package.json: {e}", exc_info=True)
+            package_text = manifests.get("package.json")
+            if package_text is not None:
+                package_data = json.loads(package_text)
+                dependencies["javascript"] = package_data.get("dependencies", {})
+                dependencies["javascript"].update(package_data.get("devDependencies", {})) # Include dev dependencies
         except Exception as e:
             logger.warning(f"Unexpected error parsing package.json: {e}", exc_info=True)
 
         try:
-            pom_content = repo.get_contents("pom.xml")
-            pom_text = pom_content.decoded_content.decode()
-            root = ET.fromstring(pom_text)
-            maven_ns = "{http://maven.apache.org/POM/4.0.0}"
-            for dep in root.findall(f".//{maven_ns}dependency"):
-                group_id = dep.findtext(f"{maven_ns}groupId")
-                artifact_id = dep.findtext(f"{maven_ns}artifactId")
-                version = dep.findtext(f"{maven_ns}version")
-                dependencies["java"].append({
-                    "groupId": group_id,
-                    "artifactId": artifact_id,
-                    "version": version
-                })
-        except GithubException as e:
-            if e.status != 404:
-                logger.warning(f"Error parsing pom.xml: {e}", exc_info=True)
+            pom_text = manifests.get("pom.xml")
+            if pom_text is not None:
+                root = ET.fromstring(pom_text)
+                maven_ns = "{http://maven.apache.org/POM/4.0.0}"
+                for dep in root.findall(f".//{maven_ns}dependency"):
+                    group_id = dep.findtext(f"{maven_ns}groupId")
+                    artifact_id = dep.findtext(f"{maven_ns}artifactId")
+                    version = dep.findtext(f"{maven_ns}version")
+                    dependencies["java"].append({
+                        "groupId": group_id,
+                        "artifactId": artifact_id,
+                        "version": version
+                    })
         except Exception as e:
             logger.warning(f"Unexpected error parsing pom.xml: {e}", exc_info=True)
 
@@ -367,39 +849,10 @@ class PullRequest(BaseModel):
         Returns the review comments for the committed file.
         """
         try:
-            repo = g.get_repo(repo_full_name)
-            
-            # Get the reference for the target branch
-            ref = repo.get_git_ref(f"heads/{branch}")
-            commit_sha = ref.object.sha
-
-            # Create a new blob with the file content
-            blob = repo.create_git_blob(file_content, "utf-8")
-            
-            # Get the base tree of the latest commit
-            base_tree = repo.get_git_tree(commit_sha)
-            
-            # Create a new tree with the updated file
-            # If the file exists, it will be updated; otherwise, it will be added.
-            tree = repo.create_git_tree([
-                {
-                    "path": filename,
-                    "mode": "100644", # Standard file mode
-                    "type": "blob",
-                    "sha": blob.sha
-                }
-            ], base_tree=base_tree) 
-
-            # Create a new commit with the new tree
-            commit = repo.create_git_commit(
-                message=commit_message,
-                tree=tree,
-                parents=[repo.get_git_commit(commit_sha)] 
-            )
-            
-            # Update the branch reference to point to the new commit
-            ref.edit(commit.sha)
-            logger.info(f"File '{filename}' committed to {repo_full_name}/{branch} with commit SHA: {commit.sha}")
+            repo = get_github_client().get_repo(repo_full_name, lazy=True)
+            result = commit_files(repo, repo_full_name, branch, {filename: file_content}, commit_message,
+                                  max_attempts=get_settings().COMMIT_MAX_ATTEMPTS)
+            logger.info(f"File '{filename}' committed to {repo_full_name}/{branch} with commit SHA: {result.commit_sha}")
             
             # --- Generate review comments for the committed file ---
             # Create a mock file object that mimics PyGithub's File object for review
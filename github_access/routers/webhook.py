@@ -1,13 +1,21 @@
-from fastapi import APIRouter, Request, BackgroundTasks, HTTPException
-from github_access.utils.webhook import verify_signature, parse_webhook_payload, get_event_type
+from fastapi import APIRouter, Request, HTTPException
+from github_access.utils.webhook import verify_signature, parse_webhook_payload, get_event_type, peek_action, get_delivery_deduplicator
 from github_access.models.pull_request import PullRequest
+from github_access.utils.metrics import observe
+from github_access.utils.profiling import run_profiled, should_profile, new_request_id
+from github_access.utils.review_scheduler import get_review_scheduler, estimate_review_cost
+from github_access.utils.retrieval_index import refresh_repository_branch
+from config import get_settings
 import logging
+import time
 from datetime import datetime
 from typing import Dict, Any
 
 logger = logging.getLogger(__name__)
 router = APIRouter(tags=["webhook"])
 
+HANDLED_PULL_REQUEST_ACTIONS = {"opened", "synchronize"}
+
 @router.get("/demo")
 async def demo() -> Dict[str, str]:
     """
@@ -17,50 +25,102 @@ async def demo() -> Dict[str, str]:
     return {"message": f"Code Analysis Pipeline is running at {current_time}"}
 
 @router.post("/webhook")
-async def webhook(request: Request, background_tasks: BackgroundTasks) -> Dict[str, str]:
+async def webhook(request: Request) -> Dict[str, str]:
     """
     Receives GitHub webhook events.
     Verifies the signature.
-    Parses the payload.
-    Identifies the event type.
-    Runs the code review with static analysis if the payload action is 'opened' or 'synchronize' for a pull request.
+    Identifies the event type and the `action` field cheaply, acknowledging unhandled events without a full parse.
+    Drops redeliveries of already accepted `X-GitHub-Delivery` IDs.
+    Queues the code review with static analysis if the payload action is 'opened' or 'synchronize' for a pull request.
+    Queued reviews are scheduled fairly across repositories, smaller pull requests first (see review_scheduler).
+    Pushes to the default branch refresh the repository's retrieval index when RETRIEVAL_INDEX_ENABLED is set.
     """
+    ack_start = time.perf_counter()
     current_time = datetime.now().strftime('%I:%M %p IST on %B %d, %Y')
+    delivery_id = request.headers.get("X-GitHub-Delivery")
+    # Filled in once the payload is parsed; the language is the repository's primary language as GitHub reports it
+    ack_labels = {"repo": "unknown", "language": "unknown"}
+    deduplicator = get_delivery_deduplicator()
+    marked = False
     try:
         body = await request.body()
         await verify_signature(request, body)
-        payload = parse_webhook_payload(body)
         event_type = get_event_type(request)
 
-        if event_type == "pull_request":
-            action = payload.get("action")
-            pull_request = PullRequest.from_github_event(payload)
-            
-            if action in ["opened", "synchronize"]:
-                logger.info(f"Executing Gemini review on pull request: {pull_request.repository['full_name']}#{pull_request.number} (action: {action}) at {current_time}")
-                # Get the commit SHA from the payload
-                # For 'synchronize', it should be the latest commit SHA of the PR head
-                commit_sha = payload.get("after") or payload["pull_request"]["head"]["sha"]
-                
-                if commit_sha:
-                    logger.info(f"Executing review for files under commit: {commit_sha}")
-                
-                background_tasks.add_task(pull_request.gemini_review_request, commit_ref=commit_sha, project_wide=False, static_analysis_enabled=True)
-                return {"message": f"Pull request review initiated for {pull_request.repository['full_name']}#{pull_request.number} at {current_time}"}
-            else:
-                logger.info(f"Action '{action}' not handled for pull request at {current_time}")
-                return {"message": f"Action '{action}' received but not handled for pull request at {current_time}"}
-        
-        elif event_type == "ping":
+        if event_type == "ping":
             logger.info(f"Ping received at {current_time}")
             return {"message": f"pong at {current_time}"}
-        
-        else:
+
+        if event_type == "push" and get_settings().RETRIEVAL_INDEX_ENABLED:
+            if deduplicator.check_and_mark(delivery_id):
+                logger.info(f"Duplicate delivery {delivery_id} dropped at {current_time}")
+                return {"message": f"Delivery '{delivery_id}' already processed at {current_time}"}
+            marked = True
+            payload = parse_webhook_payload(body)
+            repository = payload.get("repository") or {}
+            ack_labels.update(repo=repository.get("full_name") or "unknown", language=repository.get("language") or "unknown")
+            if payload.get("deleted") or payload.get("ref") != f"refs/heads/{repository.get('default_branch')}":
+                logger.info(f"Push to '{payload.get('ref')}' is not to the default branch; retrieval index not refreshed at {current_time}")
+                return {"message": f"Push to '{payload.get('ref')}' received but not indexed at {current_time}"}
+            # Refreshes share the review workers; their cost grows with the number of files the push touched. Since they can
+            # run out of order, each one refreshes to the branch head as of when it runs rather than to this push.
+            touched_files = sum(len(commit.get(key) or []) for commit in payload.get("commits") or [] for key in ("added", "modified", "removed"))
+            get_review_scheduler().submit(
+                repository["full_name"], max(touched_files, 1) * get_settings().REVIEW_FILE_COST,
+                refresh_repository_branch, repository["full_name"], repository["default_branch"],
+            )
+            return {"message": f"Retrieval index refresh queued for {repository['full_name']}@{payload['after']} at {current_time}"}
+
+        if event_type != "pull_request":
             logger.info(f"Event type '{event_type}' received but not handled at {current_time}")
             return {"message": f"Event type '{event_type}' received but not handled at {current_time}"}
 
+        # Fast path: decide from the leading `action` key before paying for a full JSON parse
+        action = peek_action(body)
+        if action is not None and action not in HANDLED_PULL_REQUEST_ACTIONS:
+            logger.info(f"Action '{action}' not handled for pull request at {current_time}")
+            return {"message": f"Action '{action}' received but not handled for pull request at {current_time}"}
+
+        if deduplicator.check_and_mark(delivery_id):
+            logger.info(f"Duplicate delivery {delivery_id} dropped at {current_time}")
+            return {"message": f"Delivery '{delivery_id}' already processed at {current_time}"}
+        marked = True
+
+        payload = parse_webhook_payload(body)
+        repository = payload.get("repository") or {}
+        ack_labels.update(repo=repository.get("full_name") or "unknown", language=repository.get("language") or "unknown")
+        action = payload.get("action")
+        if action not in HANDLED_PULL_REQUEST_ACTIONS:
+            logger.info(f"Action '{action}' not handled for pull request at {current_time}")
+            return {"message": f"Action '{action}' received but not handled for pull request at {current_time}"}
+
+        pull_request = PullRequest.from_github_event(payload)
+        logger.info(f"Executing Gemini review on pull request: {pull_request.repository['full_name']}#{pull_request.number} (action: {action}) at {current_time}")
+        # Get the commit SHA from the payload
+        # For 'synchronize', it should be the latest commit SHA of the PR head
+        commit_sha = payload.get("after") or payload["pull_request"]["head"]["sha"]
+        
+        if commit_sha:
+            logger.info(f"Executing review for files under commit: {commit_sha}")
+        
+        # Reviews can be profiled (X-Profile header or sampling); the profile is saved under the delivery ID
+        repo_full_name = pull_request.repository["full_name"]
+        review_cost = estimate_review_cost(payload["pull_request"], get_settings().REVIEW_FILE_COST)
+        get_review_scheduler().submit(
+            repo_full_name, review_cost,
+            run_profiled, "webhook-review", new_request_id(delivery_id), should_profile(request.headers.get("X-Profile")),
+            pull_request.gemini_review_request, commit_ref=commit_sha, project_wide=False, static_analysis_enabled=True,
+        )
+        return {"message": f"Pull request review queued for {repo_full_name}#{pull_request.number} at {current_time}"}
+
     except HTTPException:
+        if marked:
+            deduplicator.forget(delivery_id)
         raise
     except Exception as e:
+        if marked:
+            deduplicator.forget(delivery_id)
         logger.error(f"Webhook error: {str(e)} at {current_time}", exc_info=True)
         raise HTTPException(status_code=500, detail=f"Webhook processing error: {str(e)}")
+    finally:
+        observe("webhook_ack_seconds", time.perf_counter() - ack_start, event=request.headers.get("X-GitHub-Event", "unknown"), **ack_labels)
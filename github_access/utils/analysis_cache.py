@@ -0,0 +1,125 @@
+from collections import OrderedDict
+from functools import lru_cache
+from typing import Iterable, List, Optional, Tuple
+import hashlib
+import logging
+import threading
+
+from config import get_settings
+from github_access.utils.metrics import increment, set_gauge
+from github_access.utils.result_codec import CODEC_VERSION, encode_result, decode_result
+from github_access.utils.static_analyzer import perform_static_analysis, StaticAnalysisResult, resolve_facets
+
+logger = logging.getLogger(__name__)
+
+
+def analysis_cache_key(file_content: str, ext: str, changed_ranges: Optional[List[Tuple[int, int]]] = None,
+                       context_radius: int = 3, facets: Optional[Iterable[str]] = None) -> str:
+    """
+    Builds a cache key from the content hash and every argument that affects the analysis result.
+    """
+    digest = hashlib.sha256(file_content.encode("utf-8", errors="surrogatepass"))
+    requested = ",".join(sorted(resolve_facets(facets) - {"parse"}))
+    ranges = ";".join(f"{start}-{end}" for start, end in changed_ranges or [])
+    radius = context_radius if changed_ranges else ""
+    return f"analysis:v{CODEC_VERSION}:{ext.lower()}:{requested}:{ranges}:{radius}:{digest.hexdigest()}"
+
+
+class AnalysisCache:
+    """
+    Caches encoded analysis results (see result_codec). Uses an in-memory LRU bounded by total bytes,
+    or Redis (shared by all workers) when a Redis URL is configured.
+    """
+
+    def __init__(self, max_bytes: int = 64 * 1024 * 1024, redis_url: Optional[str] = None, ttl_seconds: int = 3600):
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[str, bytes]" = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+        self._redis = None
+        if redis_url:
+            import redis  # Only required when the Redis-backed cache is enabled
+            self._redis = redis.Redis.from_url(redis_url)
+
+    def get(self, key: str) -> Optional[bytes]:
+        """
+        Returns the encoded result stored under the key, or None.
+        """
+        if self._redis is not None:
+            try:
+                return self._redis.get(key)
+            except Exception as e:
+                logger.warning(f"Redis analysis cache read failed, falling back to in-memory LRU: {str(e)}")
+        with self._lock:
+            data = self._entries.get(key)
+            if data is not None:
+                self._entries.move_to_end(key)
+            return data
+
+    def set(self, key: str, data: bytes) -> None:
+        """
+        Stores an encoded result, evicting the least recently used entries beyond `max_bytes`.
+        """
+        if self._redis is not None:
+            try:
+                self._redis.set(key, data, ex=self.ttl_seconds)
+                return
+            except Exception as e:
+                logger.warning(f"Redis analysis cache write failed, falling back to in-memory LRU: {str(e)}")
+        if len(data) > self.max_bytes:
+            return
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._size -= len(previous)
+            self._entries[key] = data
+            self._size += len(data)
+            while self._size > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self._size -= len(evicted)
+            set_gauge("analysis_cache_bytes", self._size)
+
+
+@lru_cache
+def get_analysis_cache() -> AnalysisCache:
+    """
+    Caches and returns the process-wide analysis result cache.
+    """
+    settings = get_settings()
+    return AnalysisCache(
+        max_bytes=settings.ANALYSIS_CACHE_MAX_BYTES,
+        redis_url=settings.REDIS_URL,
+        ttl_seconds=settings.ANALYSIS_CACHE_TTL_SECONDS,
+    )
+
+
+def cached_static_analysis(file_content: str, ext: str, changed_ranges: Optional[List[Tuple[int, int]]] = None,
+                           context_radius: int = 3, facets: Optional[Iterable[str]] = None) -> StaticAnalysisResult:
+    """
+    Same as `perform_static_analysis`, but reuses the result of an earlier analysis of identical content
+    with the same arguments. Disabled when ANALYSIS_CACHE_MAX_BYTES is 0.
+
+    Raises:
+        ValueError: If an unknown facet is requested.
+    """
+    if get_settings().ANALYSIS_CACHE_MAX_BYTES <= 0:
+        return perform_static_analysis(file_content, ext, changed_ranges=changed_ranges, context_radius=context_radius, facets=facets)
+
+    cache = get_analysis_cache()
+    key = analysis_cache_key(file_content, ext, changed_ranges, context_radius, facets)
+    data = cache.get(key)
+    if data is not None:
+        try:
+            result = decode_result(data)
+            increment("analysis_cache_requests_total", result="hit")
+            return result
+        except Exception as e:
+            logger.warning(f"Discarding unreadable cached analysis result {key}: {str(e)}")
+    increment("analysis_cache_requests_total", result="miss")
+
+    result = perform_static_analysis(file_content, ext, changed_ranges=changed_ranges, context_radius=context_radius, facets=facets)
+    # Results cut short by a timeout or resource limit may succeed on a later run, so they are not cached
+    if all(tool_error["error"] == "not_found" for tool_error in result.tool_errors):
+        cache.set(key, encode_result(result))
+    return result
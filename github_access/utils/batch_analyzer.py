@@ -0,0 +1,153 @@
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Dict, Iterator, List, Optional, Tuple
+import io
+import json
+import logging
+import os
+import tarfile
+import time
+import zipfile
+
+from github_access.utils.language_registry import supported_extensions
+from github_access.utils.analysis_cache import cached_static_analysis
+
+logger = logging.getLogger(__name__)
+
+class BatchLimitError(ValueError):
+    """
+    Raised when a batch exceeds the configured file count or size limits.
+    """
+
+def _is_archive_member_skipped(path: str) -> Optional[str]:
+    """
+    Returns the reason an archive member is not analyzed, or None if it should be.
+    """
+    parts = path.split("/")
+    if any(part.startswith(".") and part not in (".", "..") for part in parts[:-1]):
+        return "hidden directory"
+    if os.path.splitext(path)[1].lower() not in supported_extensions():
+        return "unsupported file type"
+    return None
+
+def _decode_source(data: bytes) -> Optional[str]:
+    """
+    Decodes a source file as UTF-8, returning None for binary content.
+    """
+    if b"\x00" in data[:8192]:
+        return None
+    try:
+        return data.decode("utf-8")
+    except UnicodeDecodeError:
+        return None
+
+def extract_archive_files(data: bytes, archive_name: str, max_files: int, max_file_bytes: int, max_total_bytes: int) -> Tuple[List[Dict[str, str]], List[Dict[str, str]]]:
+    """
+    Reads source files from a zip or (optionally compressed) tar archive without writing them to disk.
+    Member sizes are checked from the archive headers before anything is decompressed.
+
+    Args:
+        data (bytes): The uploaded archive.
+        archive_name (str): The uploaded file name, used to tell zip from tar.
+        max_files (int): Maximum number of source files accepted.
+        max_file_bytes (int): Source files larger than this are skipped.
+        max_total_bytes (int): Maximum decompressed size of all accepted source files.
+
+    Returns:
+        Tuple[List[Dict[str, str]], List[Dict[str, str]]]: (files as `{"filename", "code_content"}`,
+            skipped members as `{"filename", "reason"}`).
+
+    Raises:
+        BatchLimitError: If the archive holds more source files or bytes than allowed.
+        ValueError: If the upload is not a readable zip or tar archive.
+    """
+    files: List[Dict[str, str]] = []
+    skipped: List[Dict[str, str]] = []
+    total_bytes = 0
+
+    def accept(path: str, size: int, read) -> None:
+        nonlocal total_bytes
+        reason = _is_archive_member_skipped(path)
+        if reason is None and size > max_file_bytes:
+            reason = f"larger than {max_file_bytes} bytes"
+        if reason:
+            skipped.append({"filename": path, "reason": reason})
+            return
+        if len(files) >= max_files:
+            raise BatchLimitError(f"Archive contains more than {max_files} source files.")
+        total_bytes += size
+        if total_bytes > max_total_bytes:
+            raise BatchLimitError(f"Archive source files exceed {max_total_bytes} bytes.")
+        content = _decode_source(read())
+        if content is None:
+            skipped.append({"filename": path, "reason": "binary or non-UTF-8 content"})
+            return
+        files.append({"filename": path, "code_content": content})
+
+    if zipfile.is_zipfile(io.BytesIO(data)) or archive_name.lower().endswith(".zip"):
+        try:
+            with zipfile.ZipFile(io.BytesIO(data)) as archive:
+                for info in archive.infolist():
+                    if not info.is_dir():
+                        accept(info.filename, info.file_size, lambda info=info: archive.read(info))
+        except zipfile.BadZipFile as e:
+            raise ValueError(f"Invalid zip archive: {str(e)}")
+        return files, skipped
+
+    try:
+        with tarfile.open(fileobj=io.BytesIO(data), mode="r:*") as archive:
+            for member in archive:
+                if member.isfile():
+                    accept(member.name, member.size, lambda member=member: archive.extractfile(member).read())
+    except tarfile.TarError as e:
+        raise ValueError(f"Invalid tar archive: {str(e)}")
+    return files, skipped
+
+def _analyze_one(index: int, filename: str, code_content: str, facets: Optional[List[str]] = None) -> Tuple[bool, str]:
+    """
+    Analyzes a single file and returns (succeeded, NDJSON line). Failures are reported in the line rather than raised,
+    so one bad file does not abort the batch.
+    """
+    start = time.perf_counter()
+    ext = os.path.splitext(filename)[1].lower()
+    try:
+        result_json = cached_static_analysis(code_content, ext, facets=facets).model_dump_json()
+    except Exception as e:
+        logger.error(f"Batch analysis failed for {filename}: {str(e)}", exc_info=True)
+        return False, json.dumps({"index": index, "filename": filename, "status": "error", "error": str(e)}) + "\n"
+    # The already-serialized result is spliced in to avoid a second encode of the analysis result
+    header = json.dumps({"index": index, "filename": filename, "status": "ok", "seconds": round(time.perf_counter() - start, 4)})
+    return True, f'{header[:-1]}, "result": {result_json}}}\n'
+
+def iter_batch_analysis(files: List[Dict[str, str]], skipped: List[Dict[str, str]], concurrency: int) -> Iterator[str]:
+    """
+    Analyzes files on a thread pool and yields one NDJSON line per file as soon as it finishes
+    (in completion order, with its `index` in the request), followed by a summary line.
+    Skipped archive members are reported first.
+
+    Most of the analysis time is spent waiting on linter subprocesses, so threads (rather than processes)
+    are enough to keep several files in flight.
+    """
+    start = time.perf_counter()
+    for entry in skipped:
+        yield json.dumps({"index": None, "filename": entry["filename"], "status": "skipped", "reason": entry["reason"]}) + "\n"
+
+    failed = 0
+    executor = ThreadPoolExecutor(max_workers=max(1, concurrency), thread_name_prefix="batch-analysis")
+    try:
+        futures = [executor.submit(_analyze_one, index, entry["filename"], entry["code_content"], entry.get("facets")) for index, entry in enumerate(files)]
+        for future in as_completed(futures):
+            succeeded, line = future.result()
+            if not succeeded:
+                failed += 1
+            yield line
+    finally:
+        # Stops queued work if the client disconnects mid-stream
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    yield json.dumps({
+        "status": "done",
+        "files": len(files),
+        "failed": failed,
+        "skipped": len(skipped),
+        "seconds": round(time.perf_counter() - start, 4),
+    }) + "\n"
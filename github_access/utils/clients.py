@@ -0,0 +1,71 @@
+from functools import lru_cache
+import logging
+from datetime import datetime
+
+from config import get_settings
+from github_access.utils.language_registry import get_supported_languages
+
+logger = logging.getLogger(__name__)
+
+@lru_cache
+def get_github_client():
+    """
+    Authenticates as the GitHub App on first use and returns a cached client for its first installation.
+    Failures are not cached, so the next call retries authentication.
+    """
+    from github import Auth, GithubIntegration
+
+    settings = get_settings()
+    if settings.GITHUB_HTTP_CACHE_ENABLED or settings.GITHUB_RATE_LIMIT_PACING:
+        from github_access.utils.http_cache import install_github_connection
+        install_github_connection()
+    try:
+        auth = Auth.AppAuth(settings.GITHUB_APP_ID, settings.get_private_key())
+        gi = GithubIntegration(auth=auth)
+        installations = gi.get_installations()
+        if not installations:
+            logger.error("No installations found for GitHub App ID: %s", settings.GITHUB_APP_ID)
+            raise Exception("No installations found for the GitHub App. Please ensure the app is installed on a repository.")
+
+        installation = installations[0]
+        client = installation.get_github_for_installation()
+        logger.info("GitHub App authenticated successfully.")
+        return client
+    except Exception as e:
+        logger.error(f"GitHub authentication failed: {str(e)} at {datetime.now().strftime('%I:%M %p IST on %B %d, %Y')}", exc_info=True)
+        raise
+
+@lru_cache
+def configure_gemini() -> None:
+    """
+    Configures the Gemini API key once per process.
+    """
+    import google.generativeai as genai
+
+    genai.configure(api_key=get_settings().GEMINI_API_KEY)
+    logger.info("Gemini API configured.")
+
+@lru_cache
+def get_gemini_model(model_name: str = "gemini-1.5-flash"):
+    """
+    Returns a cached Gemini GenerativeModel, configuring the API on first use.
+    """
+    import google.generativeai as genai
+
+    configure_gemini()
+    return genai.GenerativeModel(model_name)
+
+def warm_up_clients() -> None:
+    """
+    Eagerly creates the shared GitHub client, Gemini client and grammar registry.
+    Intended for an optional startup hook; each failure is logged and left to be retried on first use.
+    """
+    for name, initializer in (
+        ("grammar registry", get_supported_languages),
+        ("Gemini client", get_gemini_model),
+        ("GitHub client", get_github_client),
+    ):
+        try:
+            initializer()
+        except Exception as e:
+            logger.warning(f"Warm-up of {name} failed; it will be initialized on first use: {str(e)}")
@@ -1,5 +1,5 @@
 import re
-from typing import Dict, Any
+from typing import Dict, Any, List, Tuple
 
 def find_line_info(diff_text: str, target_line: str) -> Dict[str, Any]:
     """
@@ -55,3 +55,56 @@ def find_line_info(diff_text: str, target_line: str) -> Dict[str, Any]:
     
     return {"line": 1, "start_line": 1, "start_side": "RIGHT", "side": "RIGHT"}
 
+
+def get_changed_line_ranges(diff_text: str) -> List[Tuple[int, int]]:
+    """
+    Extracts the new-file line ranges covered by each hunk of a unified diff.
+    Args:
+        diff_text (str): The diff text (e.g. `file_data.patch`).
+    Returns:
+        List[Tuple[int, int]]: 1-based, inclusive (start, end) line ranges on the RIGHT side.
+        Pure deletions yield a single-line range at the position where lines were removed.
+    """
+    ranges = []
+    for line in diff_text.splitlines():
+        match = re.match(r"^@@ -\d+(?:,\d+)? \+(\d+)(?:,(\d+))? @@", line)
+        if match:
+            start = int(match.group(1))
+            count = int(match.group(2)) if match.group(2) is not None else 1
+            ranges.append((max(start, 1), max(start + count - 1, start, 1)))
+    return ranges
+
+
+def get_commentable_lines(diff_text: str) -> Dict[Tuple[str, int], int]:
+    """
+    Lists the diff positions a review comment can be attached to.
+    Args:
+        diff_text (str): The diff text (e.g. `file_data.patch`).
+    Returns:
+        Dict[Tuple[str, int], int]: Maps (side, line) to the index of the hunk containing it, where side is
+        "RIGHT" for added/context lines (new-file numbering) and "LEFT" for removed/context lines (old-file numbering).
+    """
+    positions = {}
+    hunk_index = -1
+    old_lineno = new_lineno = 0
+    for line in diff_text.splitlines():
+        if line.startswith("@@"):
+            match = re.match(r"^@@ -(\d+)(?:,\d+)? \+(\d+)(?:,\d+)? @@", line)
+            if match:
+                hunk_index += 1
+                old_lineno, new_lineno = int(match.group(1)), int(match.group(2))
+            continue
+        if hunk_index < 0 or line.startswith("\\"):
+            continue
+        if line.startswith("+"):
+            positions[("RIGHT", new_lineno)] = hunk_index
+            new_lineno += 1
+        elif line.startswith("-"):
+            positions[("LEFT", old_lineno)] = hunk_index
+            old_lineno += 1
+        else:
+            positions[("RIGHT", new_lineno)] = hunk_index
+            positions[("LEFT", old_lineno)] = hunk_index
+            old_lineno += 1
+            new_lineno += 1
+    return positions
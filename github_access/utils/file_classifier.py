@@ -0,0 +1,175 @@
+from fnmatch import fnmatchcase
+from typing import Dict, Iterable, List, Optional, Tuple
+import logging
+import posixpath
+import re
+
+logger = logging.getLogger(__name__)
+
+# Directories holding third-party code, matched as any path component.
+VENDORED_DIRECTORIES = frozenset({
+    "vendor", "vendors", "node_modules", "third_party", "third-party", "thirdparty", "bower_components",
+    "site-packages", ".venv", "venv", "Pods", "Carthage",
+})
+
+# Directories holding build output or generated code.
+GENERATED_DIRECTORIES = frozenset({"dist", "__generated__", "generated"})
+
+# File name patterns of generated or minified code.
+GENERATED_NAME_PATTERNS = (
+    "*_pb2.py", "*_pb2_grpc.py", "*_pb2.pyi", "*.pb.go", "*.pb.gw.go", "*_grpc.pb.go", "*.pb.js", "*_pb.js", "*_pb.d.ts",
+    "*.generated.*", "*.g.dart", "*_generated.go", "*.gen.go", "zz_generated*.go", "bindata.go", "*.designer.*",
+)
+MINIFIED_NAME_PATTERNS = ("*.min.js", "*.min.mjs", "*-min.js", "*.bundle.js", "bundle.js", "*.chunk.js")
+
+# Headers generators actually emit: Go's "Code generated ... DO NOT EDIT." line, the @generated tag and protoc's
+# banner. Looser phrases such as "auto-generated" or "do not edit" also appear in hand-written files.
+GENERATED_MARKERS = re.compile(
+    r"^\W*Code generated .* DO NOT EDIT\.\s*$|@generated\b|Generated by the protocol buffer compiler\.\s+DO NOT EDIT",
+    re.MULTILINE,
+)
+
+# Only the head of a file is scanned for generated markers and binary content.
+SNIFF_BYTES = 8192
+
+# Bytes that do not occur in text files (everything below 0x20 except tab, newline, form feed and carriage return, plus DEL).
+_BINARY_BYTES = bytes(set(range(0x20)) - {0x09, 0x0A, 0x0C, 0x0D}) + b"\x7f"
+
+
+def parse_gitattributes(text: str) -> List[Tuple[str, Dict[str, bool]]]:
+    """
+    Parses the `linguist-generated` and `linguist-vendored` attributes of a `.gitattributes` file.
+
+    Returns:
+        List[Tuple[str, Dict[str, bool]]]: (pattern, {attribute: set or unset}) in file order; later lines win.
+    """
+    rules = []
+    for line in text.splitlines():
+        line = line.strip()
+        if not line or line.startswith("#"):
+            continue
+        pattern, *attributes = line.split()
+        flags = {}
+        for attribute in attributes:
+            name, _, value = attribute.lstrip("-!").partition("=")
+            if name not in ("linguist-generated", "linguist-vendored"):
+                continue
+            flags[name] = not attribute.startswith(("-", "!")) and value.lower() not in ("false", "0")
+        if flags:
+            rules.append((pattern, flags))
+    return rules
+
+
+def _gitattributes_match(pattern: str, path: str) -> bool:
+    """
+    Matches a path the way git matches `.gitattributes` patterns: a pattern without a slash matches the
+    file name at any depth, otherwise the path relative to the repository root (`**` spans directories).
+    """
+    pattern = pattern.lstrip("/") if "/" in pattern.rstrip("/") else pattern
+    if pattern.endswith("/"):
+        pattern += "**"
+    if "/" not in pattern:
+        return fnmatchcase(posixpath.basename(path), pattern)
+    if fnmatchcase(path, pattern):
+        return True
+    # `dir/**` also matches files directly inside dir, and `**/x` matches x at the root
+    return fnmatchcase(path, pattern.replace("/**/", "/")) or (pattern.startswith("**/") and fnmatchcase(path, pattern[3:]))
+
+
+def gitattributes_flags(path: str, rules: List[Tuple[str, Dict[str, bool]]]) -> Dict[str, bool]:
+    """
+    Returns the linguist attributes that apply to a path.
+    """
+    flags: Dict[str, bool] = {}
+    for pattern, rule_flags in rules:
+        if _gitattributes_match(pattern, path):
+            flags.update(rule_flags)
+    return flags
+
+
+def looks_binary(data: bytes) -> bool:
+    """
+    Sniffs the head of a file: binary if it contains NUL bytes or more than 10% control bytes.
+    """
+    sample = data[:SNIFF_BYTES]
+    if not sample:
+        return False
+    if b"\x00" in sample:
+        return True
+    return len(sample) - len(sample.translate(None, _BINARY_BYTES)) > len(sample) // 10
+
+
+class FileClassifier:
+    """
+    Decides before any analysis or model call whether a changed file is worth reviewing.
+    `classify_path` uses only the path (and `.gitattributes`), so it runs before the content is fetched;
+    `classify_content` looks at size, binary bytes, generated-file markers and line-length statistics.
+    Both return a skip reason (`vendored`, `generated`, `minified`, `binary`, `too_large`) or None.
+    """
+
+    def __init__(self, gitattributes: Optional[str] = None, extra_skip_patterns: Iterable[str] = (),
+                 max_file_bytes: int = 524288, minified_line_length: int = 1000):
+        self.rules = parse_gitattributes(gitattributes or "")
+        self.extra_skip_patterns = tuple(extra_skip_patterns)
+        self.max_file_bytes = max_file_bytes
+        self.minified_line_length = minified_line_length
+
+    def classify_path(self, path: str) -> Optional[str]:
+        flags = gitattributes_flags(path, self.rules)
+        if flags.get("linguist-generated"):
+            return "generated"
+        if flags.get("linguist-vendored"):
+            return "vendored"
+        explicitly_kept = flags.get("linguist-generated") is False or flags.get("linguist-vendored") is False
+        if explicitly_kept:
+            return None
+        directories = path.split("/")[:-1]
+        if any(directory in VENDORED_DIRECTORIES for directory in directories):
+            return "vendored"
+        if any(directory in GENERATED_DIRECTORIES for directory in directories):
+            return "generated"
+        if any(_gitattributes_match(pattern, path) for pattern in self.extra_skip_patterns):
+            return "vendored"
+        name = posixpath.basename(path)
+        if any(fnmatchcase(name, pattern) for pattern in GENERATED_NAME_PATTERNS):
+            return "generated"
+        if any(fnmatchcase(name, pattern) for pattern in MINIFIED_NAME_PATTERNS):
+            return "minified"
+        return None
+
+    def classify_content(self, path: str, data: bytes) -> Optional[str]:
+        if len(data) > self.max_file_bytes:
+            return "too_large"
+        if looks_binary(data):
+            return "binary"
+        head = data[:SNIFF_BYTES].decode("utf-8", errors="replace")
+        # Generated-code markers are only trusted near the top, where generators put them
+        if GENERATED_MARKERS.search("\n".join(head.splitlines()[:15])):
+            return "generated"
+        line_count = data.count(b"\n") + 1
+        longest_line = max((len(line) for line in data.split(b"\n")), default=0)
+        if longest_line > self.minified_line_length and len(data) / line_count > self.minified_line_length / 5:
+            return "minified"
+        return None
+
+
+def decode_source(data: bytes) -> str:
+    """
+    Decodes text that `FileClassifier` did not reject as binary: UTF-8 (with or without BOM), otherwise
+    latin-1, which covers legacy single-byte encodings without losing characters.
+    """
+    try:
+        return data.decode("utf-8-sig")
+    except UnicodeDecodeError:
+        return data.decode("latin-1")
+
+
+def format_skipped_summary(skipped: Dict[str, List[str]]) -> str:
+    """
+    Describes the skipped files for the review body, e.g. "Skipped 3 files: 2 generated, 1 vendored."
+    """
+    total = sum(len(paths) for paths in skipped.values())
+    if not total:
+        return ""
+    counts = ", ".join(f"{len(paths)} {reason.replace('_', ' ')}" for reason, paths in sorted(skipped.items(), key=lambda item: -len(item[1])))
+    return f"Skipped {total} file{'s' if total != 1 else ''}: {counts}."
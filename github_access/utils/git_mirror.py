@@ -0,0 +1,338 @@
+from contextlib import contextmanager
+from functools import lru_cache
+from typing import Iterator, List, Optional, Tuple
+import base64
+import fcntl
+import logging
+import os
+import re
+import shutil
+import subprocess
+import threading
+import time
+
+from config import get_settings
+from github_access.utils.metrics import increment, observe, set_gauge
+from github_access.utils.pr_snapshot import MANIFEST_PATHS, PullRequestSnapshot, SnapshotFile
+
+logger = logging.getLogger(__name__)
+
+# Git's well-known empty tree; the base of a root commit's diff.
+EMPTY_TREE_SHA = "4b825dc642cb6eb9a060e54bf8d69288fbee4904"
+# File inside a mirror whose mtime records its last use, for LRU eviction.
+LAST_USED_MARKER = "mirror-last-used"
+# Mode of submodule entries (gitlinks); their SHAs are commits of another repository.
+GITLINK_MODE = "160000"
+# Bits of a git mode that hold the entry kind (regular file, symlink, gitlink).
+MODE_KIND_MASK = 0o170000
+
+# Statuses of `git diff --raw` mapped to the file statuses of GitHub's API.
+DIFF_STATUSES = {"A": "added", "D": "removed", "M": "modified", "R": "renamed", "C": "copied", "T": "changed"}
+
+_REPO_NAME_PATTERN = re.compile(r"^[A-Za-z0-9_.-]+/[A-Za-z0-9_.-]+$")
+
+
+class GitMirrorError(Exception):
+    """
+    Raised when a git command on a mirror fails or a mirror lacks the commits it was asked for.
+    """
+
+
+def pull_request_refspecs(number: int, base_ref: str) -> List[str]:
+    """
+    Refspecs that bring a pull request's head and its base branch into a mirror.
+    """
+    return [f"+refs/pull/{number}/head:refs/pull/{number}/head", f"+refs/heads/{base_ref}:refs/heads/{base_ref}"]
+
+
+def _directory_size(path: str) -> int:
+    total = 0
+    for directory, _, filenames in os.walk(path):
+        for filename in filenames:
+            try:
+                total += os.lstat(os.path.join(directory, filename)).st_size
+            except OSError:
+                pass
+    return total
+
+
+def _split_patch(section: str) -> Tuple[Optional[str], int, int]:
+    # Drops the `diff --git` header lines; GitHub's `patch` field starts at the first hunk
+    start = section.find("\n@@")
+    if start < 0:
+        return None, 0, 0
+    patch = section[start + 1:].rstrip("\n")
+    additions = deletions = 0
+    for line in patch.splitlines():
+        if line.startswith("+"):
+            additions += 1
+        elif line.startswith("-"):
+            deletions += 1
+    return patch, additions, deletions
+
+
+class GitMirrorCache:
+    """
+    Bare mirrors of reviewed repositories under `root`, one per repository (`root/owner/name.git`).
+
+    Pull request diffs and file contents are computed locally, so large diffs are not cut off like the API's `patch`
+    field and reading a file costs no API request. Each sync fetches only objects the mirror does not have yet.
+    Mirrors are locked with `flock`, shared for reads and exclusive for fetches and eviction, so the workers of one
+    host can share `root`. Once the mirrors exceed `max_bytes`, the least recently used ones are deleted.
+
+    `remote_url_template` is formatted with `repo` (the repository's full name); a `file://` template lets the
+    cache run against local fixture repositories.
+    """
+
+    def __init__(self, root: str, max_bytes: int, remote_url_template: str = "https://github.com/{repo}.git",
+                 timeout: float = 600.0):
+        self.root = root
+        self.max_bytes = max_bytes
+        self.remote_url_template = remote_url_template
+        self.timeout = timeout
+        self._evict_lock = threading.Lock()
+
+    def mirror_path(self, repo_name: str) -> str:
+        if not _REPO_NAME_PATTERN.match(repo_name) or any(part in (".", "..") for part in repo_name.split("/")):
+            raise ValueError(f"Invalid repository name: {repo_name!r}")
+        owner, name = repo_name.split("/")
+        return os.path.join(self.root, owner, f"{name}.git")
+
+    @contextmanager
+    def _locked(self, path: str, shared: bool = False, blocking: bool = True) -> Iterator[bool]:
+        # Yields whether the lock was acquired; only a non-blocking attempt can fail
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(f"{path}.lock", "a") as lock_file:
+            try:
+                fcntl.flock(lock_file, (fcntl.LOCK_SH if shared else fcntl.LOCK_EX) | (0 if blocking else fcntl.LOCK_NB))
+            except BlockingIOError:
+                yield False
+                return
+            try:
+                yield True
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _run(self, path: Optional[str], args: List[str], env: Optional[dict] = None) -> subprocess.CompletedProcess:
+        command = ["git", "--git-dir", path, *args] if path else ["git", *args]
+        try:
+            return subprocess.run(command, capture_output=True, timeout=self.timeout, env=env)
+        except subprocess.TimeoutExpired:
+            raise GitMirrorError(f"git {args[0]} timed out after {self.timeout:.0f}s")
+        except FileNotFoundError:
+            raise GitMirrorError("git is not installed")
+
+    def _git(self, path: Optional[str], args: List[str], env: Optional[dict] = None) -> bytes:
+        completed = self._run(path, args, env=env)
+        if completed.returncode != 0:
+            raise GitMirrorError(f"git {args[0]} failed: {completed.stderr.decode('utf-8', errors='replace').strip()}")
+        return completed.stdout
+
+    def _fetch_env(self, token: Optional[str]) -> dict:
+        env = dict(os.environ, GIT_TERMINAL_PROMPT="0")
+        if token:
+            # Passed through the environment rather than the URL or argv, so it never shows up in process listings
+            credentials = base64.b64encode(f"x-access-token:{token}".encode("utf-8")).decode("ascii")
+            env.update({"GIT_CONFIG_COUNT": "1", "GIT_CONFIG_KEY_0": "http.extraHeader",
+                        "GIT_CONFIG_VALUE_0": f"Authorization: Basic {credentials}"})
+        return env
+
+    def _touch(self, path: str) -> None:
+        with open(os.path.join(path, LAST_USED_MARKER), "a"):
+            pass
+        os.utime(os.path.join(path, LAST_USED_MARKER))
+
+    def sync(self, repo_name: str, refspecs: List[str], token: Optional[str] = None) -> None:
+        """
+        Creates the repository's mirror if needed and fetches `refspecs` into it, then evicts other mirrors
+        if the cache is over its size limit.
+
+        Raises:
+            GitMirrorError: If git fails.
+        """
+        path = self.mirror_path(repo_name)
+        with self._locked(path):
+            if not os.path.isdir(path):
+                self._git(None, ["init", "--bare", "--quiet", path])
+            fetch_start = time.perf_counter()
+            self._git(path, ["fetch", "--quiet", "--no-tags", self.remote_url_template.format(repo=repo_name), *refspecs],
+                      env=self._fetch_env(token))
+            observe("git_mirror_fetch_seconds", time.perf_counter() - fetch_start, repo=repo_name)
+            self._touch(path)
+        self.evict(keep=path)
+
+    def has_commit(self, repo_name: str, sha: str) -> bool:
+        path = self.mirror_path(repo_name)
+        if not os.path.isdir(path):
+            return False
+        with self._locked(path, shared=True):
+            return self._run(path, ["cat-file", "-e", f"{sha}^{{commit}}"]).returncode == 0
+
+    def ensure_commits(self, repo_name: str, shas: List[str], refspecs: List[str], token: Optional[str] = None) -> None:
+        """
+        Makes sure the mirror has all `shas`, fetching `refspecs` only if one of them is missing.
+
+        Raises:
+            GitMirrorError: If git fails or a commit is still missing after the fetch (e.g. after a force push).
+        """
+        if all(self.has_commit(repo_name, sha) for sha in shas):
+            self._touch(self.mirror_path(repo_name))
+            return
+        self.sync(repo_name, refspecs, token=token)
+        missing = [sha for sha in shas if not self.has_commit(repo_name, sha)]
+        if missing:
+            raise GitMirrorError(f"Mirror of {repo_name} lacks {', '.join(missing)} after fetching {', '.join(refspecs)}")
+
+    def commit_parent(self, repo_name: str, sha: str) -> str:
+        """
+        Returns the first parent of a commit, or the empty tree for a root commit.
+        """
+        path = self.mirror_path(repo_name)
+        with self._locked(path, shared=True):
+            completed = self._run(path, ["rev-parse", "--verify", "--quiet", f"{sha}^"])
+        return completed.stdout.decode("ascii").strip() if completed.returncode == 0 else EMPTY_TREE_SHA
+
+    def diff(self, repo_name: str, base: str, head: str, merge_base: bool = True) -> List[SnapshotFile]:
+        """
+        Computes the changed files between two commits with rename detection, shaped like the API's pull request
+        files: full patches (from the first hunk), statuses, blob SHAs and line counts. Contents are read from the
+        mirror on first access. Submodule changes are left out.
+
+        Args:
+            repo_name (str): The repository's full name.
+            base (str): The base commit.
+            head (str): The head commit.
+            merge_base (bool): Diff from the merge base of `base` and `head`, as GitHub does for pull requests.
+
+        Raises:
+            GitMirrorError: If git fails.
+        """
+        path = self.mirror_path(repo_name)
+        with self._locked(path, shared=True):
+            if merge_base:
+                completed = self._run(path, ["merge-base", base, head])
+                if completed.returncode == 0:
+                    base = completed.stdout.decode("ascii").strip()
+            raw = self._git(path, ["diff", "--raw", "-z", "--find-renames", "--no-abbrev", base, head])
+            patches = self._git(path, ["diff", "--find-renames", "--no-color", "--no-ext-diff", "--unified=3", base, head])
+
+        # Both diffs come from the same diff queue, so their entries are in the same order. A change between entry
+        # kinds (file, symlink, submodule) is one raw `T` entry but a deletion and a creation in the patch.
+        sections = re.split(r"^diff --git ", patches.decode("utf-8", errors="replace"), flags=re.M)[1:]
+        tokens = raw.decode("utf-8", errors="surrogateescape").split("\0")
+        files = []
+        position = 0
+        section_index = 0
+        while position < len(tokens) and tokens[position]:
+            if not tokens[position].startswith(":"):
+                raise GitMirrorError(f"Unexpected diff output for {repo_name} {base}..{head}")
+            old_mode, new_mode, _, new_sha, status = tokens[position][1:].split(" ")
+            previous_filename = None
+            if status[0] in ("R", "C"):
+                previous_filename, filename = tokens[position + 1], tokens[position + 2]
+                position += 3
+            else:
+                filename = tokens[position + 1]
+                position += 2
+            kind_changed = int(old_mode, 8) and int(new_mode, 8) and (int(old_mode, 8) ^ int(new_mode, 8)) & MODE_KIND_MASK
+            entry_sections = sections[section_index:section_index + (2 if kind_changed else 1)]
+            section_index += len(entry_sections)
+            if len(entry_sections) != (2 if kind_changed else 1):
+                raise GitMirrorError(f"Unexpected diff output for {repo_name} {base}..{head}")
+            if new_mode == GITLINK_MODE:
+                continue
+            # The patch of a kind change is the creation of the new entry; the old one's lines count as deletions
+            patch, additions, deletions = _split_patch(entry_sections[-1])
+            if kind_changed:
+                deletions += _split_patch(entry_sections[0])[2]
+            files.append(SnapshotFile(
+                filename, DIFF_STATUSES.get(status[0], "modified"), patch, new_sha, additions=additions, deletions=deletions,
+                loader=lambda sha=new_sha: self.read_blob(repo_name, sha), previous_filename=previous_filename,
+            ))
+        if section_index != len(sections):
+            raise GitMirrorError(f"Unexpected diff output for {repo_name} {base}..{head}")
+        return files
+
+    def read_blob(self, repo_name: str, sha: str) -> bytes:
+        path = self.mirror_path(repo_name)
+        with self._locked(path, shared=True):
+            return self._git(path, ["cat-file", "blob", sha])
+
+    def read_text(self, repo_name: str, ref: str, file_path: str) -> Optional[str]:
+        """
+        Returns a file's text at a commit, or None if it does not exist there.
+        """
+        path = self.mirror_path(repo_name)
+        with self._locked(path, shared=True):
+            completed = self._run(path, ["cat-file", "blob", f"{ref}:{file_path}"])
+        return completed.stdout.decode("utf-8", errors="replace") if completed.returncode == 0 else None
+
+    def evict(self, keep: Optional[str] = None) -> int:
+        """
+        Deletes the least recently used mirrors until the cache fits in `max_bytes`. The mirror at `keep` and mirrors
+        in use are skipped. Returns the number of mirrors deleted.
+        """
+        with self._evict_lock:
+            mirrors = []
+            if os.path.isdir(self.root):
+                for owner in os.scandir(self.root):
+                    if not owner.is_dir():
+                        continue
+                    for entry in os.scandir(owner.path):
+                        if entry.is_dir() and entry.name.endswith(".git"):
+                            marker = os.path.join(entry.path, LAST_USED_MARKER)
+                            last_used = os.path.getmtime(marker) if os.path.exists(marker) else entry.stat().st_mtime
+                            mirrors.append((last_used, entry.path, _directory_size(entry.path)))
+            total = sum(size for _, _, size in mirrors)
+            evicted = 0
+            for _, path, size in sorted(mirrors):
+                if total <= self.max_bytes:
+                    break
+                if path == keep:
+                    continue
+                with self._locked(path, blocking=False) as acquired:
+                    if not acquired:
+                        continue
+                    shutil.rmtree(path, ignore_errors=True)
+                total -= size
+                evicted += 1
+                increment("git_mirror_evicted_total")
+                logger.info(f"Evicted git mirror {path} ({size} bytes) to stay under {self.max_bytes} bytes.")
+            set_gauge("git_mirror_bytes", total)
+            return evicted
+
+
+def snapshot_from_mirror(mirror: GitMirrorCache, repo_name: str, pull_request, token: Optional[str] = None,
+                         commit_sha: Optional[str] = None) -> PullRequestSnapshot:
+    """
+    Builds a pull request snapshot from the repository's mirror, fetching the pull request's head and base branch
+    first if the mirror lacks their commits. With `commit_sha`, the snapshot holds the changes of that commit alone.
+    Dependency manifests are read at the base commit and `.gitattributes` at the head. Removed files are left out.
+
+    Raises:
+        GitMirrorError: If git fails or the commits cannot be fetched.
+    """
+    head_sha = commit_sha or pull_request.head.sha
+    base_sha = pull_request.base.sha
+    mirror.ensure_commits(repo_name, [base_sha, head_sha], pull_request_refspecs(pull_request.number, pull_request.base.ref), token=token)
+    if commit_sha:
+        changed = mirror.diff(repo_name, mirror.commit_parent(repo_name, commit_sha), commit_sha, merge_base=False)
+    else:
+        changed = mirror.diff(repo_name, base_sha, head_sha)
+    files = [file for file in changed if file.status != "removed"]
+    manifests = {path: mirror.read_text(repo_name, base_sha, path) for path in MANIFEST_PATHS}
+    return PullRequestSnapshot(
+        repo_name, pull_request.number, head_sha, base_sha, files, manifests, mirror.read_text(repo_name, head_sha, ".gitattributes")
+    )
+
+
+@lru_cache
+def get_git_mirror_cache() -> GitMirrorCache:
+    """
+    Caches and returns the process-wide git mirror cache.
+    """
+    settings = get_settings()
+    return GitMirrorCache(
+        settings.GIT_MIRROR_ROOT, settings.GIT_MIRROR_MAX_BYTES,
+        remote_url_template=settings.GIT_MIRROR_REMOTE_URL, timeout=settings.GIT_MIRROR_TIMEOUT_SECONDS,
+    )
@@ -0,0 +1,133 @@
+from concurrent.futures import ThreadPoolExecutor
+from pydantic import BaseModel
+from typing import Any, Dict, List, Set, Tuple
+import logging
+import posixpath
+import time
+
+from github import InputGitTreeElement
+from github.GithubException import GithubException
+
+from github_access.utils.github_fetcher import git_blob_sha
+from github_access.utils.metrics import increment
+from github_access.utils.rate_limiter import propagate_github_priority
+
+logger = logging.getLogger(__name__)
+
+# Statuses GitHub answers a ref update with when the branch moved and the new commit is no longer a fast-forward.
+REF_CONFLICT_STATUSES = (409, 422)
+# Modes of existing files kept when they are overwritten; anything else (symlinks, submodules) becomes a regular file.
+KEPT_FILE_MODES = ("100644", "100755")
+
+
+class CommitResult(BaseModel):
+    commit_sha: str
+    changed_files: List[str] = []
+    unchanged_files: List[str] = []
+    attempts: int = 0
+
+
+def normalize_commit_path(path: str) -> str:
+    """
+    Validates a repository-relative file path.
+
+    Raises:
+        ValueError: If the path is empty, absolute or leaves the repository.
+    """
+    normalized = posixpath.normpath(path)
+    if not path or path.startswith("/") or normalized in (".", "") or normalized.split("/")[0] == ".." or "/.git/" in f"/{normalized}/":
+        raise ValueError(f"Invalid file path: {path!r}")
+    return normalized
+
+
+def _tree_entries(repo, tree_sha: str) -> Tuple[Dict[str, Dict[str, str]], Any]:
+    # One request for the whole tree; paths missing from a truncated listing are simply treated as changed
+    tree = repo.get_git_tree(tree_sha, recursive=True)
+    if tree.raw_data.get("truncated"):
+        logger.warning(f"Tree {tree_sha} is truncated; unlisted files are committed without a change check.")
+    return {entry.path: {"sha": entry.sha, "mode": entry.mode} for entry in tree.tree if entry.type == "blob"}, tree
+
+
+def commit_files(repo, repo_name: str, branch: str, files: Dict[str, str], message: str, concurrency: int = 8, max_attempts: int = 5) -> CommitResult:
+    """
+    Commits several files to a branch as one commit.
+
+    Blob SHAs are computed locally, so files whose content is already on the branch are skipped. The remaining blobs
+    are created concurrently, then one tree and one commit are built on the branch head. The ref is moved without
+    `force`, which GitHub only accepts as a fast-forward, i.e. when the branch still points at the commit's parent.
+    If another commit landed in between, the tree and commit are rebuilt on the new head (reusing the blobs) and the
+    update is retried, up to `max_attempts` times.
+
+    Args:
+        repo: The PyGithub repository (may be lazy).
+        repo_name (str): The repository's full name.
+        branch (str): The branch to commit to.
+        files (Dict[str, str]): File contents (UTF-8 text) by repository-relative path.
+        message (str): The commit message.
+        concurrency (int): Blobs created in parallel.
+        max_attempts (int): Ref updates tried before giving up on a moving branch.
+
+    Returns:
+        CommitResult: The new commit (or the unchanged head if no file changed) and which files changed.
+
+    Raises:
+        ValueError: If a path is invalid or appears twice.
+        GithubException: If a GitHub request fails or the branch kept moving for `max_attempts` updates.
+        RuntimeError: If GitHub stored a blob under a different SHA than its content has.
+    """
+    contents: Dict[str, bytes] = {}
+    for path, content in files.items():
+        normalized = normalize_commit_path(path)
+        if normalized in contents:
+            raise ValueError(f"File path given more than once: {path!r}")
+        contents[normalized] = content.encode("utf-8")
+    blob_shas = {path: git_blob_sha(content) for path, content in contents.items()}
+
+    ref = repo.get_git_ref(f"heads/{branch}")
+    created: Set[str] = set()
+    for attempt in range(1, max_attempts + 1):
+        head = repo.get_git_commit(ref.object.sha)
+        existing, base_tree = _tree_entries(repo, head.tree.sha)
+        changed = [path for path in contents if existing.get(path, {}).get("sha") != blob_shas[path]]
+        unchanged = [path for path in contents if path not in changed]
+        if not changed:
+            logger.info(f"No changes to commit to {repo_name}/{branch}; {len(unchanged)} file(s) already up to date.")
+            increment("github_commit_files_total", len(unchanged), result="unchanged")
+            return CommitResult(commit_sha=head.sha, unchanged_files=unchanged, attempts=attempt)
+
+        # Blobs are content-addressed, so ones created on an earlier attempt stay valid after a conflict
+        missing = [path for path in changed if blob_shas[path] not in created]
+        if missing:
+            def create_blob(path: str) -> None:
+                blob = repo.create_git_blob(contents[path].decode("utf-8"), "utf-8")
+                if blob.sha != blob_shas[path]:
+                    raise RuntimeError(f"GitHub stored {path} as blob {blob.sha}, expected {blob_shas[path]}; nothing was committed.")
+                created.add(blob.sha)
+            with ThreadPoolExecutor(max_workers=max(1, min(concurrency, len(missing))), thread_name_prefix="commit-blobs") as executor:
+                list(executor.map(propagate_github_priority(create_blob), missing))
+
+        tree = repo.create_git_tree([
+            InputGitTreeElement(
+                path,
+                existing[path]["mode"] if existing.get(path, {}).get("mode") in KEPT_FILE_MODES else "100644",
+                "blob",
+                sha=blob_shas[path],
+            )
+            for path in changed
+        ], base_tree=base_tree)
+        commit = repo.create_git_commit(message=message, tree=tree, parents=[head])
+        try:
+            ref.edit(commit.sha, force=False)
+        except GithubException as e:
+            if e.status not in REF_CONFLICT_STATUSES or attempt == max_attempts:
+                raise
+            increment("github_commit_ref_conflicts_total")
+            logger.info(f"{repo_name}/{branch} moved during commit (attempt {attempt}); rebuilding on the new head.")
+            time.sleep(min(0.25 * 2 ** (attempt - 1), 4.0))
+            ref = repo.get_git_ref(f"heads/{branch}")
+            continue
+
+        increment("github_commit_files_total", len(changed), result="changed")
+        increment("github_commit_files_total", len(unchanged), result="unchanged")
+        logger.info(f"Committed {len(changed)} file(s) to {repo_name}/{branch} as {commit.sha} ({len(unchanged)} unchanged).")
+        return CommitResult(commit_sha=commit.sha, changed_files=changed, unchanged_files=unchanged, attempts=attempt)
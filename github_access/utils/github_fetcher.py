@@ -2,8 +2,13 @@ from github import Auth, GithubIntegration
 from github.GithubException import GithubException
 from config import get_settings
 from fastapi import HTTPException, status
+from typing import Dict, Iterable
+import base64
+import hashlib
 import logging
+import os
 import github 
+from github_access.utils.metrics import timed
 
 logger = logging.getLogger(__name__)
 
@@ -109,7 +114,8 @@ def fetch_file_content(repo_full_name: str, path: str, ref: str = "main") -> str
     try:
         github_instance = get_repo_installation(repo_full_name)
         repo = github_instance.get_repo(repo_full_name)
-        contents = repo.get_contents(path, ref=ref)
+        with timed("github_file_fetch_seconds", repo=repo_full_name):
+            contents = repo.get_contents(path, ref=ref)
 
         if isinstance(contents, list):
             # If it's a directory or multiple files, raise an error
@@ -130,3 +136,59 @@ def fetch_file_content(repo_full_name: str, path: str, ref: str = "main") -> str
         logger.error(f"Unexpected error fetching file content from {repo_full_name}/{path}@{ref}: {type(e).__name__}: {str(e)}", exc_info=True)
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=f"Internal server error: {str(e)}")
 
+def list_tree_blobs(repo, commit_sha: str, extensions: Iterable[str], max_file_bytes: int, max_files: int, repo_name: str = "") -> Dict[str, str]:
+    """
+    Lists the files of a commit with one recursive git tree request.
+
+    Args:
+        repo: The PyGithub repository.
+        commit_sha (str): The commit (or tree) to list.
+        extensions (Iterable[str]): Lower-case extensions to keep.
+        max_file_bytes (int): Larger files are left out.
+        max_files (int): At most this many files are returned.
+        repo_name (str): Repository name used in log messages.
+
+    Returns:
+        Dict[str, str]: Blob SHA by path.
+    """
+    extensions = set(extensions)
+    with timed("github_tree_fetch_seconds", repo=repo_name):
+        tree = repo.get_git_tree(commit_sha, recursive=True)
+    if tree.raw_data.get("truncated"):
+        logger.warning(f"Git tree of {repo_name}@{commit_sha} is truncated; some files will be missing.")
+    files = {}
+    for element in tree.tree:
+        if element.type != "blob" or os.path.splitext(element.path)[1].lower() not in extensions or (element.size or 0) > max_file_bytes:
+            continue
+        if len(files) >= max_files:
+            logger.warning(f"{repo_name}@{commit_sha} has more than {max_files} matching files; keeping the first {max_files}.")
+            break
+        files[element.path] = element.sha
+    return files
+
+def git_blob_sha(content: bytes) -> str:
+    """
+    Computes the SHA git (and GitHub) gives a blob with this content.
+    """
+    return hashlib.sha1(b"blob %d\0" % len(content) + content).hexdigest()
+
+def fetch_blob_bytes(repo, blob_sha: str, repo_name: str = "") -> bytes:
+    """
+    Fetches the raw content of a git blob.
+
+    Raises:
+        ValueError: If the content does not hash to `blob_sha`; indexes keyed by blob SHA must never store
+            another blob's content.
+    """
+    with timed("github_file_fetch_seconds", repo=repo_name):
+        blob = repo.get_git_blob(blob_sha)
+    content = base64.b64decode(blob.content)
+    if git_blob_sha(content) != blob_sha:
+        raise ValueError(f"Blob {blob_sha} of {repo_name or 'repository'} came back with content hashing to {git_blob_sha(content)}")
+    return content
+
+def fetch_blob_text(repo, blob_sha: str, repo_name: str = "") -> str:
+    """
+    Fetches a git blob and decodes it as UTF-8 (undecodable bytes are replaced).
+    """
+    return fetch_blob_bytes(repo, blob_sha, repo_name).decode("utf-8", errors="replace")
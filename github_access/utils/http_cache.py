@@ -0,0 +1,304 @@
+from collections import OrderedDict
+from functools import lru_cache
+from typing import Any, Dict, ItemsView, Optional
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+
+from github.Requester import HTTPRequestsConnectionClass, HTTPSRequestsConnectionClass, Requester
+
+from config import get_settings
+from github_access.utils.metrics import increment, observe, set_gauge
+from github_access.utils.rate_limiter import GitHubRateLimiter, current_github_priority, rate_limit_resource
+
+logger = logging.getLogger(__name__)
+
+# Headers of a 304 response that replace the cached ones; everything else describes the cached body.
+REVALIDATION_HEADERS = ("date", "etag", "last-modified", "cache-control")
+
+
+def response_cache_key(host: str, url: str, headers: Dict[str, str]) -> str:
+    """
+    Builds the cache key of a GET request. The Accept header is part of the key because GitHub answers the same URL
+    with different bodies per media type; the Authorization header is not, since GitHub only answers 304 to a
+    conditional request if the current credentials may read the resource.
+    """
+    accept = next((value for name, value in headers.items() if name.lower() == "accept"), "")
+    return f"github-http:{host}{url}|{accept}"
+
+
+class MemoryResponseStore:
+    """
+    In-process LRU of encoded responses, bounded by their total size.
+    """
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[str, bytes]" = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[bytes]:
+        with self._lock:
+            data = self._entries.get(key)
+            if data is not None:
+                self._entries.move_to_end(key)
+            return data
+
+    def set(self, key: str, data: bytes) -> None:
+        if len(data) > self.max_bytes:
+            return
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._size -= len(previous)
+            self._entries[key] = data
+            self._size += len(data)
+            while self._size > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self._size -= len(evicted)
+            set_gauge("github_http_cache_bytes", self._size)
+
+
+class SQLiteResponseStore:
+    """
+    Disk-backed store of encoded responses that survives restarts and is shared by the workers of one host.
+    The least recently used entries are deleted once the stored bodies exceed `max_bytes`.
+    """
+
+    def __init__(self, path: str, max_bytes: int):
+        self.max_bytes = max_bytes
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.execute("PRAGMA synchronous=NORMAL")
+        self._connection.execute(
+            "CREATE TABLE IF NOT EXISTS responses (key TEXT PRIMARY KEY, data BLOB NOT NULL, size INTEGER NOT NULL, used_at REAL NOT NULL)"
+        )
+        self._connection.execute("CREATE INDEX IF NOT EXISTS responses_used_at ON responses (used_at)")
+
+    def get(self, key: str) -> Optional[bytes]:
+        with self._lock, self._connection:
+            row = self._connection.execute("SELECT data FROM responses WHERE key = ?", (key,)).fetchone()
+            if row is not None:
+                self._connection.execute("UPDATE responses SET used_at = ? WHERE key = ?", (time.time(), key))
+        return row[0] if row else None
+
+    def set(self, key: str, data: bytes) -> None:
+        if len(data) > self.max_bytes:
+            return
+        with self._lock, self._connection:
+            self._connection.execute(
+                "INSERT OR REPLACE INTO responses (key, data, size, used_at) VALUES (?, ?, ?, ?)", (key, data, len(data), time.time())
+            )
+            size = self._connection.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+            if size > self.max_bytes:
+                # Delete the oldest entries until the store is back to 90% of its budget
+                evicted = []
+                for evicted_key, evicted_size in self._connection.execute("SELECT key, size FROM responses ORDER BY used_at"):
+                    if size <= self.max_bytes * 0.9:
+                        break
+                    evicted.append((evicted_key,))
+                    size -= evicted_size
+                self._connection.executemany("DELETE FROM responses WHERE key = ?", evicted)
+        set_gauge("github_http_cache_bytes", size)
+
+
+class RedisResponseStore:
+    """
+    Redis-backed store of encoded responses shared by all workers; entries expire after `ttl_seconds`.
+    """
+
+    def __init__(self, redis_url: str, ttl_seconds: int):
+        import redis  # Only required when the Redis-backed cache is enabled
+        self._redis = redis.Redis.from_url(redis_url)
+        self.ttl_seconds = ttl_seconds
+
+    def get(self, key: str) -> Optional[bytes]:
+        try:
+            return self._redis.get(key)
+        except Exception as e:
+            logger.warning(f"Redis GitHub response cache read failed: {str(e)}")
+            return None
+
+    def set(self, key: str, data: bytes) -> None:
+        try:
+            self._redis.set(key, data, ex=self.ttl_seconds)
+        except Exception as e:
+            logger.warning(f"Redis GitHub response cache write failed: {str(e)}")
+
+
+class CachedResponse:
+    # Mimics the httplib-style response PyGithub's Requester reads
+    def __init__(self, status: int, headers: Dict[str, str], text: str):
+        self.status = status
+        self.headers = headers
+        self.text = text
+
+    def getheaders(self) -> ItemsView[str, str]:
+        return self.headers.items()
+
+    def read(self) -> str:
+        return self.text
+
+
+def _thread_local_attribute(name: str) -> property:
+    return property(lambda self: getattr(self._state, name, None), lambda self, value: setattr(self._state, name, value))
+
+
+class ThreadSafeHTTPSConnection(HTTPSRequestsConnectionClass):
+    """
+    PyGithub connection whose pending request is kept per thread.
+
+    PyGithub's Requester shares one persistent connection between all threads and stores a request on it in
+    `request()` before sending it in `getresponse()`. The base class keeps that request in instance attributes, so a
+    thread whose `request()` ran between another thread's `request()` and `getresponse()` would swap their requests.
+    The underlying `requests.Session` itself is safe to share.
+    """
+
+    verb = _thread_local_attribute("verb")
+    url = _thread_local_attribute("url")
+    input = _thread_local_attribute("input")
+    headers = _thread_local_attribute("headers")
+
+    def __init__(self, *args: Any, **kwargs: Any):
+        self._state = threading.local()
+        super().__init__(*args, **kwargs)
+
+
+class RateLimitedHTTPSConnection(ThreadSafeHTTPSConnection):
+    """
+    PyGithub connection that asks the rate limiter before each request and feeds it every response's headers.
+    Requests are keyed by a hash of their credentials and the rate limit resource of the path.
+    """
+
+    limiter: Optional[GitHubRateLimiter] = None
+
+    def request(self, verb: str, url: str, input: Any, headers: Dict[str, str]) -> None:
+        # Waits before the request is stored, so a paced thread never holds a pending request
+        limiter = RateLimitedHTTPSConnection.limiter
+        self._state.rate_limit_key = None
+        if limiter is not None:
+            authorization = next((value for name, value in headers.items() if name.lower() == "authorization"), "")
+            key = f"{hashlib.sha256(authorization.encode('utf-8')).hexdigest()[:16]}:{rate_limit_resource(url)}"
+            priority = current_github_priority()
+            waited = limiter.acquire(key, priority)
+            if waited:
+                observe("github_throttle_wait_seconds", waited, priority=priority)
+            self._state.rate_limit_key = key
+        super().request(verb, url, input, headers)
+
+    def getresponse(self):
+        limiter = RateLimitedHTTPSConnection.limiter
+        key = self._state.rate_limit_key
+        if limiter is None or key is None:
+            return super().getresponse()
+
+        response = super().getresponse()
+        secondary_limited = response.status in (403, 429) and "secondary rate limit" in (response.text or "").lower()
+        limiter.record(key, response.status, response.headers, secondary_limited=secondary_limited)
+        return response
+
+
+class ConditionalHTTPSConnection(RateLimitedHTTPSConnection):
+    """
+    PyGithub connection that revalidates cached GET responses with `If-None-Match` / `If-Modified-Since`.
+    A 304 Not Modified answer, which GitHub does not count against the rate limit, is turned back into the
+    cached 200 response, so every PyGithub call benefits without changes at the call sites.
+    Requests, including revalidations, go through the rate limiter of RateLimitedHTTPSConnection.
+    """
+
+    store: Any = None
+
+    def request(self, verb: str, url: str, input: Any, headers: Dict[str, str]) -> None:
+        # The key and the conditional headers are derived from this call's arguments, before anything is stored
+        store = type(self).store
+        self._state.cache_key = self._state.cached = None
+        if store is not None and verb == "GET":
+            key = response_cache_key(self.host, url, headers)
+            cached = None
+            data = store.get(key)
+            if data is not None:
+                try:
+                    cached = json.loads(data)
+                except ValueError:
+                    logger.warning(f"Discarding unreadable cached GitHub response for {url}")
+            if cached is not None:
+                headers = dict(headers)
+                if cached["headers"].get("etag"):
+                    headers["If-None-Match"] = cached["headers"]["etag"]
+                if cached["headers"].get("last-modified"):
+                    headers["If-Modified-Since"] = cached["headers"]["last-modified"]
+            self._state.cache_key, self._state.cached = key, cached
+        super().request(verb, url, input, headers)
+
+    def getresponse(self):
+        store = type(self).store
+        key, cached = self._state.cache_key, self._state.cached
+        if store is None or key is None:
+            return super().getresponse()
+
+        response = super().getresponse()
+        if response.status == 304 and cached is not None:
+            increment("github_http_cache_requests_total", result="not_modified")
+            fresh_headers = {name.lower(): value for name, value in response.headers.items()}
+            headers = dict(cached["headers"])
+            headers.update({
+                name: value for name, value in fresh_headers.items()
+                if name in REVALIDATION_HEADERS or name.startswith("x-ratelimit-")
+            })
+            return CachedResponse(200, headers, cached["body"])
+
+        increment("github_http_cache_requests_total", result="modified" if cached is not None else "miss")
+        if response.status == 200:
+            headers = {name.lower(): value for name, value in response.headers.items()}
+            if headers.get("etag") or headers.get("last-modified"):
+                store.set(key, json.dumps({"headers": headers, "body": response.text}).encode("utf-8"))
+        return response
+
+
+@lru_cache
+def get_response_store():
+    """
+    Caches and returns the process-wide GitHub response store selected by GITHUB_HTTP_CACHE_BACKEND.
+    """
+    settings = get_settings()
+    if settings.GITHUB_HTTP_CACHE_BACKEND == "redis":
+        if settings.REDIS_URL:
+            return RedisResponseStore(settings.REDIS_URL, settings.GITHUB_HTTP_CACHE_TTL_SECONDS)
+        logger.warning("GITHUB_HTTP_CACHE_BACKEND is redis but REDIS_URL is not set; caching GitHub responses in memory.")
+    elif settings.GITHUB_HTTP_CACHE_BACKEND == "sqlite":
+        return SQLiteResponseStore(settings.GITHUB_HTTP_CACHE_PATH, settings.GITHUB_HTTP_CACHE_MAX_BYTES)
+    return MemoryResponseStore(settings.GITHUB_HTTP_CACHE_MAX_BYTES)
+
+
+@lru_cache
+def get_rate_limiter() -> GitHubRateLimiter:
+    """
+    Caches and returns the process-wide GitHub rate limiter.
+    """
+    settings = get_settings()
+    return GitHubRateLimiter(
+        interactive_reserve=settings.GITHUB_RATE_LIMIT_INTERACTIVE_RESERVE,
+        max_interactive_wait=settings.GITHUB_RATE_LIMIT_MAX_INTERACTIVE_WAIT_SECONDS,
+    )
+
+
+def install_github_connection() -> None:
+    """
+    Routes PyGithub's HTTPS requests through ConditionalHTTPSConnection, with response caching and rate limit pacing
+    as configured. Must run before the GitHub client is created.
+    """
+    settings = get_settings()
+    ConditionalHTTPSConnection.store = get_response_store() if settings.GITHUB_HTTP_CACHE_ENABLED else None
+    RateLimitedHTTPSConnection.limiter = get_rate_limiter() if settings.GITHUB_RATE_LIMIT_PACING else None
+    Requester.injectConnectionClasses(HTTPRequestsConnectionClass, ConditionalHTTPSConnection)
+    # injectConnectionClasses also turns off connection reuse (it is meant for test doubles). Without reuse, each
+    # request replaces the Requester's connection and closes the previous one while other threads may still use it;
+    # ThreadSafeHTTPSConnection makes the shared connection safe for concurrent requests, so keep it.
+    Requester._Requester__persist = True
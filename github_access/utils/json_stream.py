@@ -0,0 +1,94 @@
+from typing import Any, List, Optional
+import json
+import re
+
+# Characters that can change the parser state; everything else is skipped in one regex step.
+_STRUCTURAL = re.compile(r'["\\{}\[\]:,]')
+
+
+class IncrementalArrayParser:
+    """
+    Incremental parser for a streamed JSON object that returns each element of one of its array fields
+    (e.g. `comments`) as soon as the element's closing brace arrives, without waiting for the rest of the document.
+
+    Only the structure is tracked while text is fed (nesting depth, strings and escapes, the current top-level key);
+    each finished element is decoded on its own with `json.loads`. `result()` decodes the whole document once the
+    stream has ended, which gives the remaining fields (such as a summary) regardless of their position.
+    """
+
+    def __init__(self, array_key: str):
+        self.array_key = array_key
+        self._text = ""
+        self._position = 0
+        self._depth = 0
+        self._in_string = False
+        self._string_start = 0
+        self._last_string: Optional[str] = None
+        self._key: Optional[str] = None
+        self._in_array = False
+        self._element_start: Optional[int] = None
+
+    def feed(self, chunk: str) -> List[Any]:
+        """
+        Adds the next piece of streamed text and returns the array elements completed by it.
+
+        Raises:
+            json.JSONDecodeError: If a completed element is not valid JSON.
+        """
+        self._text += chunk
+        text = self._text
+        elements = []
+        position = self._position
+        while True:
+            match = _STRUCTURAL.search(text, position)
+            if match is None:
+                position = len(text)
+                break
+            index = match.start()
+            char = text[index]
+            position = index + 1
+            if self._in_string:
+                if char == "\\":
+                    # Skip the escaped character, which may only arrive with the next chunk
+                    position = index + 2
+                    if position > len(text):
+                        break
+                elif char == '"':
+                    self._in_string = False
+                    if self._depth == 1:
+                        self._last_string = text[self._string_start:index + 1]
+                continue
+            if char == '"':
+                self._in_string = True
+                self._string_start = index
+            elif char == ":":
+                if self._depth == 1 and self._last_string is not None:
+                    self._key = json.loads(self._last_string)
+            elif char == ",":
+                if self._depth == 1:
+                    self._key = None
+                    self._last_string = None
+            elif char in "{[":
+                self._depth += 1
+                if self._depth == 2 and char == "[" and self._key == self.array_key:
+                    self._in_array = True
+                elif self._depth == 3 and self._in_array:
+                    self._element_start = index
+            else:
+                if self._depth == 3 and self._in_array and self._element_start is not None:
+                    elements.append(json.loads(text[self._element_start:index + 1]))
+                    self._element_start = None
+                elif self._depth == 2 and self._in_array:
+                    self._in_array = False
+                self._depth -= 1
+        self._position = position
+        return elements
+
+    def result(self) -> Any:
+        """
+        Decodes the complete streamed document.
+
+        Raises:
+            json.JSONDecodeError: If the stream did not form a complete JSON document.
+        """
+        return json.loads(self._text)
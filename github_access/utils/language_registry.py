@@ -0,0 +1,134 @@
+from contextlib import contextmanager
+from functools import lru_cache
+from typing import Dict, Any, Iterator, List
+import logging
+import threading
+import time
+
+from tree_sitter import Parser
+
+logger = logging.getLogger(__name__)
+
+# Tree-sitter grammar name for each supported file extension.
+GRAMMAR_NAMES = {
+    ".py": "python",
+    ".go": "go",
+    ".js": "javascript",
+    ".jsx": "javascript",
+    ".mjs": "javascript",
+    ".java": "java",
+    ".ts": "typescript",
+    ".tsx": "tsx",
+}
+
+# Extensions analyzed with the same linters and context extraction as their canonical extension.
+EXTENSION_ALIASES = {
+    ".jsx": ".js",
+    ".mjs": ".js",
+    ".tsx": ".ts",
+}
+
+# Human-readable language name per canonical extension.
+LANGUAGE_NAMES = {
+    ".py": "Python",
+    ".go": "Go",
+    ".js": "JavaScript",
+    ".java": "Java",
+    ".ts": "TypeScript",
+}
+
+# Idle parsers kept per grammar; extra parsers created under contention are discarded on release.
+MAX_IDLE_PARSERS_PER_LANGUAGE = 8
+
+# Seconds after a failed grammar load before the next call tries again.
+GRAMMAR_RETRY_SECONDS = 30.0
+
+_grammar_retry_at = 0.0
+
+def canonical_extension(ext: str) -> str:
+    """
+    Resolves extension aliases (e.g. `.tsx` -> `.ts`, `.mjs` -> `.js`) to the extension used for analysis.
+    """
+    ext = ext.lower()
+    return EXTENSION_ALIASES.get(ext, ext)
+
+def get_language_name(ext: str) -> str:
+    """
+    Returns the human-readable language name for a file extension, or "Unknown".
+    """
+    return LANGUAGE_NAMES.get(canonical_extension(ext), "Unknown")
+
+def supported_extensions() -> List[str]:
+    """
+    Returns every file extension (including aliases) that can be analyzed.
+    """
+    return list(GRAMMAR_NAMES.keys())
+
+@lru_cache
+def _load_supported_languages() -> Dict[str, Any]:
+    # lru_cache does not cache exceptions, so only a successful load is kept
+    from tree_sitter_languages import get_language
+    grammars = {name: get_language(name) for name in set(GRAMMAR_NAMES.values())}
+    languages = {ext: grammars[name] for ext, name in GRAMMAR_NAMES.items()}
+    logger.info("Tree-sitter languages loaded successfully.")
+    return languages
+
+def get_supported_languages() -> Dict[str, Any]:
+    """
+    Loads the Tree-sitter grammars on first use and caches them for the whole process.
+    Returns a mapping of file extension to Tree-sitter Language; empty if the grammars cannot be loaded.
+    Failures are not cached: calls after GRAMMAR_RETRY_SECONDS load the grammars again.
+    """
+    global _grammar_retry_at
+    if _grammar_retry_at and time.monotonic() < _grammar_retry_at:
+        return {}
+    try:
+        return _load_supported_languages()
+    except Exception as e:
+        _grammar_retry_at = time.monotonic() + GRAMMAR_RETRY_SECONDS
+        logger.error(f"Failed to load Tree-sitter languages: {str(e)}. AST-based analysis might be limited; retrying in {GRAMMAR_RETRY_SECONDS:.0f}s.", exc_info=True)
+        return {}
+
+class ParserPool:
+    """
+    Thread-safe pool of Tree-sitter parsers, one free list per grammar.
+    A parser's language is set once when it is created and never mutated afterwards,
+    so concurrent analyses on a thread pool never share a parser.
+    """
+
+    def __init__(self, max_idle_per_language: int = MAX_IDLE_PARSERS_PER_LANGUAGE):
+        self.max_idle_per_language = max_idle_per_language
+        self._idle: Dict[str, List[Parser]] = {}
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def acquire(self, ext: str) -> Iterator[Parser]:
+        """
+        Yields a parser configured for the extension's grammar and returns it to the pool afterwards.
+
+        Raises:
+            KeyError: If the extension has no loaded grammar.
+        """
+        ext = ext.lower()
+        language = get_supported_languages()[ext]
+        grammar = GRAMMAR_NAMES[ext]
+        with self._lock:
+            idle = self._idle.setdefault(grammar, [])
+            parser = idle.pop() if idle else None
+        if parser is None:
+            parser = Parser()
+            parser.set_language(language)
+        try:
+            yield parser
+        finally:
+            with self._lock:
+                idle = self._idle.setdefault(grammar, [])
+                if len(idle) < self.max_idle_per_language:
+                    idle.append(parser)
+
+@lru_cache
+def get_parser_pool() -> ParserPool:
+    """
+    Caches and returns the process-wide parser pool.
+    """
+    return ParserPool()
@@ -0,0 +1,249 @@
+from contextlib import contextmanager
+from functools import lru_cache
+from typing import Dict, Any, Iterator, List, Optional, Tuple
+import logging
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+RISK_BUCKETS = (1, 2, 4, 6, 8, 10, 12, 15, 20, 30, 40)
+TOKEN_BUCKETS = (100, 250, 500, 1000, 2000, 4000, 8000, 16000, 32000, 64000, 128000, 256000)
+
+# Help text (and custom buckets) for the metrics recorded by the review pipeline.
+# Metrics not listed here are created on first use with the default latency buckets.
+METRIC_DEFINITIONS: Dict[str, Dict[str, Any]] = {
+    "webhook_ack_seconds": {"help": "Time to acknowledge a GitHub webhook delivery."},
+    "github_file_fetch_seconds": {"help": "Time to fetch a file's content from GitHub."},
+    "github_http_cache_requests_total": {"help": "GitHub GET requests by cache result (miss/modified/not_modified)."},
+    "github_http_cache_bytes": {"help": "Size of the cached GitHub responses in the memory or SQLite store."},
+    "github_rate_limit_remaining": {"help": "Remaining GitHub API requests of the current rate limit window, by resource."},
+    "github_rate_limit_limit": {"help": "GitHub API requests granted per rate limit window, by resource."},
+    "github_throttle_wait_seconds": {"help": "Time a GitHub request waited for the rate limiter, by priority (interactive/background)."},
+    "github_rate_limited_total": {"help": "Rate-limited GitHub responses, by kind (primary/secondary)."},
+    "static_analysis_seconds": {"help": "Total time spent in perform_static_analysis."},
+    "tree_sitter_parse_seconds": {"help": "Time to parse a file with Tree-sitter."},
+    "linter_seconds": {"help": "Wall-clock time of each linter/scanner subprocess."},
+    "scratch_dirs_active": {"help": "Per-analysis scratch directories currently in use."},
+    "scratch_leaked_total": {"help": "Scratch directories left behind, by reason (cleanup_failed/stale)."},
+    "linter_errors_total": {"help": "Linter runs that failed, by tool and error (not_found/timeout/output_limit/cpu_limit/killed)."},
+    "prompt_build_seconds": {"help": "Time to build a Gemini review prompt."},
+    "gemini_request_seconds": {"help": "Latency of Gemini generate_content calls."},
+    "gemini_first_comment_seconds": {"help": "Time from the streamed Gemini review request to its first complete comment."},
+    "gemini_tokens": {"help": "Tokens per Gemini request, by direction (prompt/response).", "buckets": TOKEN_BUCKETS},
+    "find_line_info_seconds": {"help": "Time to map a review comment onto a diff line."},
+    "review_post_seconds": {"help": "Time to post a review to GitHub with create_review."},
+    "review_post_retries_total": {"help": "create_review calls retried after a secondary rate limit."},
+    "review_post_failures_total": {"help": "Review chunks that could not be posted."},
+    "review_comments_posted_total": {"help": "Review comments posted to GitHub."},
+    "review_comments_dropped_total": {"help": "Review comments not posted, by reason (invalid_position/rejected)."},
+    "review_files_skipped_total": {"help": "Changed files skipped before review, by reason (vendored/generated/minified/binary/too_large)."},
+    "github_commit_files_total": {"help": "Files submitted for commit, by result (changed/unchanged)."},
+    "github_commit_ref_conflicts_total": {"help": "Branch updates rejected because the branch moved during a commit."},
+    "git_mirror_fetch_seconds": {"help": "Time to fetch new objects into a repository's git mirror."},
+    "git_mirror_bytes": {"help": "Total size of the git mirrors on disk."},
+    "git_mirror_evicted_total": {"help": "Git mirrors deleted to stay under GIT_MIRROR_MAX_BYTES."},
+    "pr_snapshot_load_seconds": {"help": "Time to load a pull request snapshot (file list, blobs, manifests)."},
+    "pr_snapshot_files_total": {"help": "Changed files loaded through pull request snapshots."},
+    "review_risk_score": {"help": "Triage risk score of reviewed files when the review cascade is enabled.", "buckets": RISK_BUCKETS},
+    "review_files_escalated_total": {"help": "Files escalated to the stronger review model by the cascade."},
+    "review_comments_generated_total": {"help": "Generated review comments that map onto the diff, by model."},
+    "review_queue_depth": {"help": "Review jobs waiting in the scheduler, by repository."},
+    "review_jobs_running": {"help": "Review jobs currently running, by repository."},
+    "review_queue_wait_seconds": {"help": "Time a review job waited in the scheduler before starting."},
+    "review_jobs_total": {"help": "Review jobs run by the scheduler, by repository and status (succeeded/failed)."},
+    "review_total_seconds": {"help": "End-to-end time of create_and_post_review."},
+    "symbol_index_build_seconds": {"help": "Time to index a commit in the symbol index (tree listing, new blob fetches and parses)."},
+    "symbol_index_blobs_indexed_total": {"help": "Blobs parsed into the symbol index, by language."},
+    "symbol_index_lookup_seconds": {"help": "Latency of symbol index lookups, by query (definitions/references)."},
+    "github_tree_fetch_seconds": {"help": "Time to list a commit's files with a recursive git tree request."},
+    "retrieval_index_refresh_seconds": {"help": "Time to refresh a repository's retrieval index to a commit."},
+    "retrieval_index_files_indexed_total": {"help": "Files (re)indexed into the retrieval index."},
+    "retrieval_search_seconds": {"help": "Latency of a BM25/trigram snippet search."},
+    "analysis_cache_requests_total": {"help": "Analysis result cache lookups, by result (hit/miss)."},
+    "analysis_cache_bytes": {"help": "Size of the encoded results held in the in-memory analysis cache."},
+}
+
+LabelKey = Tuple[Tuple[str, str], ...]
+
+def _label_key(labels: Dict[str, Any]) -> LabelKey:
+    return tuple(sorted((key, str(value)) for key, value in labels.items() if value is not None))
+
+def _escape_label_value(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+def _format_labels(label_key: LabelKey, extra: Optional[Tuple[str, str]] = None) -> str:
+    pairs = list(label_key) + ([extra] if extra else [])
+    if not pairs:
+        return ""
+    escaped = [f'{key}="{_escape_label_value(value)}"' for key, value in pairs]
+    return "{" + ",".join(escaped) + "}"
+
+class _HistogramSeries:
+    def __init__(self, bucket_count: int):
+        self.bucket_counts = [0] * bucket_count
+        self.count = 0
+        self.sum = 0.0
+
+class MetricsRegistry:
+    """
+    Thread-safe, in-process registry of histograms, counters and gauges with Prometheus text exposition.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._histograms: Dict[str, Dict[LabelKey, _HistogramSeries]] = {}
+        self._buckets: Dict[str, Tuple[float, ...]] = {}
+        self._counters: Dict[str, Dict[LabelKey, float]] = {}
+        self._gauges: Dict[str, Dict[LabelKey, float]] = {}
+
+    def observe(self, name: str, value: float, **labels: Any) -> None:
+        """
+        Records one observation in the named histogram.
+        """
+        key = _label_key(labels)
+        with self._lock:
+            if name not in self._buckets:
+                self._buckets[name] = tuple(METRIC_DEFINITIONS.get(name, {}).get("buckets", DEFAULT_BUCKETS))
+                self._histograms[name] = {}
+            buckets = self._buckets[name]
+            series = self._histograms[name].get(key)
+            if series is None:
+                series = self._histograms[name][key] = _HistogramSeries(len(buckets))
+            for index, upper_bound in enumerate(buckets):
+                if value <= upper_bound:
+                    series.bucket_counts[index] += 1
+                    break
+            series.count += 1
+            series.sum += value
+
+    def increment(self, name: str, amount: float = 1.0, **labels: Any) -> None:
+        """
+        Adds to the named counter.
+        """
+        key = _label_key(labels)
+        with self._lock:
+            series = self._counters.setdefault(name, {})
+            series[key] = series.get(key, 0.0) + amount
+
+    def set_gauge(self, name: str, value: float, **labels: Any) -> None:
+        """
+        Sets the named gauge to the given value.
+        """
+        key = _label_key(labels)
+        with self._lock:
+            self._gauges.setdefault(name, {})[key] = value
+
+    def render_prometheus(self) -> str:
+        """
+        Renders all metrics in the Prometheus text exposition format (version 0.0.4).
+        """
+        lines: List[str] = []
+        with self._lock:
+            for name, series_by_labels in sorted(self._histograms.items()):
+                help_text = METRIC_DEFINITIONS.get(name, {}).get("help", name)
+                lines.append(f"# HELP {name} {help_text}")
+                lines.append(f"# TYPE {name} histogram")
+                buckets = self._buckets[name]
+                for label_key, series in sorted(series_by_labels.items()):
+                    cumulative = 0
+                    for upper_bound, bucket_count in zip(buckets, series.bucket_counts):
+                        cumulative += bucket_count
+                        lines.append(f"{name}_bucket{_format_labels(label_key, ('le', repr(float(upper_bound))))} {cumulative}")
+                    lines.append(f"{name}_bucket{_format_labels(label_key, ('le', '+Inf'))} {series.count}")
+                    lines.append(f"{name}_sum{_format_labels(label_key)} {series.sum}")
+                    lines.append(f"{name}_count{_format_labels(label_key)} {series.count}")
+            for metric_type, metrics in (("counter", self._counters), ("gauge", self._gauges)):
+                for name, series_by_labels in sorted(metrics.items()):
+                    help_text = METRIC_DEFINITIONS.get(name, {}).get("help", name)
+                    lines.append(f"# HELP {name} {help_text}")
+                    lines.append(f"# TYPE {name} {metric_type}")
+                    for label_key, value in sorted(series_by_labels.items()):
+                        lines.append(f"{name}{_format_labels(label_key)} {value}")
+        return "\n".join(lines) + "\n"
+
+    def summary(self) -> Dict[str, List[Dict[str, Any]]]:
+        """
+        Returns count, mean and bucket-estimated p50/p99 (None when above the largest bucket) per histogram series,
+        sorted so the slowest p99 stages come first.
+        """
+        result: Dict[str, List[Dict[str, Any]]] = {}
+        with self._lock:
+            for name, series_by_labels in self._histograms.items():
+                buckets = self._buckets[name]
+                entries = []
+                for label_key, series in series_by_labels.items():
+                    entries.append({
+                        "labels": dict(label_key),
+                        "count": series.count,
+                        "mean": series.sum / series.count if series.count else 0.0,
+                        "p50": self._estimate_quantile(buckets, series, 0.50),
+                        "p99": self._estimate_quantile(buckets, series, 0.99),
+                    })
+                result[name] = sorted(entries, key=lambda entry: float("inf") if entry["p99"] is None else entry["p99"], reverse=True)
+        return result
+
+    @staticmethod
+    def _estimate_quantile(buckets: Tuple[float, ...], series: _HistogramSeries, quantile: float) -> Optional[float]:
+        """
+        Returns the upper bound of the bucket containing the quantile, or None if it lies above the last bucket.
+        """
+        if not series.count:
+            return 0.0
+        rank = quantile * series.count
+        cumulative = 0
+        for upper_bound, bucket_count in zip(buckets, series.bucket_counts):
+            cumulative += bucket_count
+            if cumulative >= rank:
+                return float(upper_bound)
+        return None
+
+@lru_cache
+def get_metrics_registry() -> MetricsRegistry:
+    """
+    Caches and returns the process-wide metrics registry.
+    """
+    return MetricsRegistry()
+
+def observe(name: str, value: float, **labels: Any) -> None:
+    """
+    Records one observation in a histogram of the process-wide registry.
+    """
+    get_metrics_registry().observe(name, value, **labels)
+
+def increment(name: str, amount: float = 1.0, **labels: Any) -> None:
+    """
+    Adds to a counter of the process-wide registry.
+    """
+    get_metrics_registry().increment(name, amount, **labels)
+
+def set_gauge(name: str, value: float, **labels: Any) -> None:
+    """
+    Sets a gauge of the process-wide registry.
+    """
+    get_metrics_registry().set_gauge(name, value, **labels)
+
+@contextmanager
+def timed(name: str, **labels: Any) -> Iterator[None]:
+    """
+    Records the wall-clock duration of the wrapped block (in seconds) in the named histogram,
+    whether or not the block raises.
+    """
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        observe(name, time.perf_counter() - start, **labels)
+
+def record_gemini_usage(response: Any, model: str, **labels: Any) -> None:
+    """
+    Records prompt/response token counts from a Gemini response's `usage_metadata`, if present.
+    """
+    usage = getattr(response, "usage_metadata", None)
+    if usage is None:
+        return
+    for direction, attribute in (("prompt", "prompt_token_count"), ("response", "candidates_token_count")):
+        token_count = getattr(usage, attribute, None)
+        if token_count:
+            observe("gemini_tokens", token_count, direction=direction, model=model, **labels)
@@ -0,0 +1,177 @@
+from typing import Any, Callable, Dict, List, Optional
+import json
+import logging
+import time
+
+from github_access.utils.github_fetcher import fetch_blob_bytes
+from github_access.utils.metrics import increment, observe
+
+logger = logging.getLogger(__name__)
+
+# Dependency manifests read from the default branch for the review prompt.
+MANIFEST_PATHS = ("requirements.txt", "go.mod", "package.json", "pom.xml")
+
+# Blobs requested per GraphQL query; keeps each response well below GitHub's timeout and size limits.
+BLOBS_PER_QUERY = 25
+
+# GitHub lists at most 3000 files of a pull request, 100 per page.
+FILES_PER_PAGE = 100
+MAX_FILE_PAGES = 30
+
+_BLOB_FIELDS = "... on Blob { text isBinary isTruncated }"
+
+
+class SnapshotFile:
+    """
+    A changed file of a pull request snapshot, shaped like the PyGithub `File` objects the review consumes
+    (`filename`, `patch`, `decoded_content`). Content prefetched over GraphQL is kept as text; binary, truncated
+    or unrequested blobs are fetched from the REST blob API on first access.
+    """
+
+    def __init__(self, filename: str, status: str, patch: Optional[str], sha: str, additions: int = 0, deletions: int = 0,
+                 text: Optional[str] = None, loader: Optional[Callable[[], bytes]] = None, previous_filename: Optional[str] = None):
+        self.filename = filename
+        self.previous_filename = previous_filename
+        self.status = status
+        self.patch = patch
+        self.sha = sha
+        self.additions = additions
+        self.deletions = deletions
+        self._content = text.encode("utf-8") if text is not None else None
+        self._loader = loader
+
+    @property
+    def decoded_content(self) -> bytes:
+        if self._content is None:
+            self._content = self._loader() if self._loader else b""
+        return self._content
+
+
+class PullRequestSnapshot:
+    """
+    Everything a pull request review reads from GitHub, loaded up front: the head and base commits, the changed
+    files with patches and content, the dependency manifests of the default branch and the head's `.gitattributes`.
+    Manifests and `.gitattributes` are None when the file does not exist.
+    """
+
+    def __init__(self, repo_full_name: str, number: int, head_sha: str, base_sha: str, files: List[SnapshotFile],
+                 manifests: Dict[str, Optional[str]], gitattributes: Optional[str]):
+        self.repo_full_name = repo_full_name
+        self.number = number
+        self.head_sha = head_sha
+        self.base_sha = base_sha
+        self.files = files
+        self.manifests = manifests
+        self.gitattributes = gitattributes
+
+
+def _graphql(repo, query: str, variables: Dict[str, Any]) -> Dict[str, Any]:
+    # PyGithub 2.2 has no public way to send a raw GraphQL query with plain variables; use the repository's requester
+    requester = repo._requester
+    _, data = requester.requestJsonAndCheck("POST", requester.graphql_url, input={"query": query, "variables": variables})
+    if data.get("errors"):
+        raise ValueError(f"GraphQL query failed: {data['errors']}")
+    return data["data"]
+
+
+def list_pull_request_files(repo, number: int) -> List[Dict[str, Any]]:
+    """
+    Lists the changed files of a pull request with their patches (GraphQL does not expose patches), 100 per request.
+    """
+    files: List[Dict[str, Any]] = []
+    for page in range(1, MAX_FILE_PAGES + 1):
+        _, data = repo._requester.requestJsonAndCheck(
+            "GET", f"{repo.url}/pulls/{number}/files", parameters={"per_page": FILES_PER_PAGE, "page": page}
+        )
+        files.extend(data)
+        if len(data) < FILES_PER_PAGE:
+            break
+    return files
+
+
+def fetch_blobs_and_files(repo, repo_name: str, blob_shas: List[str], head_sha: str) -> Dict[str, Any]:
+    """
+    Fetches blob texts by SHA, the default branch's dependency manifests and the head's `.gitattributes` with
+    batched GraphQL queries; the manifests and `.gitattributes` ride along with the first batch.
+
+    Returns:
+        Dict[str, Any]: `blobs` ({sha: Blob fields or None}), `manifests` ({path: text or None}) and `gitattributes`.
+    """
+    owner, name = repo_name.split("/", 1)
+    blobs: Dict[str, Optional[Dict[str, Any]]] = {}
+    manifests: Dict[str, Optional[str]] = {}
+    gitattributes = None
+    batches = [blob_shas[start:start + BLOBS_PER_QUERY] for start in range(0, len(blob_shas), BLOBS_PER_QUERY)] or [[]]
+    for batch_number, batch in enumerate(batches):
+        fields = [f"b{index}: object(oid: {json.dumps(sha)}) {{ {_BLOB_FIELDS} }}" for index, sha in enumerate(batch)]
+        if batch_number == 0:
+            fields += [f"m{index}: object(expression: {json.dumps('HEAD:' + path)}) {{ {_BLOB_FIELDS} }}" for index, path in enumerate(MANIFEST_PATHS)]
+            fields.append(f"attributes: object(expression: {json.dumps(head_sha + ':.gitattributes')}) {{ {_BLOB_FIELDS} }}")
+        query = f"query($owner: String!, $name: String!) {{ repository(owner: $owner, name: $name) {{ {' '.join(fields)} }} }}"
+        repository = _graphql(repo, query, {"owner": owner, "name": name})["repository"]
+        for index, sha in enumerate(batch):
+            blobs[sha] = repository.get(f"b{index}")
+        if batch_number == 0:
+            manifests = {path: (repository.get(f"m{index}") or {}).get("text") for index, path in enumerate(MANIFEST_PATHS)}
+            gitattributes = (repository.get("attributes") or {}).get("text")
+    return {"blobs": blobs, "manifests": manifests, "gitattributes": gitattributes}
+
+
+def files_with_content(repo, repo_name: str, entries: List[Dict[str, Any]], texts: Optional[Dict[str, Optional[str]]] = None) -> List[SnapshotFile]:
+    """
+    Turns changed-file entries of the REST API (pull request or commit files) into SnapshotFiles. Content is taken
+    from `texts` (prefetched text by blob SHA) when present, otherwise fetched from the blob API on first access.
+    Removed files are left out, since there is nothing at the head to review.
+    """
+    texts = texts or {}
+    return [
+        SnapshotFile(
+            entry["filename"], entry.get("status", "modified"), entry.get("patch"), entry["sha"],
+            additions=entry.get("additions", 0), deletions=entry.get("deletions", 0), text=texts.get(entry["sha"]),
+            loader=lambda sha=entry["sha"]: fetch_blob_bytes(repo, sha, repo_name), previous_filename=entry.get("previous_filename"),
+        )
+        for entry in entries if entry.get("status") != "removed"
+    ]
+
+
+def _build_snapshot(repo, repo_name: str, number: int, head_sha: str, base_sha: str, entries: List[Dict[str, Any]],
+                    blob_filter: Callable[[str], bool], load_start: float) -> PullRequestSnapshot:
+    changed = [entry for entry in entries if entry.get("status") != "removed"]
+    prefetch = [entry["sha"] for entry in changed if blob_filter(entry["filename"])]
+    fetched = fetch_blobs_and_files(repo, repo_name, prefetch, head_sha)
+    texts = {
+        sha: blob.get("text") for sha, blob in fetched["blobs"].items()
+        if blob and not blob.get("isBinary") and not blob.get("isTruncated")
+    }
+    files = files_with_content(repo, repo_name, changed, texts)
+    observe("pr_snapshot_load_seconds", time.perf_counter() - load_start, repo=repo_name)
+    increment("pr_snapshot_files_total", len(files), repo=repo_name)
+    logger.info(f"Loaded snapshot of PR #{number} at {head_sha} in {repo_name}: {len(files)} files, {len(prefetch)} prefetched.")
+    return PullRequestSnapshot(repo_name, number, head_sha, base_sha, files, fetched["manifests"], fetched["gitattributes"])
+
+
+def load_pull_request_snapshot(repo, repo_name: str, pull_request, blob_filter: Callable[[str], bool] = lambda path: True,
+                               commit_sha: Optional[str] = None) -> PullRequestSnapshot:
+    """
+    Loads a pull request snapshot in a few round trips: the file list with patches (one REST request per 100 files),
+    then the content of every changed file accepted by `blob_filter`, the manifests and `.gitattributes` in batched
+    GraphQL queries. Removed files are left out, since there is nothing at the head to review.
+
+    Args:
+        repo: The PyGithub repository (may be lazy).
+        repo_name (str): The repository's full name.
+        pull_request: The PyGithub pull request.
+        blob_filter (Callable[[str], bool]): Paths whose content is prefetched; others are fetched on first access.
+        commit_sha (str, optional): Snapshot only the changes of this commit (as webhook reviews do), listed from
+            the REST commit instead of the pull request's files; `.gitattributes` is read at this commit.
+
+    Raises:
+        GithubException: If a GitHub request fails.
+        ValueError: If a GraphQL query returns errors.
+    """
+    load_start = time.perf_counter()
+    if commit_sha:
+        entries = [file.raw_data for file in repo.get_commit(commit_sha).files]
+        return _build_snapshot(repo, repo_name, pull_request.number, commit_sha, pull_request.base.sha, entries, blob_filter, load_start)
+    entries = list_pull_request_files(repo, pull_request.number)
+    return _build_snapshot(repo, repo_name, pull_request.number, pull_request.head.sha, pull_request.base.sha, entries, blob_filter, load_start)
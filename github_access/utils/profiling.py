@@ -0,0 +1,162 @@
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import datetime
+from typing import Dict, Any, Iterator, List, Optional
+import cProfile
+import io
+import json
+import logging
+import os
+import pstats
+import random
+import re
+import time
+import uuid
+
+logger = logging.getLogger(__name__)
+
+# Subprocess timings collected for the profile session active in the current context, if any.
+_active_subprocess_timings: ContextVar[Optional[List[Dict[str, Any]]]] = ContextVar("active_subprocess_timings", default=None)
+
+_PROFILE_ID_PATTERN = re.compile(r"^[A-Za-z0-9_.-]{1,128}$")
+
+def _get_settings():
+    # Imported lazily: config imports the static analyzer, which records subprocess timings here.
+    from config import get_settings
+    return get_settings()
+
+def new_request_id(request_id: Optional[str] = None) -> str:
+    """
+    Returns the given request ID if it is safe to use as a file name, otherwise a fresh one.
+    """
+    if request_id and _PROFILE_ID_PATTERN.match(request_id):
+        return request_id
+    return uuid.uuid4().hex
+
+def should_profile(profile_header: Optional[str] = None) -> bool:
+    """
+    Decides whether a request is profiled: always when the `X-Profile` header is truthy,
+    otherwise with probability PROFILING_SAMPLE_RATE. Nothing is profiled unless PROFILING_ENABLED is set.
+    """
+    settings = _get_settings()
+    if not settings.PROFILING_ENABLED:
+        return False
+    if profile_header and profile_header.strip().lower() in ("1", "true", "yes", "on"):
+        return True
+    return settings.PROFILING_SAMPLE_RATE > 0 and random.random() < settings.PROFILING_SAMPLE_RATE
+
+def record_subprocess(tool: str, duration: float, returncode: Optional[int] = None) -> None:
+    """
+    Adds a subprocess timing to the profile session of the current request, if one is active.
+    """
+    timings = _active_subprocess_timings.get()
+    if timings is not None:
+        timings.append({"tool": tool, "seconds": round(duration, 6), "returncode": returncode})
+
+@contextmanager
+def profile_request(kind: str, request_id: str, enabled: bool) -> Iterator[None]:
+    """
+    Wraps a single request in cProfile when `enabled`, then saves `<request_id>.prof` (pstats format)
+    and `<request_id>.json` (metadata, subprocess timings, top functions) under PROFILE_DIR.
+    cProfile records the whole thread, so in async endpoints the block must not contain an `await`.
+    """
+    if not enabled:
+        yield
+        return
+
+    profiler = cProfile.Profile()
+    timings: List[Dict[str, Any]] = []
+    token = _active_subprocess_timings.set(timings)
+    start = time.perf_counter()
+    try:
+        profiler.enable()
+    except ValueError as e:
+        # Another profiler is already active on this thread; run the request unprofiled.
+        logger.warning(f"Could not start profiler for {kind} {request_id}: {str(e)}")
+        profiler = None
+    if profiler is None:
+        _active_subprocess_timings.reset(token)
+        yield
+        return
+    try:
+        yield
+    finally:
+        profiler.disable()
+        _active_subprocess_timings.reset(token)
+        try:
+            _save_profile(profiler, kind, request_id, time.perf_counter() - start, timings)
+        except Exception as e:
+            logger.error(f"Failed to save profile {request_id}: {str(e)}", exc_info=True)
+
+def run_profiled(kind: str, request_id: str, enabled: bool, func, *args, **kwargs):
+    """
+    Calls `func(*args, **kwargs)` inside `profile_request`; used for background review tasks.
+    """
+    with profile_request(kind, request_id, enabled):
+        return func(*args, **kwargs)
+
+def _save_profile(profiler: cProfile.Profile, kind: str, request_id: str, duration: float, timings: List[Dict[str, Any]]) -> None:
+    settings = _get_settings()
+    os.makedirs(settings.PROFILE_DIR, exist_ok=True)
+    profiler.dump_stats(os.path.join(settings.PROFILE_DIR, f"{request_id}.prof"))
+
+    stats_stream = io.StringIO()
+    pstats.Stats(profiler, stream=stats_stream).sort_stats("cumulative").print_stats(25)
+    metadata = {
+        "request_id": request_id,
+        "kind": kind,
+        "created_at": datetime.now().isoformat(),
+        "duration_seconds": round(duration, 6),
+        "subprocess_seconds": round(sum(timing["seconds"] for timing in timings), 6),
+        "subprocesses": timings,
+        "top_functions": stats_stream.getvalue(),
+    }
+    with open(os.path.join(settings.PROFILE_DIR, f"{request_id}.json"), "w") as metadata_file:
+        json.dump(metadata, metadata_file, indent=2)
+    logger.info(f"Saved profile {request_id} for {kind} ({duration:.3f}s, {len(timings)} subprocesses).")
+    _prune_profiles(settings.PROFILE_DIR, settings.PROFILE_MAX_FILES)
+
+def _prune_profiles(profile_dir: str, max_profiles: int) -> None:
+    """
+    Deletes the oldest saved profiles beyond `max_profiles`.
+    """
+    metadata_files = sorted(
+        (entry for entry in os.scandir(profile_dir) if entry.name.endswith(".json")),
+        key=lambda entry: entry.stat().st_mtime,
+    )
+    for entry in metadata_files[:max(len(metadata_files) - max_profiles, 0)]:
+        request_id = entry.name[:-len(".json")]
+        for suffix in (".json", ".prof"):
+            try:
+                os.unlink(os.path.join(profile_dir, request_id + suffix))
+            except FileNotFoundError:
+                pass
+
+def list_profiles() -> List[Dict[str, Any]]:
+    """
+    Returns metadata (without the function table) of all saved profiles, newest first.
+    """
+    profile_dir = _get_settings().PROFILE_DIR
+    if not os.path.isdir(profile_dir):
+        return []
+    profiles = []
+    for entry in os.scandir(profile_dir):
+        if not entry.name.endswith(".json"):
+            continue
+        try:
+            with open(entry.path) as metadata_file:
+                metadata = json.load(metadata_file)
+        except (OSError, json.JSONDecodeError):
+            continue
+        metadata.pop("top_functions", None)
+        profiles.append(metadata)
+    return sorted(profiles, key=lambda metadata: metadata.get("created_at", ""), reverse=True)
+
+def get_profile_path(request_id: str) -> Optional[str]:
+    """
+    Returns the path of a saved `.prof` file, or None if the ID is invalid or unknown.
+    """
+    if not _PROFILE_ID_PATTERN.match(request_id):
+        return None
+    path = os.path.join(_get_settings().PROFILE_DIR, f"{request_id}.prof")
+    return path if os.path.isfile(path) else None
@@ -0,0 +1,207 @@
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Callable, Dict, Iterator, Mapping
+import asyncio
+import logging
+import math
+import threading
+import time
+
+from github_access.utils.metrics import increment, set_gauge
+
+logger = logging.getLogger(__name__)
+
+# GitHub's primary rate limits are granted per hour.
+RATE_LIMIT_WINDOW_SECONDS = 3600.0
+# GitHub asks clients to wait at least a minute after a secondary rate limit without Retry-After.
+SECONDARY_LIMIT_BACKOFF_SECONDS = 60.0
+# Background requests run unpaced until the spendable budget falls below this fraction of a linear share
+# of the rest of the window, so short bursts stay fast and only sustained scans are spread out.
+PACING_HEADROOM = 0.5
+# Waits are re-evaluated at least this often, so a budget update by another request takes effect.
+MAX_SLEEP_SECONDS = 5.0
+
+_priority: ContextVar[str] = ContextVar("github_priority", default="interactive")
+
+
+@contextmanager
+def github_priority(priority: str) -> Iterator[None]:
+    """
+    Marks the GitHub requests made inside the block as `interactive` (the default) or `background`.
+    """
+    token = _priority.set(priority)
+    try:
+        yield
+    finally:
+        _priority.reset(token)
+
+
+def current_github_priority() -> str:
+    return _priority.get()
+
+
+def propagate_github_priority(function: Callable[..., Any]) -> Callable[..., Any]:
+    """
+    Wraps a function so it runs with the caller's GitHub priority; needed for thread pool workers,
+    which do not inherit the submitting thread's context.
+    """
+    priority = _priority.get()
+
+    def run(*args: Any, **kwargs: Any) -> Any:
+        with github_priority(priority):
+            return function(*args, **kwargs)
+    return run
+
+
+def rate_limit_resource(url: str) -> str:
+    """
+    Returns the GitHub rate limit resource a request path counts against.
+    """
+    if url.startswith("/graphql"):
+        return "graphql"
+    if url.startswith("/search/"):
+        return "search"
+    return "core"
+
+
+class RateLimitWaitRequired(Exception):
+    """
+    Raised instead of waiting for the rate limiter on a thread that runs an asyncio event loop,
+    where sleeping would stall every other request the server is handling.
+    """
+
+    def __init__(self, retry_after: float):
+        super().__init__(f"GitHub rate limit exhausted; retry in {retry_after:.0f}s")
+        self.retry_after = retry_after
+
+
+def _on_event_loop() -> bool:
+    try:
+        asyncio.get_running_loop()
+        return True
+    except RuntimeError:
+        return False
+
+
+class _Budget:
+    __slots__ = ("limit", "remaining", "reset_at", "next_slot", "blocked_until")
+
+    def __init__(self, limit: int, remaining: int, reset_at: float):
+        self.limit = limit
+        self.remaining = remaining
+        self.reset_at = reset_at
+        self.next_slot = 0.0
+        self.blocked_until = 0.0
+
+
+class GitHubRateLimiter:
+    """
+    Tracks the rate limit budget of each token and resource from GitHub's `X-RateLimit-*` headers and paces requests.
+
+    Background requests are spaced so the budget left above the interactive reserve lasts until the reset, once it
+    falls below PACING_HEADROOM of a linear share of the hourly window; below the reserve they wait for the reset.
+    Interactive requests are never paced and only wait when the budget is exhausted (up to `max_interactive_wait`);
+    on an event loop thread they raise RateLimitWaitRequired instead of blocking the loop.
+    After a secondary rate limit every request waits for `Retry-After`. Budgets are decremented locally per request,
+    so concurrent workers do not all spend the same remaining requests before the next response corrects them.
+    """
+
+    def __init__(self, interactive_reserve: float = 0.1, max_interactive_wait: float = 60.0,
+                 clock: Callable[[], float] = time.time, sleep: Callable[[float], None] = time.sleep):
+        self.interactive_reserve = interactive_reserve
+        self.max_interactive_wait = max_interactive_wait
+        self._clock = clock
+        self._sleep = sleep
+        self._budgets: Dict[str, _Budget] = {}
+        self._lock = threading.Lock()
+
+    def acquire(self, key: str, priority: str = "interactive") -> float:
+        """
+        Blocks until a request may be sent and returns the seconds waited.
+
+        Raises:
+            RateLimitWaitRequired: If the request would have to wait and the caller runs on an event loop thread.
+        """
+        waited = 0.0
+        while True:
+            with self._lock:
+                budget = self._budgets.get(key)
+                if budget is None:
+                    return waited
+                now = self._clock()
+                delay = self._delay(budget, priority, now)
+                if delay <= 0 or (priority == "interactive" and waited >= self.max_interactive_wait and budget.blocked_until <= now):
+                    budget.remaining = max(0, budget.remaining - 1)
+                    return waited
+            if _on_event_loop():
+                raise RateLimitWaitRequired(delay)
+            pause = min(delay, MAX_SLEEP_SECONDS)
+            self._sleep(pause)
+            waited += pause
+
+    def _delay(self, budget: _Budget, priority: str, now: float) -> float:
+        # Called with the lock held; reserves the next background slot when the request may go now
+        if budget.blocked_until > now:
+            return budget.blocked_until - now
+        if budget.reset_at <= now:
+            return 0.0
+        time_left = budget.reset_at - now
+        if priority == "interactive":
+            return 0.0 if budget.remaining > 0 else time_left
+
+        reserve = math.ceil(budget.limit * self.interactive_reserve)
+        spendable = budget.remaining - reserve
+        if spendable <= 0:
+            return time_left
+        if spendable >= (budget.limit - reserve) * min(time_left / RATE_LIMIT_WINDOW_SECONDS, 1.0) * PACING_HEADROOM:
+            return 0.0
+        slot = max(now, budget.next_slot)
+        if slot > now:
+            return slot - now
+        budget.next_slot = now + time_left / spendable
+        return 0.0
+
+    def record(self, key: str, status: int, headers: Mapping[str, str], secondary_limited: bool = False) -> None:
+        """
+        Updates the budget from a response's rate limit headers and blocks the key after a rate-limited response.
+        """
+        headers = {name.lower(): value for name, value in headers.items()}
+        now = self._clock()
+        with self._lock:
+            budget = self._budgets.get(key)
+            try:
+                limit = int(headers["x-ratelimit-limit"])
+                remaining = int(headers["x-ratelimit-remaining"])
+                reset_at = float(headers["x-ratelimit-reset"])
+            except (KeyError, ValueError):
+                limit = None
+            if limit is not None:
+                if budget is None:
+                    budget = self._budgets[key] = _Budget(limit, remaining, reset_at)
+                    self._prune(now)
+                else:
+                    budget.limit, budget.remaining, budget.reset_at = limit, remaining, reset_at
+                resource = headers.get("x-ratelimit-resource", "core")
+                set_gauge("github_rate_limit_remaining", remaining, resource=resource)
+                set_gauge("github_rate_limit_limit", limit, resource=resource)
+
+            if budget is None or status not in (403, 429):
+                return
+            retry_after = headers.get("retry-after")
+            if retry_after is not None or secondary_limited:
+                try:
+                    backoff = float(retry_after) if retry_after is not None else SECONDARY_LIMIT_BACKOFF_SECONDS
+                except ValueError:
+                    backoff = SECONDARY_LIMIT_BACKOFF_SECONDS
+                budget.blocked_until = max(budget.blocked_until, now + backoff)
+                increment("github_rate_limited_total", kind="secondary")
+                logger.warning(f"GitHub secondary rate limit hit; pausing requests for {backoff:.0f}s.")
+            elif budget.remaining == 0:
+                budget.blocked_until = max(budget.blocked_until, budget.reset_at)
+                increment("github_rate_limited_total", kind="primary")
+                logger.warning(f"GitHub rate limit exhausted; pausing requests for {max(0.0, budget.reset_at - now):.0f}s until the reset.")
+
+    def _prune(self, now: float) -> None:
+        # Installation tokens rotate hourly; forget budgets whose window ended long ago. Called with the lock held.
+        for key in [key for key, budget in self._budgets.items() if budget.reset_at < now - RATE_LIMIT_WINDOW_SECONDS]:
+            del self._budgets[key]
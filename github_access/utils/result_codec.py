@@ -0,0 +1,216 @@
+from array import array
+from operator import itemgetter
+from typing import Dict, Any, List, Tuple
+import re
+import sys
+
+import msgpack
+
+from github_access.utils.static_analyzer import StaticAnalysisResult, FunctionSignature, ClassHierarchy
+
+# Bump when the payload layout changes; cached payloads with another version are treated as misses.
+CODEC_VERSION = 1
+
+# Tokens of a Tree-sitter S-expression (parentheses and atoms such as node types and `field:` names), each
+# with its leading whitespace so the tokens concatenate back to the exact original string.
+_SEXP_TOKEN_PATTERN = re.compile(r"\s*[()]|\s*[^\s()]+|\s+")
+
+# Fields with a dedicated encoding; any other StaticAnalysisResult field is stored as-is under "e".
+_ENCODED_FIELDS = {
+    "cyclomatic_complexity", "cognitive_complexity", "halstead_metrics", "issues", "ast_sexp",
+    "function_signatures", "class_hierarchies", "module_dependencies", "facets",
+}
+
+_NO_STRING = -1
+
+
+class _StringTable:
+    """
+    Interns strings so that repeated node types, field names, tools and messages are stored once.
+    """
+
+    def __init__(self):
+        self.strings: List[str] = []
+        self._ids: Dict[str, int] = {}
+
+    def intern(self, value: str) -> int:
+        string_id = self._ids.get(value)
+        if string_id is None:
+            string_id = self._ids[value] = len(self.strings)
+            self.strings.append(value)
+        return string_id
+
+    def id_of(self, value: str) -> int:
+        return self._ids[value]
+
+    def intern_optional(self, value) -> int:
+        return _NO_STRING if value is None else self.intern(value)
+
+
+def _encode_ast(ast_sexp: str, table: _StringTable) -> Tuple[str, Any]:
+    """
+    Encodes the S-expression as a table of interned token IDs (little-endian uint16, or uint32 for
+    very large string tables). Empty strings are kept verbatim.
+    """
+    tokens = _SEXP_TOKEN_PATTERN.findall(ast_sexp)
+    if not tokens:
+        return "A", ast_sexp
+    # Intern the distinct tokens once, then map the token stream without a Python-level loop
+    for token in dict.fromkeys(tokens):
+        table.intern(token)
+    token_ids = map(table.id_of, tokens)
+    token_table = array("H" if len(table.strings) <= 0xFFFF else "I", token_ids)
+    if sys.byteorder == "big":
+        token_table.byteswap()
+    return "a", [token_table.typecode, token_table.tobytes()]
+
+
+def _encode_issues(issues: List[Dict[str, Any]], table: _StringTable) -> List[Any]:
+    """
+    Stores issues column-wise, grouped by key set (each tool reports a fixed set of keys).
+    Columns holding only strings/None are dictionary-encoded through the string table.
+
+    Returns:
+        List[Any]: [groups, order] where each group is [key IDs, column kinds, columns] and `order` lists the
+            group of each issue, so the original order is restored on decode.
+    """
+    group_index: Dict[Tuple[str, ...], int] = {}
+    group_rows: List[List[Dict[str, Any]]] = []
+    order = []
+    for issue in issues:
+        keys = tuple(issue.keys())
+        index = group_index.get(keys)
+        if index is None:
+            index = group_index[keys] = len(group_rows)
+            group_rows.append([])
+        group_rows[index].append(issue)
+        order.append(index)
+
+    groups = []
+    for keys, index in group_index.items():
+        kinds = []
+        columns = []
+        for key in keys:
+            values = [row[key] for row in group_rows[index]]
+            if all(value is None or isinstance(value, str) for value in values):
+                kinds.append("s")
+                columns.append([table.intern_optional(value) for value in values])
+            else:
+                kinds.append("r")
+                columns.append(values)
+        groups.append([[table.intern(key) for key in keys], "".join(kinds), columns])
+    return [groups, order]
+
+
+def encode_result(result: StaticAnalysisResult) -> bytes:
+    """
+    Serializes an analysis result into the compact msgpack format used by the cache layer.
+    """
+    table = _StringTable()
+    ast_kind, ast_value = _encode_ast(result.ast_sexp, table)
+    payload = {
+        "v": CODEC_VERSION,
+        "m": [result.cyclomatic_complexity, result.cognitive_complexity],
+        "h": result.halstead_metrics,
+        "i": _encode_issues(result.issues, table),
+        ast_kind: ast_value,
+        "f": [
+            [table.intern(signature.name), [table.intern(parameter) for parameter in signature.parameters], table.intern_optional(signature.return_type)]
+            for signature in result.function_signatures
+        ],
+        "c": [
+            [
+                table.intern(hierarchy.name),
+                [table.intern(name) for name in hierarchy.parent_classes],
+                [table.intern(name) for name in hierarchy.methods],
+                [table.intern(name) for name in hierarchy.attributes],
+            ]
+            for hierarchy in result.class_hierarchies
+        ],
+        "d": [table.intern(dependency) for dependency in result.module_dependencies],
+        "x": [table.intern(facet) for facet in result.facets],
+    }
+    extra_fields = set(StaticAnalysisResult.model_fields) - _ENCODED_FIELDS
+    if extra_fields:
+        payload["e"] = result.model_dump(include=extra_fields)
+    payload["s"] = table.strings
+    return msgpack.packb(payload, use_bin_type=True)
+
+
+def _decode_ast(payload: Dict[str, Any], strings: List[str]) -> str:
+    if "A" in payload:
+        return payload["A"]
+    typecode, token_bytes = payload["a"]
+    token_ids = array(typecode)
+    token_ids.frombytes(token_bytes)
+    if sys.byteorder == "big":
+        token_ids.byteswap()
+    if len(token_ids) == 1:
+        return strings[token_ids[0]]
+    return "".join(itemgetter(*token_ids)(strings))
+
+
+def _decode_issues(encoded: List[Any], strings: List[str]) -> List[Dict[str, Any]]:
+    """
+    Reverses `_encode_issues`, restoring the original issue order.
+    """
+    def string(string_id: int):
+        return None if string_id == _NO_STRING else strings[string_id]
+
+    groups, order = encoded
+    decoded_groups = []
+    for key_ids, kinds, columns in groups:
+        keys = [strings[key_id] for key_id in key_ids]
+        decoded_columns = [
+            [string(value) for value in column] if kind == "s" else column
+            for kind, column in zip(kinds, columns)
+        ]
+        decoded_groups.append((keys, decoded_columns))
+    cursors = [0] * len(decoded_groups)
+    issues = []
+    for group in order:
+        keys, columns = decoded_groups[group]
+        row = cursors[group]
+        cursors[group] += 1
+        issues.append({key: column[row] for key, column in zip(keys, columns)})
+    return issues
+
+
+def decode_result(data: bytes) -> StaticAnalysisResult:
+    """
+    Deserializes bytes produced by `encode_result`.
+
+    Raises:
+        ValueError: If the payload was written by another codec version.
+    """
+    payload = msgpack.unpackb(data, raw=False, strict_map_key=False)
+    if payload.get("v") != CODEC_VERSION:
+        raise ValueError(f"Unsupported analysis result codec version: {payload.get('v')}")
+    strings: List[str] = payload["s"]
+    return StaticAnalysisResult(
+        cyclomatic_complexity=payload["m"][0],
+        cognitive_complexity=payload["m"][1],
+        halstead_metrics=payload["h"],
+        issues=_decode_issues(payload["i"], strings),
+        ast_sexp=_decode_ast(payload, strings),
+        function_signatures=[
+            FunctionSignature(
+                name=strings[name],
+                parameters=[strings[parameter] for parameter in parameters],
+                return_type=None if return_type == _NO_STRING else strings[return_type],
+            )
+            for name, parameters, return_type in payload["f"]
+        ],
+        class_hierarchies=[
+            ClassHierarchy(
+                name=strings[name],
+                parent_classes=[strings[i] for i in parents],
+                methods=[strings[i] for i in methods],
+                attributes=[strings[i] for i in attributes],
+            )
+            for name, parents, methods, attributes in payload["c"]
+        ],
+        module_dependencies=[strings[string_id] for string_id in payload["d"]],
+        facets=[strings[string_id] for string_id in payload["x"]],
+        **payload.get("e", {}),
+    )
@@ -0,0 +1,360 @@
+from collections import Counter, OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional, Tuple
+import logging
+import os
+import re
+import sqlite3
+import threading
+import time
+
+from config import get_settings
+from github_access.utils.clients import get_github_client
+from github_access.utils.github_fetcher import list_tree_blobs, fetch_blob_text
+from github_access.utils.language_registry import supported_extensions
+from github_access.utils.metrics import increment, timed
+from github_access.utils.rate_limiter import propagate_github_priority
+from github_access.utils.review_batcher import estimate_tokens
+
+logger = logging.getLogger(__name__)
+
+# Identifiers of at least three characters are the query terms taken from a hunk.
+IDENTIFIER_PATTERN = re.compile(r"[A-Za-z_][A-Za-z0-9_]{2,}")
+
+# Keywords and ubiquitous names that match nearly every snippet and would only add noise to the query.
+QUERY_STOPWORDS = frozenset({
+    "and", "any", "args", "async", "await", "bool", "break", "case", "catch", "class", "const", "continue", "def",
+    "default", "defer", "elif", "else", "err", "except", "false", "final", "finally", "for", "from", "func", "function",
+    "get", "if", "import", "int", "interface", "kwargs", "let", "nil", "none", "not", "null", "package", "pass",
+    "private", "protected", "public", "raise", "return", "self", "static", "str", "string", "struct", "super", "switch",
+    "the", "this", "throw", "throws", "true", "try", "type", "undefined", "var", "void", "while", "with", "yield",
+})
+
+# Maximum distinct terms per query; the most frequent identifiers of the hunk are kept.
+MAX_QUERY_TERMS = 32
+
+# Constant of reciprocal rank fusion when merging the BM25 word ranking with the trigram ranking.
+RRF_K = 60
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS files (
+    path TEXT PRIMARY KEY,
+    blob_sha TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS state (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS snippets (
+    id INTEGER PRIMARY KEY,
+    path TEXT NOT NULL,
+    start_line INTEGER NOT NULL,
+    end_line INTEGER NOT NULL,
+    content TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS snippets_by_path ON snippets (path);
+CREATE VIRTUAL TABLE IF NOT EXISTS snippet_words USING fts5(content, content='snippets', content_rowid='id', tokenize="unicode61 tokenchars '_'");
+CREATE VIRTUAL TABLE IF NOT EXISTS snippet_trigrams USING fts5(content, content='snippets', content_rowid='id', tokenize='trigram');
+CREATE TRIGGER IF NOT EXISTS snippets_inserted AFTER INSERT ON snippets BEGIN
+    INSERT INTO snippet_words (rowid, content) VALUES (new.id, new.content);
+    INSERT INTO snippet_trigrams (rowid, content) VALUES (new.id, new.content);
+END;
+CREATE TRIGGER IF NOT EXISTS snippets_deleted AFTER DELETE ON snippets BEGIN
+    INSERT INTO snippet_words (snippet_words, rowid, content) VALUES ('delete', old.id, old.content);
+    INSERT INTO snippet_trigrams (snippet_trigrams, rowid, content) VALUES ('delete', old.id, old.content);
+END;
+"""
+
+
+def split_snippets(file_content: str, chunk_lines: int = 40) -> List[Tuple[int, int, str]]:
+    """
+    Splits a file into snippets of `chunk_lines` lines that overlap by a quarter, so code near a boundary
+    is still retrieved together with its surroundings.
+
+    Returns:
+        List[Tuple[int, int, str]]: 1-based, inclusive (start_line, end_line, text) per snippet.
+    """
+    lines = file_content.splitlines()
+    chunk_lines = max(1, chunk_lines)
+    step = max(1, chunk_lines - chunk_lines // 4)
+    snippets = []
+    for start in range(0, len(lines), step):
+        text = "\n".join(lines[start:start + chunk_lines])
+        if text.strip():
+            snippets.append((start + 1, min(start + chunk_lines, len(lines)), text))
+        if start + chunk_lines >= len(lines):
+            break
+    return snippets
+
+
+def hunk_query_terms(hunk: str) -> List[str]:
+    """
+    Returns the most frequent identifiers of a hunk's added and context lines, without stopwords.
+    """
+    counts = Counter()
+    for line in hunk.splitlines():
+        if line.startswith(("@@", "-", "\\")):
+            continue
+        counts.update(term for term in IDENTIFIER_PATTERN.findall(line) if term.lower() not in QUERY_STOPWORDS)
+    return [term for term, _ in counts.most_common(MAX_QUERY_TERMS)]
+
+
+def split_hunks(patch: str) -> List[str]:
+    """
+    Splits a unified diff into its hunks.
+    """
+    hunks: List[List[str]] = []
+    for line in patch.splitlines():
+        if line.startswith("@@") or not hunks:
+            hunks.append([])
+        hunks[-1].append(line)
+    return ["\n".join(hunk) for hunk in hunks if hunk]
+
+
+def _match_expression(terms: List[str]) -> str:
+    # Each term is quoted so identifiers are never parsed as FTS5 operators
+    return " OR ".join('"' + term.replace('"', '""') + '"' for term in terms)
+
+
+class RetrievalIndex:
+    """
+    Local lexical index of one repository's files, split into overlapping snippets, in a SQLite database with two
+    FTS5 tables: BM25 over whole identifiers and words, and trigrams for partial identifier matches.
+    The database is memory-mapped, so several workers opening the same file share its pages through the
+    OS page cache instead of each loading a copy. No embedding service is involved.
+    """
+
+    def __init__(self, path: str, chunk_lines: int = 40, mmap_bytes: int = 268435456):
+        self.path = path
+        self.chunk_lines = chunk_lines
+        self.mmap_bytes = mmap_bytes
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._lock = threading.Lock()
+        # Held for a whole refresh so a push and a review of the same repository do not fetch the same files twice
+        self.refresh_lock = threading.Lock()
+        self._open_connection: Optional[sqlite3.Connection] = None
+        with self._lock:
+            self._connection.executescript(SCHEMA)
+
+    @property
+    def _connection(self) -> sqlite3.Connection:
+        # Accessed with `_lock` held; reopens the database after `close`, so closing never breaks a caller still using the index
+        if self._open_connection is None:
+            connection = sqlite3.connect(self.path, check_same_thread=False, timeout=30)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            connection.execute(f"PRAGMA mmap_size={int(self.mmap_bytes)}")
+            self._open_connection = connection
+        return self._open_connection
+
+    def close(self) -> None:
+        """
+        Closes the database connection, releasing its file descriptors and memory map. Using the index again reopens it.
+        """
+        with self._lock:
+            if self._open_connection is not None:
+                self._open_connection.close()
+                self._open_connection = None
+
+    def indexed_commit(self) -> Optional[str]:
+        """
+        Returns the commit the index was last refreshed to, or None if it was never built.
+        """
+        with self._lock:
+            row = self._connection.execute("SELECT value FROM state WHERE key = 'commit_sha'").fetchone()
+        return row[0] if row else None
+
+    def file_blobs(self) -> Dict[str, str]:
+        """
+        Returns the blob SHA of every indexed path.
+        """
+        with self._lock:
+            return dict(self._connection.execute("SELECT path, blob_sha FROM files"))
+
+    def replace_file(self, path: str, blob_sha: str, file_content: str) -> None:
+        """
+        Replaces the snippets of one file.
+        """
+        snippets = split_snippets(file_content, self.chunk_lines)
+        with self._lock, self._connection:
+            self._connection.execute("DELETE FROM snippets WHERE path = ?", (path,))
+            self._connection.executemany(
+                "INSERT INTO snippets (path, start_line, end_line, content) VALUES (?, ?, ?, ?)",
+                [(path, start_line, end_line, text) for start_line, end_line, text in snippets],
+            )
+            self._connection.execute("INSERT OR REPLACE INTO files (path, blob_sha) VALUES (?, ?)", (path, blob_sha))
+
+    def remove_files(self, paths: List[str]) -> None:
+        with self._lock, self._connection:
+            for path in paths:
+                self._connection.execute("DELETE FROM snippets WHERE path = ?", (path,))
+                self._connection.execute("DELETE FROM files WHERE path = ?", (path,))
+
+    def set_indexed_commit(self, commit_sha: str) -> None:
+        with self._lock, self._connection:
+            self._connection.execute("INSERT OR REPLACE INTO state (key, value) VALUES ('commit_sha', ?)", (commit_sha,))
+            self._connection.execute("INSERT OR REPLACE INTO state (key, value) VALUES ('updated_at', ?)", (str(time.time()),))
+
+    def search(self, terms: List[str], exclude_path: Optional[str] = None, limit: int = 5) -> List[Dict[str, Any]]:
+        """
+        Returns the best snippets for the query terms, ranking BM25 word matches and trigram matches
+        separately and merging both rankings by reciprocal rank fusion.
+        """
+        if not terms:
+            return []
+        expression = _match_expression(terms)
+        # Trigram queries need at least three characters per term, which IDENTIFIER_PATTERN guarantees
+        scores: Dict[int, float] = {}
+        with self._lock, timed("retrieval_search_seconds"):
+            for table in ("snippet_words", "snippet_trigrams"):
+                rows = self._connection.execute(
+                    f"""SELECT {table}.rowid FROM {table} JOIN snippets ON snippets.id = {table}.rowid
+                        WHERE {table} MATCH ? AND snippets.path != ? ORDER BY bm25({table}) LIMIT ?""",
+                    (expression, exclude_path or "", limit * 4),
+                ).fetchall()
+                for rank, (snippet_id,) in enumerate(rows):
+                    scores[snippet_id] = scores.get(snippet_id, 0.0) + 1.0 / (RRF_K + rank + 1)
+            best = sorted(scores, key=scores.get, reverse=True)[:limit]
+            if not best:
+                return []
+            rows = self._connection.execute(
+                f"SELECT id, path, start_line, end_line, content FROM snippets WHERE id IN ({','.join('?' * len(best))})", best
+            ).fetchall()
+        by_id = {row[0]: row for row in rows}
+        return [
+            {"path": path, "start_line": start_line, "end_line": end_line, "content": content, "score": scores[snippet_id]}
+            for snippet_id, path, start_line, end_line, content in (by_id[snippet_id] for snippet_id in best)
+        ]
+
+
+def refresh_retrieval_index(index: RetrievalIndex, repo, repo_name: str, commit_sha: str, max_file_bytes: int = 262144,
+                            max_files: int = 20000, concurrency: int = 8) -> int:
+    """
+    Brings the index up to date with a commit: lists its tree once, fetches and re-indexes only the files
+    whose blob changed, and removes deleted files.
+
+    Returns:
+        int: The number of files (re)indexed.
+    """
+    with index.refresh_lock:
+        if index.indexed_commit() == commit_sha:
+            return 0
+        return _refresh(index, repo, repo_name, commit_sha, max_file_bytes, max_files, concurrency)
+
+
+def _refresh(index: RetrievalIndex, repo, repo_name: str, commit_sha: str, max_file_bytes: int, max_files: int, concurrency: int) -> int:
+    with timed("retrieval_index_refresh_seconds", repo=repo_name):
+        files = list_tree_blobs(repo, commit_sha, supported_extensions(), max_file_bytes, max_files, repo_name)
+        current = index.file_blobs()
+        changed = [path for path, blob_sha in files.items() if current.get(path) != blob_sha]
+        index.remove_files([path for path in current if path not in files])
+
+        def fetch_and_index(path: str) -> None:
+            try:
+                index.replace_file(path, files[path], fetch_blob_text(repo, files[path], repo_name))
+            except Exception as e:
+                logger.warning(f"Could not add {repo_name}:{path} to the retrieval index: {str(e)}")
+
+        with ThreadPoolExecutor(max_workers=max(1, concurrency), thread_name_prefix="retrieval-index") as executor:
+            list(executor.map(propagate_github_priority(fetch_and_index), changed))
+        index.set_indexed_commit(commit_sha)
+    increment("retrieval_index_files_indexed_total", len(changed), repo=repo_name)
+    logger.info(f"Retrieval index of {repo_name} refreshed to {commit_sha}: {len(changed)} file(s) re-indexed, {len(files)} in total.")
+    return len(changed)
+
+
+def retrieve_related_snippets(index: RetrievalIndex, patch: str, exclude_path: Optional[str] = None,
+                              top_k: int = 5, token_budget: int = 1500) -> List[Dict[str, Any]]:
+    """
+    Retrieves up to `top_k` snippets per hunk of a patch and merges them round-robin across hunks,
+    skipping duplicates, until `token_budget` (estimated tokens) is used up.
+    """
+    results_per_hunk = [index.search(hunk_query_terms(hunk), exclude_path=exclude_path, limit=top_k) for hunk in split_hunks(patch)]
+    selected, seen, used = [], set(), 0
+    for position in range(top_k):
+        for results in results_per_hunk:
+            if position >= len(results):
+                continue
+            snippet = results[position]
+            key = (snippet["path"], snippet["start_line"])
+            tokens = estimate_tokens(snippet["content"])
+            if key in seen or used + tokens > token_budget:
+                continue
+            seen.add(key)
+            used += tokens
+            selected.append(snippet)
+    return selected
+
+
+def format_related_snippets(snippets: List[Dict[str, Any]]) -> str:
+    """
+    Renders retrieved snippets for a review prompt, one fenced block per snippet headed by its location.
+    """
+    return "\n".join(
+        f"`{snippet['path']}` lines {snippet['start_line']}-{snippet['end_line']}:\n```\n{snippet['content']}\n```"
+        for snippet in snippets
+    )
+
+
+def _index_path(repo_name: str) -> str:
+    return os.path.join(get_settings().RETRIEVAL_INDEX_DIR, repo_name.replace("/", "__") + ".sqlite3")
+
+
+_open_indexes: "OrderedDict[str, RetrievalIndex]" = OrderedDict()
+_open_indexes_lock = threading.Lock()
+
+
+def get_retrieval_index(repo_name: str) -> RetrievalIndex:
+    """
+    Caches and returns the retrieval index of a repository (one database file per repository, so BM25
+    statistics are not mixed across repositories). At most RETRIEVAL_INDEX_MAX_OPEN indexes are kept open;
+    the least recently used one is closed when another repository's index is opened.
+    """
+    settings = get_settings()
+    with _open_indexes_lock:
+        index = _open_indexes.get(repo_name)
+        if index is not None:
+            _open_indexes.move_to_end(repo_name)
+            return index
+        index = _open_indexes[repo_name] = RetrievalIndex(
+            _index_path(repo_name), chunk_lines=settings.RETRIEVAL_CHUNK_LINES, mmap_bytes=settings.RETRIEVAL_INDEX_MMAP_BYTES,
+        )
+        while len(_open_indexes) > max(1, settings.RETRIEVAL_INDEX_MAX_OPEN):
+            _, evicted = _open_indexes.popitem(last=False)
+            evicted.close()
+        return index
+
+
+def _refresh_limits() -> Dict[str, int]:
+    settings = get_settings()
+    return {
+        "max_file_bytes": settings.RETRIEVAL_INDEX_MAX_FILE_BYTES,
+        "max_files": settings.RETRIEVAL_INDEX_MAX_FILES,
+        "concurrency": settings.INDEX_FETCH_CONCURRENCY,
+    }
+
+
+def refresh_repository_index(repo_name: str, commit_sha: str, repo=None) -> int:
+    """
+    Refreshes a repository's retrieval index to a commit using the configured limits (e.g. on the first review).
+    """
+    return refresh_retrieval_index(
+        get_retrieval_index(repo_name), repo or get_github_client().get_repo(repo_name), repo_name, commit_sha, **_refresh_limits(),
+    )
+
+
+def refresh_repository_branch(repo_name: str, branch: str, repo=None) -> int:
+    """
+    Refreshes a repository's retrieval index to the current head of a branch (after a push). The head is read when
+    the refresh runs, under the index's refresh lock, rather than taken from the push: queued refreshes can run out
+    of order, and a refresh for an older push must not reset the index to an older tree.
+    """
+    repo = repo or get_github_client().get_repo(repo_name)
+    index = get_retrieval_index(repo_name)
+    limits = _refresh_limits()
+    with index.refresh_lock:
+        commit_sha = repo.get_branch(branch).commit.sha
+        if index.indexed_commit() == commit_sha:
+            logger.info(f"Retrieval index of {repo_name} is already at the head of {branch} ({commit_sha}).")
+            return 0
+        return _refresh(index, repo, repo_name, commit_sha, limits["max_file_bytes"], limits["max_files"], limits["concurrency"])
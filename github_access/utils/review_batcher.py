@@ -0,0 +1,70 @@
+from typing import Any, List, Tuple
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Rough characters-per-token ratio used for Gemini prompt budgeting.
+CHARS_PER_TOKEN = 4
+
+def estimate_tokens(text: str) -> int:
+    """
+    Estimates the number of model tokens needed for the given text.
+    This is a cheap heuristic (no tokenizer call) that is good enough for packing prompts.
+    """
+    if not text:
+        return 0
+    return len(text) // CHARS_PER_TOKEN + 1
+
+def truncate_to_tokens(text: str, max_tokens: int) -> str:
+    """
+    Cuts text to roughly `max_tokens` tokens at a line boundary, marking the cut.
+    """
+    max_chars = max_tokens * CHARS_PER_TOKEN
+    if len(text) <= max_chars:
+        return text
+    cut = text.rfind("\n", 0, max_chars)
+    return text[:cut if cut > 0 else max_chars] + "\n... (truncated)"
+
+def pack_review_batches(token_counts: List[Tuple[Any, int]], token_budget: int, small_file_tokens: int) -> List[List[Any]]:
+    """
+    Groups small file patches into shared Gemini requests up to a token budget.
+
+    Files whose estimate exceeds `small_file_tokens` are always reviewed on their own. Small files are
+    packed with a first-fit-decreasing strategy so each batch stays under `token_budget`.
+    Batches are returned in the order of their first file so the review still follows the PR's file order.
+
+    Args:
+        token_counts (List[Tuple[Any, int]]): (key, estimated tokens) for every file to review.
+        token_budget (int): Maximum estimated tokens of file-specific content per batched request.
+        small_file_tokens (int): Files above this estimate are never batched.
+
+    Returns:
+        List[List[Any]]: Lists of keys; each inner list is one model request.
+    """
+    order = {key: position for position, (key, _) in enumerate(token_counts)}
+    batches: List[List[Any]] = []
+    open_batches: List[Tuple[List[Any], int]] = []
+
+    small_files = []
+    for key, tokens in token_counts:
+        if tokens > small_file_tokens or tokens >= token_budget:
+            batches.append([key])
+        else:
+            small_files.append((key, tokens))
+
+    for key, tokens in sorted(small_files, key=lambda item: item[1], reverse=True):
+        for index, (batch, used) in enumerate(open_batches):
+            if used + tokens <= token_budget:
+                batch.append(key)
+                open_batches[index] = (batch, used + tokens)
+                break
+        else:
+            open_batches.append(([key], tokens))
+
+    for batch, _ in open_batches:
+        batch.sort(key=lambda key: order[key])
+        batches.append(batch)
+
+    batches.sort(key=lambda batch: order[batch[0]])
+    logger.info(f"Packed {len(token_counts)} files into {len(batches)} review request(s) ({len(small_files)} small files batched).")
+    return batches
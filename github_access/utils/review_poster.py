@@ -0,0 +1,138 @@
+from typing import Dict, Any, List, Optional, Tuple
+import logging
+
+from github.GithubException import GithubException
+from tenacity import Retrying, retry_if_exception, stop_after_attempt, wait_exponential
+
+from github_access.utils.diff_checker import get_commentable_lines
+from github_access.utils.metrics import increment, timed
+
+logger = logging.getLogger(__name__)
+
+
+def validate_review_comments(comments: List[Dict[str, Any]], patches_by_path: Dict[str, Optional[str]]) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
+    """
+    Checks every comment's position against its file's patch before anything is posted.
+    A comment whose `start_line` is not a valid start for a multi-line range (other side, other hunk,
+    or not before `line`) is kept as a single-line comment.
+
+    Args:
+        comments (List[Dict[str, Any]]): Review comments (`path`, `body`, `line`, `side`, optional `start_line`/`start_side`).
+        patches_by_path (Dict[str, Optional[str]]): The patch of each file in the pull request.
+
+    Returns:
+        Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]: (comments to post, comments rejected).
+    """
+    positions_by_path = {}
+    valid, rejected = [], []
+    for comment in comments:
+        path = comment.get("path")
+        if path not in positions_by_path:
+            positions_by_path[path] = get_commentable_lines(patches_by_path.get(path) or "")
+        positions = positions_by_path[path]
+        side = comment.get("side", "RIGHT")
+        hunk = positions.get((side, comment.get("line")))
+        if hunk is None:
+            rejected.append(comment)
+            continue
+
+        comment = dict(comment)
+        start_line = comment.get("start_line")
+        start_side = comment.get("start_side", side)
+        if start_line is not None and not (
+            start_side == side and start_line < comment["line"] and positions.get((start_side, start_line)) == hunk
+        ):
+            comment.pop("start_line", None)
+            comment.pop("start_side", None)
+        valid.append(comment)
+    return valid, rejected
+
+
+def _is_secondary_rate_limit(exception: BaseException) -> bool:
+    if not isinstance(exception, GithubException) or exception.status not in (403, 429):
+        return False
+    headers = {key.lower(): value for key, value in (exception.headers or {}).items()}
+    return "retry-after" in headers or "secondary rate limit" in str(exception.data).lower() or exception.status == 429
+
+
+def _wait_for_retry_after(retry_state) -> float:
+    """
+    Waits as long as GitHub's Retry-After header asks, or backs off exponentially without one.
+    """
+    exception = retry_state.outcome.exception()
+    headers = {key.lower(): value for key, value in (getattr(exception, "headers", None) or {}).items()}
+    try:
+        return float(headers["retry-after"])
+    except (KeyError, ValueError):
+        return wait_exponential(multiplier=1, min=4, max=60)(retry_state)
+
+
+class ReviewPoster:
+    """
+    Posts review comments in chunks of `chunk_size`, retrying secondary rate limits with backoff.
+    A chunk that GitHub rejects as unprocessable (422) is bisected so that only the comments it
+    refuses are dropped.
+    """
+
+    def __init__(self, pull_request, repo_name: Optional[str] = None, chunk_size: int = 30, max_attempts: int = 5):
+        self.pull_request = pull_request
+        self.repo_name = repo_name
+        self.chunk_size = max(1, chunk_size)
+        self.max_attempts = max_attempts
+        self.reviews_posted = 0
+        self.posted: List[Dict[str, Any]] = []
+        self.dropped: List[Dict[str, Any]] = []
+
+    def _create_review(self, body: str, comments: List[Dict[str, Any]]) -> None:
+        def log_retry(retry_state):
+            increment("review_post_retries_total", repo=self.repo_name)
+            logger.warning(f"Secondary rate limit while posting review to PR #{self.pull_request.number}; retry {retry_state.attempt_number}.")
+
+        for attempt in Retrying(
+            retry=retry_if_exception(_is_secondary_rate_limit),
+            stop=stop_after_attempt(self.max_attempts),
+            wait=_wait_for_retry_after,
+            before_sleep=log_retry,
+            reraise=True,
+        ):
+            with attempt, timed("review_post_seconds", repo=self.repo_name):
+                self.pull_request.create_review(body=body, event="COMMENT", comments=comments)
+        self.reviews_posted += 1
+
+    def _post_chunk(self, body: str, comments: List[Dict[str, Any]]) -> None:
+        try:
+            self._create_review(body, comments)
+            self.posted.extend(comments)
+        except GithubException as e:
+            if e.status != 422 or not comments:
+                raise
+            if len(comments) == 1:
+                logger.warning(f"GitHub rejected comment on {comments[0].get('path')}:{comments[0].get('line')}: {e.data}")
+                self.dropped.extend(comments)
+                increment("review_comments_dropped_total", reason="rejected", repo=self.repo_name)
+                return
+            middle = len(comments) // 2
+            self._post_chunk(body, comments[:middle])
+            self._post_chunk(body, comments[middle:])
+
+    def post(self, body: str, comments: List[Dict[str, Any]]) -> Dict[str, int]:
+        """
+        Posts the comments as one review per chunk; later chunks are marked as continuations.
+        Without comments, a single review carrying only the body is posted.
+
+        Returns:
+            Dict[str, int]: Counts of `posted` and `dropped` comments and `reviews` created.
+
+        Raises:
+            GithubException: For errors other than unprocessable comments, or when retries are exhausted.
+        """
+        chunks = [comments[start:start + self.chunk_size] for start in range(0, len(comments), self.chunk_size)] or [[]]
+        for index, chunk in enumerate(chunks):
+            chunk_body = body if index == 0 else f"{body} (continued, part {index + 1} of {len(chunks)})"
+            try:
+                self._post_chunk(chunk_body, chunk)
+            except Exception:
+                increment("review_post_failures_total", repo=self.repo_name)
+                raise
+        increment("review_comments_posted_total", len(self.posted), repo=self.repo_name)
+        return {"posted": len(self.posted), "dropped": len(self.dropped), "reviews": self.reviews_posted}
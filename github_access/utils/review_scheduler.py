@@ -0,0 +1,196 @@
+from functools import lru_cache
+from typing import Any, Callable, Dict, List, Optional
+import itertools
+import logging
+import threading
+import time
+
+from config import get_settings
+from github_access.utils.metrics import increment, observe, set_gauge
+from github_access.utils.rate_limiter import github_priority
+
+logger = logging.getLogger(__name__)
+
+
+def estimate_review_cost(pull_request_payload: Optional[Dict[str, Any]], file_cost: int = 50) -> float:
+    """
+    Estimates the cost of reviewing a pull request from the `pull_request` object of a webhook payload:
+    changed lines plus `file_cost` per changed file (each file costs a fetch, an analysis and prompt overhead).
+    """
+    payload = pull_request_payload or {}
+    changed_lines = (payload.get("additions") or 0) + (payload.get("deletions") or 0)
+    return float(max(1, changed_lines + file_cost * (payload.get("changed_files") or 0)))
+
+
+class _ReviewJob:
+    __slots__ = ("repo", "cost", "sequence", "enqueued_at", "function", "args", "kwargs")
+
+    def __init__(self, repo: str, cost: float, sequence: int, function: Callable[..., Any], args: tuple, kwargs: Dict[str, Any]):
+        self.repo = repo
+        self.cost = cost
+        self.sequence = sequence
+        self.enqueued_at = time.monotonic()
+        self.function = function
+        self.args = args
+        self.kwargs = kwargs
+
+
+class ReviewScheduler:
+    """
+    Runs review jobs on a fixed pool of worker threads instead of FIFO background tasks.
+
+    Repositories share the workers by weighted fair queuing: each repository has a virtual finish time that
+    advances by `cost / weight` per dispatched job, and the job with the earliest finish tag runs next, so one
+    repository with a stream of huge PRs cannot starve the others. Within a repository, the cheapest job
+    (shortest job first) runs first; its cost is divided by `1 + waited / aging_seconds` so large PRs still
+    make progress. At most `per_repo_limit` jobs of one repository run at the same time.
+    """
+
+    def __init__(self, workers: int = 4, per_repo_limit: int = 2, repo_weights: Optional[Dict[str, float]] = None,
+                 aging_seconds: float = 600.0):
+        self.workers = max(1, workers)
+        self.per_repo_limit = max(1, per_repo_limit)
+        self.repo_weights = dict(repo_weights or {})
+        self.aging_seconds = aging_seconds
+        self._condition = threading.Condition()
+        self._queues: Dict[str, List[_ReviewJob]] = {}
+        self._running: Dict[str, int] = {}
+        self._finish_tags: Dict[str, float] = {}
+        self._virtual_time = 0.0
+        self._sequence = itertools.count()
+        self._threads: List[threading.Thread] = []
+
+    def submit(self, repo: str, cost: float, function: Callable[..., Any], *args: Any, **kwargs: Any) -> None:
+        """
+        Queues `function(*args, **kwargs)` as a review job of the repository with the given estimated cost.
+        """
+        job = _ReviewJob(repo, max(float(cost), 1.0), next(self._sequence), function, args, kwargs)
+        with self._condition:
+            self._start_workers()
+            self._queues.setdefault(repo, []).append(job)
+            self._update_gauges(repo)
+            self._condition.notify()
+        logger.info(f"Queued review job for {repo} (cost {job.cost:.0f}, {self.queue_depth(repo)} queued for the repository).")
+
+    def queue_depth(self, repo: Optional[str] = None) -> int:
+        """
+        Returns the number of queued (not yet running) jobs of one repository, or of all repositories.
+        """
+        with self._condition:
+            if repo is not None:
+                return len(self._queues.get(repo, []))
+            return sum(len(queue) for queue in self._queues.values())
+
+    def snapshot(self) -> Dict[str, Dict[str, int]]:
+        """
+        Returns the queued and running job counts per repository.
+        """
+        with self._condition:
+            repos = set(self._queues) | set(self._running)
+            return {
+                repo: {"queued": len(self._queues.get(repo, [])), "running": self._running.get(repo, 0)}
+                for repo in sorted(repos)
+            }
+
+    def _start_workers(self) -> None:
+        # Called with the lock held; workers are started on first use so importing the module has no side effects
+        while len(self._threads) < self.workers:
+            thread = threading.Thread(target=self._work, name=f"review-worker-{len(self._threads)}", daemon=True)
+            self._threads.append(thread)
+            thread.start()
+
+    def _update_gauges(self, repo: str) -> None:
+        set_gauge("review_queue_depth", len(self._queues.get(repo, [])), repo=repo)
+        set_gauge("review_jobs_running", self._running.get(repo, 0), repo=repo)
+
+    def _effective_cost(self, job: _ReviewJob, now: float) -> float:
+        if self.aging_seconds <= 0:
+            return job.cost
+        return job.cost / (1.0 + (now - job.enqueued_at) / self.aging_seconds)
+
+    def _next_job(self) -> Optional[_ReviewJob]:
+        """
+        Removes and returns the job with the earliest virtual finish tag among repositories below their
+        concurrency cap, or None if none can run. Called with the lock held.
+        """
+        now = time.monotonic()
+        best = None
+        for repo, queue in self._queues.items():
+            if not queue or self._running.get(repo, 0) >= self.per_repo_limit:
+                continue
+            # Review queues are short, so a scan is cheaper than keeping a heap whose keys change as jobs age
+            job = min(queue, key=lambda queued: (self._effective_cost(queued, now), queued.sequence))
+            start_tag = max(self._virtual_time, self._finish_tags.get(repo, 0.0))
+            finish_tag = start_tag + self._effective_cost(job, now) / self.repo_weights.get(repo, 1.0)
+            if best is None or (finish_tag, job.sequence) < (best[0], best[2].sequence):
+                best = (finish_tag, start_tag, job)
+        if best is None:
+            return None
+
+        finish_tag, start_tag, job = best
+        self._queues[job.repo].remove(job)
+        self._finish_tags[job.repo] = finish_tag
+        self._virtual_time = start_tag
+        self._running[job.repo] = self._running.get(job.repo, 0) + 1
+        self._update_gauges(job.repo)
+        self._prune_finish_tags()
+        return job
+
+    def _prune_finish_tags(self) -> None:
+        # Called with the lock held. An idle repository's finish tag only matters while it is ahead of the
+        # virtual clock; once the clock passes it, the repository would start at the clock anyway. When no job
+        # is queued or running, every repository is idle and the clock restarts.
+        if not self._running and not any(self._queues.values()):
+            self._finish_tags.clear()
+            self._virtual_time = 0.0
+            return
+        for repo in [repo for repo, tag in self._finish_tags.items() if tag <= self._virtual_time]:
+            if repo not in self._running and not self._queues.get(repo):
+                del self._finish_tags[repo]
+
+    def _finish_job(self, job: _ReviewJob) -> None:
+        # Called with the lock held
+        self._running[job.repo] -= 1
+        self._update_gauges(job.repo)
+        if not self._running[job.repo] and not self._queues.get(job.repo):
+            del self._running[job.repo]
+            self._queues.pop(job.repo, None)
+            self._prune_finish_tags()
+
+    def _work(self) -> None:
+        while True:
+            with self._condition:
+                job = self._next_job()
+                while job is None:
+                    self._condition.wait()
+                    job = self._next_job()
+
+            observe("review_queue_wait_seconds", time.monotonic() - job.enqueued_at, repo=job.repo)
+            status = "succeeded"
+            try:
+                # Queued jobs yield the GitHub budget to interactive requests
+                with github_priority("background"):
+                    job.function(*job.args, **job.kwargs)
+            except Exception as e:
+                status = "failed"
+                logger.error(f"Review job for {job.repo} failed: {str(e)}", exc_info=True)
+            finally:
+                increment("review_jobs_total", repo=job.repo, status=status)
+                with self._condition:
+                    self._finish_job(job)
+                    # A finished job may unblock a repository that was at its cap
+                    self._condition.notify_all()
+
+
+@lru_cache
+def get_review_scheduler() -> ReviewScheduler:
+    """
+    Caches and returns the process-wide review scheduler.
+    """
+    settings = get_settings()
+    return ReviewScheduler(
+        workers=settings.REVIEW_WORKERS,
+        per_repo_limit=settings.REVIEW_REPO_MAX_CONCURRENCY,
+        repo_weights=settings.REVIEW_REPO_WEIGHTS,
+        aging_seconds=settings.REVIEW_QUEUE_AGING_SECONDS,
+    )
@@ -0,0 +1,112 @@
+from pydantic import BaseModel
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+import logging
+import math
+
+logger = logging.getLogger(__name__)
+
+# Weight of one linter/scanner finding by its lower-cased severity (or pylint message type).
+# ESLint reports severities as 1 (warning) and 2 (error).
+ISSUE_SEVERITY_WEIGHTS = {
+    "critical": 8.0, "fatal": 8.0, "high": 5.0, "error": 3.0, "2": 3.0, "medium": 3.0,
+    "warning": 1.0, "1": 1.0, "low": 1.0, "refactor": 0.5, "convention": 0.25, "info": 0.25,
+}
+# Findings of security scanners count this many times more than style or correctness findings.
+SECURITY_TOOLS = frozenset({"bandit"})
+SECURITY_WEIGHT = 2.0
+
+# Complexity of the touched scopes up to these values is considered normal and adds no risk.
+CYCLOMATIC_BASELINE = 10
+COGNITIVE_BASELINE = 15
+
+# Caps keep one signal (e.g. a huge but mechanical change) from outweighing all others.
+MAX_SIZE_SCORE = 10.0
+MAX_COMPLEXITY_SCORE = 10.0
+MAX_ISSUE_SCORE = 20.0
+
+
+class RiskAssessment(BaseModel):
+    score: float
+    reasons: List[str] = []
+
+
+def count_changed_lines(patch: Optional[str]) -> int:
+    """
+    Counts the added and removed lines of a unified diff patch.
+    """
+    if not patch:
+        return 0
+    return sum(
+        1 for line in patch.splitlines()
+        if line[:1] in ("+", "-") and not line.startswith(("+++ ", "--- "))
+    )
+
+
+def issue_weight(issue: Dict[str, Any]) -> float:
+    """
+    Returns the risk weight of one linter/scanner finding.
+    """
+    label = str(issue.get("severity") or issue.get("type") or "").lower()
+    weight = ISSUE_SEVERITY_WEIGHTS.get(label, 1.0)
+    if issue.get("tool") in SECURITY_TOOLS:
+        weight *= SECURITY_WEIGHT
+    return weight
+
+
+def assess_file_risk(patch: Optional[str], static_result: Any) -> RiskAssessment:
+    """
+    Scores how likely a changed file is to deserve a deep review, without any model call.
+
+    The score adds three capped parts: the size of the change (log2 of the changed lines), the complexity
+    of the touched scopes above a normal baseline, and the weighted linter/scanner findings (security
+    findings count double). `reasons` lists the contributing signals for logs and the escalated prompt.
+    """
+    reasons = []
+    changed_lines = count_changed_lines(patch)
+    size_score = min(math.log2(1 + changed_lines), MAX_SIZE_SCORE)
+    if changed_lines:
+        reasons.append(f"{changed_lines} changed lines")
+
+    cyclomatic = getattr(static_result, "cyclomatic_complexity", 0) or 0
+    cognitive = getattr(static_result, "cognitive_complexity", 0) or 0
+    complexity_score = min(
+        max(0, cyclomatic - CYCLOMATIC_BASELINE) * 0.5 + max(0, cognitive - COGNITIVE_BASELINE) * 0.25,
+        MAX_COMPLEXITY_SCORE,
+    )
+    if complexity_score:
+        reasons.append(f"cyclomatic complexity {cyclomatic}, cognitive complexity {cognitive}")
+
+    issues = getattr(static_result, "issues", None) or []
+    issue_score = min(sum(issue_weight(issue) for issue in issues), MAX_ISSUE_SCORE)
+    security_findings = sum(1 for issue in issues if issue.get("tool") in SECURITY_TOOLS)
+    if security_findings:
+        reasons.append(f"{security_findings} security finding{'s' if security_findings != 1 else ''}")
+    if len(issues) > security_findings:
+        reasons.append(f"{len(issues) - security_findings} linter finding{'s' if len(issues) - security_findings != 1 else ''}")
+
+    return RiskAssessment(score=round(size_score + complexity_score + issue_score, 2), reasons=reasons)
+
+
+def select_escalations(candidates: Iterable[Tuple[Any, float, int]], min_score: float, token_budget: int) -> List[Any]:
+    """
+    Picks the files to escalate to the stronger model: the highest scores first, skipping files below
+    `min_score` and files whose estimated prompt tokens no longer fit in `token_budget`.
+
+    Args:
+        candidates (Iterable[Tuple[Any, float, int]]): (key, risk score, estimated prompt tokens) per file.
+        min_score (float): Files scoring below this are never escalated.
+        token_budget (int): Estimated prompt tokens shared by all escalated files.
+
+    Returns:
+        List[Any]: Keys of the escalated files, highest risk first.
+    """
+    selected = []
+    remaining = token_budget
+    for key, score, tokens in sorted(candidates, key=lambda candidate: -candidate[1]):
+        if score < min_score:
+            break
+        if tokens > remaining:
+            continue
+        selected.append(key)
+        remaining -= tokens
+    return selected
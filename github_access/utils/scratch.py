@@ -0,0 +1,111 @@
+from contextlib import contextmanager
+from typing import Iterator, Set
+import logging
+import os
+import shutil
+import tempfile
+import threading
+import time
+
+from github_access.utils.metrics import increment, set_gauge
+
+logger = logging.getLogger(__name__)
+
+SCRATCH_PREFIX = "code-analysis-"
+# RAM-backed filesystem used for scratch files when SCRATCH_DIR is not set (Linux)
+DEFAULT_RAM_DIR = "/dev/shm"
+
+_active_dirs: Set[str] = set()
+_active_lock = threading.Lock()
+
+
+def get_scratch_root() -> str:
+    """
+    Returns the directory scratch directories are created in: SCRATCH_DIR if set, otherwise /dev/shm
+    when it is writable, otherwise the system temp directory.
+    """
+    # Imported lazily: config imports the static analyzer, which creates its scratch files through this module.
+    from config import get_settings
+    configured = get_settings().SCRATCH_DIR
+    if configured:
+        return configured
+    if os.path.isdir(DEFAULT_RAM_DIR) and os.access(DEFAULT_RAM_DIR, os.W_OK | os.X_OK):
+        return DEFAULT_RAM_DIR
+    return tempfile.gettempdir()
+
+
+def _remove_scratch_dir(path: str) -> bool:
+    failed = []
+    shutil.rmtree(path, onerror=lambda function, failed_path, exc_info: failed.append(failed_path))
+    if failed or os.path.exists(path):
+        logger.error(f"Could not remove scratch directory {path}; {len(failed)} path(s) leaked.")
+        increment("scratch_leaked_total", reason="cleanup_failed")
+        return False
+    return True
+
+
+@contextmanager
+def scratch_directory() -> Iterator[str]:
+    """
+    Creates a private scratch directory for one analysis and removes it on exit, including when the
+    analysis raises. The directory name carries the PID so directories left behind by a crashed worker
+    can be found by `sweep_stale_scratch_dirs`.
+    """
+    path = tempfile.mkdtemp(prefix=f"{SCRATCH_PREFIX}{os.getpid()}-", dir=get_scratch_root())
+    with _active_lock:
+        _active_dirs.add(path)
+        set_gauge("scratch_dirs_active", len(_active_dirs))
+    try:
+        yield path
+    finally:
+        _remove_scratch_dir(path)
+        with _active_lock:
+            _active_dirs.discard(path)
+            set_gauge("scratch_dirs_active", len(_active_dirs))
+
+
+def _process_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def sweep_stale_scratch_dirs(max_age_seconds: float = 3600) -> int:
+    """
+    Removes scratch directories whose owning process has exited, or that are older than `max_age_seconds`
+    and not in use by this process. Each one is counted as leaked.
+
+    Returns:
+        int: The number of leaked directories found.
+    """
+    root = get_scratch_root()
+    try:
+        entries = list(os.scandir(root))
+    except OSError as e:
+        logger.warning(f"Could not scan scratch root {root}: {str(e)}")
+        return 0
+
+    with _active_lock:
+        active = set(_active_dirs)
+    leaked = 0
+    now = time.time()
+    for entry in entries:
+        if not entry.name.startswith(SCRATCH_PREFIX) or not entry.is_dir(follow_symlinks=False) or entry.path in active:
+            continue
+        owner = entry.name[len(SCRATCH_PREFIX):].split("-", 1)[0]
+        try:
+            owner_alive = owner.isdigit() and int(owner) != os.getpid() and _process_alive(int(owner))
+            expired = now - entry.stat(follow_symlinks=False).st_mtime > max_age_seconds
+        except OSError:
+            continue
+        if owner_alive and not expired:
+            continue
+        leaked += 1
+        increment("scratch_leaked_total", reason="stale")
+        logger.warning(f"Removing leaked scratch directory {entry.path}.")
+        _remove_scratch_dir(entry.path)
+    return leaked
@@ -3,38 +3,25 @@ import subprocess
 import json
 import re
 import xml.etree.ElementTree as ET
+from contextlib import nullcontext
 from pathlib import Path
-from typing import Dict, Any, List, Optional
+from typing import Dict, Any, Iterable, List, Optional, Set, Tuple
 import logging
-import tempfile
+import signal
+import textwrap
+import time
 
 from pydantic import BaseModel
 from radon.complexity import cc_visit
 from radon.metrics import h_visit
-from tree_sitter import Parser
-from tree_sitter_languages import get_language
 
-logger = logging.getLogger(__name__)
+from github_access.utils.language_registry import get_supported_languages, get_parser_pool, canonical_extension
+from github_access.utils.metrics import observe, timed, increment
+from github_access.utils.profiling import record_subprocess
+from github_access.utils.scratch import scratch_directory
+from github_access.utils.subprocess_runner import run_limited, get_linter_limits, SubprocessLimitExceeded
 
-try:
-    PYTHON_LANGUAGE = get_language("python")
-    GO_LANGUAGE = get_language("go")
-    JAVASCRIPT_LANGUAGE = get_language("javascript")
-    JAVA_LANGUAGE = get_language("java")
-    
-    supported_languages = {
-        ".py": PYTHON_LANGUAGE,
-        ".go": GO_LANGUAGE,
-        ".js": JAVASCRIPT_LANGUAGE,
-        ".java": JAVA_LANGUAGE,
-    }
-    logger.info("Tree-sitter languages loaded successfully in static_analyzer.")
-except Exception as e:
-    logger.error(f"Failed to load Tree-sitter languages in static_analyzer: {str(e)}. AST-based analysis might be limited.", exc_info=True)
-    supported_languages = {} 
-
-# Initialize Tree-sitter parser
-parser = Parser()
+logger = logging.getLogger(__name__)
 
 class FunctionSignature(BaseModel):
     name: str
@@ -59,224 +46,126 @@ class StaticAnalysisResult(BaseModel):
     function_signatures: List[FunctionSignature] = [] 
     class_hierarchies: List[ClassHierarchy] = []     
     module_dependencies: List[str] = []            
-
-def perform_static_analysis(file_content: str, ext: str) -> StaticAnalysisResult:
+    facets: List[str] = []  # Facets that were requested; fields of other facets are left empty
+    tool_errors: List[Dict[str, Any]] = []  # Linters that were missing, timed out or hit a resource limit
+
+# Independently requestable parts of an analysis. "license" is the reuse scan, "linters" the language linters.
+ANALYSIS_FACETS = frozenset({"ast", "complexity", "halstead", "linters", "context", "license"})
+
+# Internal steps each facet needs; "parse" is the Tree-sitter parse shared by the AST-based facets.
+FACET_DEPENDENCIES = {
+    "ast": {"parse"},
+    "complexity": {"parse"},
+    "context": {"parse"},
+}
+
+# Node (ESLint) and the JVM (Checkstyle) reserve far more virtual address space than they use and fail
+# to start under RLIMIT_AS; their memory is capped with RLIMIT_DATA instead.
+ADDRESS_SPACE_RESERVING_TOOLS = {"eslint", "checkstyle"}
+
+DECISION_NODE_TYPES = [
+    "if_statement", "for_statement", "while_statement", "switch_statement", "case_statement", "else_clause", "catch_clause", "do_statement"
+]
+
+# Node types treated as an enclosing scope when analysis is restricted to changed regions.
+SCOPE_NODE_TYPES = {
+    "function_definition", "class_definition",              # Python
+    "function_declaration", "method_declaration",           # Go, JavaScript, Java
+    "class_declaration", "interface_declaration", "constructor_declaration",
+    "method_definition", "arrow_function", "function_expression", "type_declaration",
+}
+
+def _overlaps(node, changed_ranges: List[Tuple[int, int]]) -> bool:
     """
-    Performs static analysis on the given file content using Tree-sitter and external tools.
-    Includes AST parsing, complexity metrics, and integration with linters/scanners.
+    Returns True if the node's (1-based) line span intersects any of the changed ranges.
     """
-    cyclomatic = 0
-    cognitive = 0
-    halstead = {}
-    issues = []
-    ast_sexp = "AST not available for this language or due to parsing error."
-    function_signatures = []
-    class_hierarchies = []
-    module_dependencies = []
+    start, end = node.start_point[0] + 1, node.end_point[0] + 1
+    return any(start <= range_end and range_start <= end for range_start, range_end in changed_ranges)
 
-    # Tree-sitter for AST and AST-based metrics & Context Extraction
-    if ext in supported_languages:
+def _find_scope_nodes(root_node, changed_ranges: List[Tuple[int, int]]) -> List[Any]:
+    """
+    Maps changed line ranges onto the innermost enclosing functions/classes.
+    Changes outside any definition fall back to the touched top-level statement.
+    """
+    def collect(node) -> List[Any]:
+        if not _overlaps(node, changed_ranges):
+            return []
+        inner = [scope for child in node.children for scope in collect(child)]
+        if inner:
+            return inner
+        return [node] if node.type in SCOPE_NODE_TYPES else []
+
+    scopes = []
+    for top_level_node in root_node.children:
+        if not _overlaps(top_level_node, changed_ranges):
+            continue
+        scopes.extend(collect(top_level_node) or [top_level_node])
+    return scopes
+
+def _filter_issues_to_ranges(issues: List[Dict[str, Any]], changed_ranges: List[Tuple[int, int]], context_radius: int) -> List[Dict[str, Any]]:
+    """
+    Keeps only issues reported on touched lines (plus a context radius).
+    Issues without a line number (e.g. file-level license findings) are always kept.
+    """
+    filtered = []
+    for issue in issues:
         try:
-            parser.set_language(supported_languages[ext])
-            code_bytes = bytes(file_content, "utf8")
-            tree = parser.parse(code_bytes)
-            root_node = tree.root_node
-            ast_sexp = root_node.sexp()
-
-            # Basic Cyclomatic Complexity (simplified for general languages via Tree-sitter)
-            # For Python, radon's cc_visit is more accurate.
-            if ext == ".py":
-                try:
-                    # radon's cc_visit returns a list of CodeBlock objects
-                    blocks = cc_visit(file_content)
-                    cyclomatic = sum(block.complexity for block in blocks)
-                except Exception as e:
-                    logger.warning(f"Radon Cyclomatic Complexity failed for Python: {str(e)}", exc_info=True)
-                    # Fallback to Tree-sitter based if radon fails
-                    cyclomatic = sum(1 for node in root_node.children if node.type in [
-                        "if_statement", "for_statement", "while_statement", "switch_statement", "case_statement", "else_clause", "catch_clause", "do_statement"
-                    ])
-            else:
-                cyclomatic = sum(1 for node in root_node.children if node.type in [
-                    "if_statement", "for_statement", "while_statement", "switch_statement", "case_statement", "else_clause", "catch_clause", "do_statement"
-                ])
-
-
-            # Basic Cognitive Complexity (simplified via Tree-sitter)
-            # This is a heuristic and not a precise Cognitive Complexity calculation.
-            def calculate_cognitive_recursive(node, depth=0):
-                nonlocal cognitive
-
-                if node.type in ["if_statement", "for_statement", "while_statement", "switch_statement", "try_statement", "catch_clause", "do_statement"]:
-                    cognitive += (depth + 1) # Each level of nesting adds to cognitive complexity
-                
-                if node.type in ["break_statement", "continue_statement", "return_statement"]:
-                    cognitive += 1
-
-                for child in node.children:
-                    calculate_cognitive_recursive(child, depth + 1)
-            
-            calculate_cognitive_recursive(root_node)
-
-            # --- Context Extraction (Function Signatures, Class Hierarchies, Module Dependencies) ---
-            if ext == ".py":
-                for node in root_node.children:
-                    if node.type == 'function_definition':
-                        name_node = node.child_by_field_name('name')
-                        parameters_node = node.child_by_field_name('parameters')
-                        return_type_node = node.child_by_field_name('return_type')
-
-                        name = name_node.text.decode('utf-8') if name_node else 'unknown'
-                        params = []
-                        if parameters_node:
-                            for param_node in parameters_node.children:
-                                if param_node.type == 'identifier':
-                                    params.append(param_node.text.decode('utf-8'))
-                                elif param_node.type == 'typed_parameter':
-                                    param_name_node = param_node.child_by_field_name('name')
-                                    if param_name_node:
-                                        params.append(param_name_node.text.decode('utf-8'))
-                        
-                        return_type = return_type_node.text.decode('utf-8') if return_type_node else None
-                        function_signatures.append(FunctionSignature(name=name, parameters=params, return_type=return_type))
-
-                # Extract Python Class Hierarchies
-                for node in root_node.children:
-                    if node.type == 'class_definition':
-                        name_node = node.child_by_field_name('name')
-                        superclasses_node = node.child_by_field_name('superclasses')
-                        body_node = node.child_by_field_name('body')
-
-                        name = name_node.text.decode('utf-8') if name_node else 'unknown'
-                        parent_classes = []
-                        if superclasses_node:
-                            for superclass_child in superclasses_node.children:
-                                if superclass_child.type == 'identifier':
-                                    parent_classes.append(superclass_child.text.decode('utf-8'))
-                                elif superclass_child.type == 'attribute':
-                                    parent_classes.append(superclass_child.text.decode('utf-8'))
-
-                        methods = []
-                        attributes = []
-                        if body_node:
-                            for class_body_node in body_node.children:
-                                if class_body_node.type == 'function_definition':
-                                    method_name_node = class_body_node.child_by_field_name('name')
-                                    if method_name_node:
-                                        methods.append(method_name_node.text.decode('utf-8'))
-                                elif class_body_node.type == 'expression_statement':
-                                    assignment_node = class_body_node.child(0)
-                                    if assignment_node and assignment_node.type == 'assignment':
-                                        left_side = assignment_node.child_by_field_name('left')
-                                        if left_side and left_side.type == 'attribute':
-                                            attribute_name_node = left_side.child_by_field_name('attribute')
-                                            if attribute_name_node:
-                                                attributes.append(attribute_name_node.text.decode('utf-8'))
-                        
-                        class_hierarchies.append(ClassHierarchy(name=name, parent_classes=parent_classes, methods=methods, attributes=attributes))
-
-                # Extract Python Module Dependencies (imports)
-                for node in root_node.children:
-                    if node.type == 'import_statement' or node.type == 'import_from_statement':
-                        for child in node.children:
-                            if child.type == 'dotted_name':\
-                                module_dependencies.append(child.text.decode('utf-8'))
-                            elif child.type == 'aliased_import':
-                                dotted_name_node = child.child_by_field_name('name')
-                                if dotted_name_node:
-                                    module_dependencies.append(dotted_name_node.text.decode('utf-8'))
-                            elif child.type == 'import_as_clause': 
-                                name_node = child.child_by_field_name('name')
-                                if name_node:
-                                    module_dependencies.append(name_node.text.decode('utf-8'))
-                            elif child.type == 'identifier': 
-                                module_dependencies.append(child.text.decode('utf-8'))
-                module_dependencies = list(sorted(set(module_dependencies)))
-
-            elif ext == ".js":
-                for node in root_node.children:
-                    if node.type == 'function_declaration' or node.type == 'arrow_function':
-                        name_node = node.child_by_field_name('name')
-                        parameters_node = node.child_by_field_name('parameters')
-                        name = name_node.text.decode('utf-8') if name_node else 'anonymous'
-                        params = [p.text.decode('utf-8') for p in parameters_node.children if p.type == 'identifier'] if parameters_node else []
-                        function_signatures.append(FunctionSignature(name=name, parameters=params))
-                    elif node.type == 'import_statement':
-                        source_node = node.child_by_field_name('source')
-                        if source_node:
-                            module_dependencies.append(source_node.text.decode('utf-8').strip("'\""))
-                module_dependencies = list(sorted(set(module_dependencies))) # Remove duplicates
-
-            elif ext == ".java":
-                for node in root_node.children:
-                    if node.type == 'class_declaration':
-                        name_node = node.child_by_field_name('name')
-                        class_name = name_node.text.decode('utf-8') if name_node else 'unknown'
-                        
-                        extends_clause = node.child_by_field_name('superclass')
-                        parent_classes = [extends_clause.text.decode('utf-8').split()[-1]] if extends_clause else [] # Extract class name from "extends ClassName"
-                        
-                        class_methods = []
-                        class_attributes = []
-                        body_node = node.child_by_field_name('body')
-                        if body_node:
-                            for member in body_node.children:
-                                if member.type == 'method_declaration':
-                                    method_name_node = member.child_by_field_name('name')
-                                    if method_name_node:
-                                        class_methods.append(method_name_node.text.decode('utf-8'))
-                                elif member.type == 'field_declaration':
-                                    declarator = member.child_by_field_name('declarator')
-                                    if declarator and declarator.type == 'variable_declarator':
-                                        attr_name_node = declarator.child_by_field_name('name')
-                                        if attr_name_node:
-                                            class_attributes.append(attr_name_node.text.decode('utf-8'))
-                        
-                        class_hierarchies.append(ClassHierarchy(name=class_name, parent_classes=parent_classes, methods=class_methods, attributes=class_attributes))
-                    elif node.type == 'import_declaration':
-                        dotted_name_node = node.child_by_field_name('name')
-                        if dotted_name_node:
-                            module_dependencies.append(dotted_name_node.text.decode('utf-8'))
-                module_dependencies = list(sorted(set(module_dependencies)))
-
-
-            elif ext == ".go":
-                for node in root_node.children:
-                    if node.type == 'function_declaration':
-                        name_node = node.child_by_field_name('name')
-                        parameters_node = node.child_by_field_name('parameters')
-                        result_node = node.child_by_field_name('result') 
-                        
-                        name = name_node.text.decode('utf-8') if name_node else 'unknown'
-                        params = []
-                        if parameters_node:
-                            for param_list_node in parameters_node.children:
-                                if param_list_node.type == 'parameter_declaration':
-                                    for param_child in param_list_node.children:
-                                        if param_child.type == 'identifier':
-                                            params.append(param_child.text.decode('utf-8'))
-                        
-                        return_type = result_node.text.decode('utf-8') if result_node else None
-                        function_signatures.append(FunctionSignature(name=name, parameters=params, return_type=return_type))
-                    elif node.type == 'import_declaration':
-                        for import_spec in node.children:
-                            if import_spec.type == 'import_spec':
-                                path_node = import_spec.child_by_field_name('path')
-                                if path_node:
-                                    module_dependencies.append(path_node.text.decode('utf-8').strip('\"'))
-                module_dependencies = list(sorted(set(module_dependencies)))
+            line = int(issue.get("line"))
+        except (TypeError, ValueError):
+            filtered.append(issue)
+            continue
+        if any(start - context_radius <= line <= end + context_radius for start, end in changed_ranges):
+            filtered.append(issue)
+    return filtered
+
+def _add_tool_error(tool_errors: List[Dict[str, Any]], tool: str, error: str, message: str) -> None:
+    tool_errors.append({"tool": tool, "error": error, "message": message})
+    increment("linter_errors_total", tool=tool, error=error)
+
+def _run_linter(tool: str, command: List[str], ext: str, tool_errors: List[Dict[str, Any]], input_text: Optional[str] = None) -> subprocess.CompletedProcess:
+    """
+    Runs a linter/scanner subprocess under the configured timeout, memory/CPU and output limits
+    (LINTER_* settings), recording its wall-clock time in the metrics registry and in the profile
+    of the current request (if one is being profiled). `input_text` is sent to the tool's stdin.
 
+    When a limit is hit, the tool's output is discarded, an entry is added to `tool_errors` and an
+    empty result is returned, so the rest of the analysis still completes.
 
-        except Exception as e:
-            logger.error(f"Tree-sitter parsing or AST/complexity/context calculation failed for {ext}: {str(e)}", exc_info=True)
-            ast_sexp = f"Error generating AST: {str(e)}"
-    else:
-        logger.warning(f"Tree-sitter not supported for extension: {ext}. Skipping AST and AST-based metrics.")
-
+    Raises:
+        FileNotFoundError: If the tool is not installed (also recorded in `tool_errors`).
+    """
+    start = time.perf_counter()
+    returncode = None
+    try:
+        result = run_limited(command, input_text=input_text, limit_address_space=tool not in ADDRESS_SPACE_RESERVING_TOOLS, **get_linter_limits())
+        returncode = result.returncode
+        if returncode == -signal.SIGXCPU:
+            _add_tool_error(tool_errors, tool, "cpu_limit", f"{tool} exceeded its CPU time limit")
+        elif returncode == -signal.SIGKILL:
+            _add_tool_error(tool_errors, tool, "killed", f"{tool} was killed (CPU or memory limit)")
+        return result
+    except SubprocessLimitExceeded as e:
+        logger.warning(f"{tool} stopped for {ext}: {str(e)}")
+        _add_tool_error(tool_errors, tool, e.kind, str(e))
+        returncode = -signal.SIGKILL
+        return subprocess.CompletedProcess(command, returncode, "", e.stderr)
+    except FileNotFoundError:
+        _add_tool_error(tool_errors, tool, "not_found", f"{command[0]} is not installed")
+        raise
+    finally:
+        duration = time.perf_counter() - start
+        observe("linter_seconds", duration, tool=tool, language=ext)
+        record_subprocess(tool, duration, returncode)
 
+def _calculate_halstead(source: str, ext: str) -> Dict[str, float]:
+    """
+    Calculates Halstead metrics for the given source text.
+    Uses radon for Python and a simplified token-based approximation for other languages.
+    """
+    halstead = {}
     if ext == ".py":
         try:
-            halstead_data = h_visit(file_content)
+            halstead_data = h_visit(source)
             halstead = {
                 "length": halstead_data.total.length,
                 "vocabulary": halstead_data.total.vocabulary,
@@ -293,7 +182,7 @@ def perform_static_analysis(file_content: str, ext: str) -> StaticAnalysisResult
         operator_count = 0
         operand_count = 0
         
-        words = re.findall(r'\b\w+\b|[+\-*/=><!&|~^%{}()[\];,.]', file_content)
+        words = re.findall(r'\b\w+\b|[+\-*/=><!&|~^%{}()[\];,.]', source)
         for word in words:
             if word in operators:
                 operator_count += 1
@@ -315,152 +204,423 @@ def perform_static_analysis(file_content: str, ext: str) -> StaticAnalysisResult
             }
         else:
             halstead = {"length": 0, "vocabulary": 0, "difficulty": 0, "effort": 0}
+    return halstead
 
+def extract_code_context(root_node, ext: str) -> Tuple[List[FunctionSignature], List[ClassHierarchy], List[str]]:
+    """
+    Extracts function signatures, class hierarchies and module dependencies from the top-level nodes of a parsed file.
+    """
+    function_signatures = []
+    class_hierarchies = []
+    module_dependencies = []
     if ext == ".py":
-        with tempfile.NamedTemporaryFile(mode='w+', delete=False, suffix=ext, encoding='utf-8') as temp_file:
-            temp_file.write(file_content)
-            temp_file_path = temp_file.name
-        
+        for node in root_node.children:
+            if node.type == 'function_definition':
+                name_node = node.child_by_field_name('name')
+                parameters_node = node.child_by_field_name('parameters')
+                return_type_node = node.child_by_field_name('return_type')
+
+                name = name_node.text.decode('utf-8') if name_node else 'unknown'
+                params = []
+                if parameters_node:
+                    for param_node in parameters_node.children:
+                        if param_node.type == 'identifier':
+                            params.append(param_node.text.decode('utf-8'))
+                        elif param_node.type == 'typed_parameter':
+                            param_name_node = param_node.child_by_field_name('name')
+                            if param_name_node:
+                                params.append(param_name_node.text.decode('utf-8'))
+                        
+                return_type = return_type_node.text.decode('utf-8') if return_type_node else None
+                function_signatures.append(FunctionSignature(name=name, parameters=params, return_type=return_type))
+
+        # Extract Python Class Hierarchies
+        for node in root_node.children:
+            if node.type == 'class_definition':
+                name_node = node.child_by_field_name('name')
+                superclasses_node = node.child_by_field_name('superclasses')
+                body_node = node.child_by_field_name('body')
+
+                name = name_node.text.decode('utf-8') if name_node else 'unknown'
+                parent_classes = []
+                if superclasses_node:
+                    for superclass_child in superclasses_node.children:
+                        if superclass_child.type == 'identifier':
+                            parent_classes.append(superclass_child.text.decode('utf-8'))
+                        elif superclass_child.type == 'attribute':
+                            parent_classes.append(superclass_child.text.decode('utf-8'))
+
+                methods = []
+                attributes = []
+                if body_node:
+                    for class_body_node in body_node.children:
+                        if class_body_node.type == 'function_definition':
+                            method_name_node = class_body_node.child_by_field_name('name')
+                            if method_name_node:
+                                methods.append(method_name_node.text.decode('utf-8'))
+                        elif class_body_node.type == 'expression_statement':
+                            assignment_node = class_body_node.child(0)
+                            if assignment_node and assignment_node.type == 'assignment':
+                                left_side = assignment_node.child_by_field_name('left')
+                                if left_side and left_side.type == 'attribute':
+                                    attribute_name_node = left_side.child_by_field_name('attribute')
+                                    if attribute_name_node:
+                                        attributes.append(attribute_name_node.text.decode('utf-8'))
+                        
+                class_hierarchies.append(ClassHierarchy(name=name, parent_classes=parent_classes, methods=methods, attributes=attributes))
+
+        # Extract Python Module Dependencies (imports)
+        for node in root_node.children:
+            if node.type == 'import_statement' or node.type == 'import_from_statement':
+                for child in node.children:
+                    if child.type == 'dotted_name':\
+                        module_dependencies.append(child.text.decode('utf-8'))
+                    elif child.type == 'aliased_import':
+                        dotted_name_node = child.child_by_field_name('name')
+                        if dotted_name_node:
+                            module_dependencies.append(dotted_name_node.text.decode('utf-8'))
+                    elif child.type == 'import_as_clause': 
+                        name_node = child.child_by_field_name('name')
+                        if name_node:
+                            module_dependencies.append(name_node.text.decode('utf-8'))
+                    elif child.type == 'identifier': 
+                        module_dependencies.append(child.text.decode('utf-8'))
+        module_dependencies = list(sorted(set(module_dependencies)))
+
+    elif ext == ".js" or ext == ".ts":
+        for node in root_node.children:
+            if node.type == 'function_declaration' or node.type == 'arrow_function':
+                name_node = node.child_by_field_name('name')
+                parameters_node = node.child_by_field_name('parameters')
+                name = name_node.text.decode('utf-8') if name_node else 'anonymous'
+                params = [p.text.decode('utf-8') for p in parameters_node.children if p.type == 'identifier'] if parameters_node else []
+                function_signatures.append(FunctionSignature(name=name, parameters=params))
+            elif node.type == 'import_statement':
+                source_node = node.child_by_field_name('source')
+                if source_node:
+                    module_dependencies.append(source_node.text.decode('utf-8').strip("'\""))
+        module_dependencies = list(sorted(set(module_dependencies))) # Remove duplicates
+
+    elif ext == ".java":
+        for node in root_node.children:
+            if node.type == 'class_declaration':
+                name_node = node.child_by_field_name('name')
+                class_name = name_node.text.decode('utf-8') if name_node else 'unknown'
+                        
+                extends_clause = node.child_by_field_name('superclass')
+                parent_classes = [extends_clause.text.decode('utf-8').split()[-1]] if extends_clause else [] # Extract class name from "extends ClassName"
+                        
+                class_methods = []
+                class_attributes = []
+                body_node = node.child_by_field_name('body')
+                if body_node:
+                    for member in body_node.children:
+                        if member.type == 'method_declaration':
+                            method_name_node = member.child_by_field_name('name')
+                            if method_name_node:
+                                class_methods.append(method_name_node.text.decode('utf-8'))
+                        elif member.type == 'field_declaration':
+                            declarator = member.child_by_field_name('declarator')
+                            if declarator and declarator.type == 'variable_declarator':
+                                attr_name_node = declarator.child_by_field_name('name')
+                                if attr_name_node:
+                                    class_attributes.append(attr_name_node.text.decode('utf-8'))
+                        
+                class_hierarchies.append(ClassHierarchy(name=class_name, parent_classes=parent_classes, methods=class_methods, attributes=class_attributes))
+            elif node.type == 'import_declaration':
+                dotted_name_node = node.child_by_field_name('name')
+                if dotted_name_node:
+                    module_dependencies.append(dotted_name_node.text.decode('utf-8'))
+        module_dependencies = list(sorted(set(module_dependencies)))
+
+
+    elif ext == ".go":
+        for node in root_node.children:
+            if node.type == 'function_declaration':
+                name_node = node.child_by_field_name('name')
+                parameters_node = node.child_by_field_name('parameters')
+                result_node = node.child_by_field_name('result') 
+                        
+                name = name_node.text.decode('utf-8') if name_node else 'unknown'
+                params = []
+                if parameters_node:
+                    for param_list_node in parameters_node.children:
+                        if param_list_node.type == 'parameter_declaration':
+                            for param_child in param_list_node.children:
+                                if param_child.type == 'identifier':
+                                    params.append(param_child.text.decode('utf-8'))
+                        
+                return_type = result_node.text.decode('utf-8') if result_node else None
+                function_signatures.append(FunctionSignature(name=name, parameters=params, return_type=return_type))
+            elif node.type == 'import_declaration':
+                for import_spec in node.children:
+                    if import_spec.type == 'import_spec':
+                        path_node = import_spec.child_by_field_name('path')
+                        if path_node:
+                            module_dependencies.append(path_node.text.decode('utf-8').strip('\"'))
+        module_dependencies = list(sorted(set(module_dependencies)))
+    return function_signatures, class_hierarchies, module_dependencies
+
+
+def resolve_facets(facets: Optional[Iterable[str]] = None, diff_scoped: bool = False) -> Set[str]:
+    """
+    Validates the requested facets (all of ANALYSIS_FACETS when None) and adds the internal steps they depend on.
+
+    Raises:
+        ValueError: If an unknown facet is requested.
+    """
+    requested = set(ANALYSIS_FACETS if facets is None else facets)
+    unknown = requested - ANALYSIS_FACETS
+    if unknown:
+        raise ValueError(f"Unknown analysis facets: {', '.join(sorted(unknown))}. Supported facets: {', '.join(sorted(ANALYSIS_FACETS))}")
+    resolved = set(requested)
+    for facet in requested:
+        resolved |= FACET_DEPENDENCIES.get(facet, set())
+    if diff_scoped and "halstead" in requested:
+        # Halstead metrics are computed on the enclosing scopes, which are found on the parse tree
+        resolved.add("parse")
+    return resolved
+
+def perform_static_analysis(file_content: str, ext: str, changed_ranges: Optional[List[Tuple[int, int]]] = None, context_radius: int = 3,
+                            facets: Optional[Iterable[str]] = None) -> StaticAnalysisResult:
+    """
+    Performs static analysis on the given file content using Tree-sitter and external tools.
+    Includes AST parsing, complexity metrics, and integration with linters/scanners.
+    Only the requested facets (and the steps they depend on) are computed; fields of other facets keep their
+    empty defaults.
+
+    Args:
+        file_content (str): The code to analyze.
+        ext (str): The file extension used to detect the language.
+        changed_ranges (List[Tuple[int, int]], optional): 1-based, inclusive line ranges touched by a diff.
+            When provided, the AST, complexity and Halstead metrics are computed only for the functions/classes
+            enclosing those ranges, and linter issues are limited to the touched lines plus `context_radius`.
+        context_radius (int): Number of lines around each changed range for which linter issues are kept.
+        facets (Iterable[str], optional): Subset of ANALYSIS_FACETS to compute; all facets when omitted.
+
+    Raises:
+        ValueError: If an unknown facet is requested.
+    """
+    analysis_start = time.perf_counter()
+    requested_facets = set(ANALYSIS_FACETS if facets is None else facets)
+    facets = resolve_facets(requested_facets, diff_scoped=bool(changed_ranges))
+    # Aliases such as `.tsx`/`.mjs` keep their own grammar but share the canonical extension's tooling
+    source_ext = ext.lower()
+    ext = canonical_extension(source_ext)
+    cyclomatic = 0
+    cognitive = 0
+    halstead = {}
+    issues = []
+    tool_errors = []
+    ast_sexp = "AST not available for this language or due to parsing error." if "ast" in facets else ""
+    function_signatures = []
+    class_hierarchies = []
+    module_dependencies = []
+    # Source used for Halstead/radon metrics; narrowed to the enclosing scopes in diff-scoped mode.
+    metrics_source = file_content
+
+    # Tree-sitter for AST and AST-based metrics & Context Extraction
+    supported_languages = get_supported_languages()
+    if "parse" in facets and source_ext in supported_languages:
         try:
-            pylint_result = subprocess.run(
-                ["pylint", "--output-format=json", temp_file_path], 
-                capture_output=True, text=True, check=False
-            )
-            if pylint_result.stdout:
-                try:
-                    pylint_issues = json.loads(pylint_result.stdout)
-                    issues.extend([
-                        {"tool": "pylint", "message": i.get("message"), "line": i.get("line"), "type": i.get("type"), "symbol": i.get("symbol")}
-                        for i in pylint_issues
-                    ])
-                except json.JSONDecodeError:
-                    logger.warning(f"Pylint output was not valid JSON for {temp_file_path}: {pylint_result.stdout[:200]}...")
+            code_bytes = bytes(file_content, "utf8")
+            with get_parser_pool().acquire(source_ext) as parser, timed("tree_sitter_parse_seconds", language=ext):
+                tree = parser.parse(code_bytes)
+            root_node = tree.root_node
+
+            if changed_ranges:
+                scope_nodes = _find_scope_nodes(root_node, changed_ranges)
+                source_lines = file_content.splitlines()
+                metrics_source = "\n\n".join(
+                    textwrap.dedent("\n".join(source_lines[node.start_point[0]:node.end_point[0] + 1]))
+                    for node in scope_nodes
+                )
+                if "ast" in facets:
+                    ast_sexp = "\n".join(node.sexp() for node in scope_nodes)
+                # Statements directly inside each scope play the role of the file's top-level statements.
+                metric_children = []
+                for node in scope_nodes:
+                    body_node = node.child_by_field_name('body') if node.type in SCOPE_NODE_TYPES else None
+                    metric_children.extend(body_node.children if body_node else [node])
+                logger.info(f"Diff-scoped analysis: {len(changed_ranges)} changed range(s) mapped to {len(scope_nodes)} enclosing scope(s).")
+            else:
+                scope_nodes = [root_node]
+                metric_children = root_node.children
+                if "ast" in facets:
+                    ast_sexp = root_node.sexp()
+
+            if "complexity" in facets:
+                # Basic Cyclomatic Complexity (simplified for general languages via Tree-sitter)
+                # For Python, radon's cc_visit is more accurate.
+                if ext == ".py":
+                    try:
+                        # radon's cc_visit returns a list of CodeBlock objects
+                        blocks = cc_visit(metrics_source)
+                        cyclomatic = sum(block.complexity for block in blocks)
+                    except Exception as e:
+                        logger.warning(f"Radon Cyclomatic Complexity failed for Python: {str(e)}", exc_info=True)
+                        # Fallback to Tree-sitter based if radon fails
+                        cyclomatic = sum(1 for node in metric_children if node.type in DECISION_NODE_TYPES)
+                else:
+                    cyclomatic = sum(1 for node in metric_children if node.type in DECISION_NODE_TYPES)
+
+
+                # Basic Cognitive Complexity (simplified via Tree-sitter)
+                # This is a heuristic and not a precise Cognitive Complexity calculation.
+                def calculate_cognitive_recursive(node, depth=0):
+                    nonlocal cognitive
+
+                    if node.type in ["if_statement", "for_statement", "while_statement", "switch_statement", "try_statement", "catch_clause", "do_statement"]:
+                        cognitive += (depth + 1) # Each level of nesting adds to cognitive complexity
+                
+                    if node.type in ["break_statement", "continue_statement", "return_statement"]:
+                        cognitive += 1
+
+                    for child in node.children:
+                        calculate_cognitive_recursive(child, depth + 1)
+            
+                for scope_node in scope_nodes:
+                    calculate_cognitive_recursive(scope_node)
+
+            # --- Context Extraction (Function Signatures, Class Hierarchies, Module Dependencies) ---
+            if "context" in facets:
+                function_signatures, class_hierarchies, module_dependencies = extract_code_context(root_node, ext)
+
+
         except Exception as e:
-            logger.warning(f"Pylint failed for {temp_file_path}: {str(e)}", exc_info=True)
+            logger.error(f"Tree-sitter parsing or AST/complexity/context calculation failed for {ext}: {str(e)}", exc_info=True)
+            ast_sexp = f"Error generating AST: {str(e)}"
+    elif "parse" in facets:
+        logger.warning(f"Tree-sitter not supported for extension: {source_ext}. Skipping AST and AST-based metrics.")
+
+
+    if "halstead" in facets:
+        halstead = _calculate_halstead(metrics_source, ext)
+
+    # Linters that can read stdin get the content directly. Checkstyle and reuse need a file, which is written
+    # once into a per-analysis scratch directory (RAM-backed where available) that is always removed afterwards.
+    source_name = f"source{source_ext}"
+    needs_source_file = ("linters" in facets and ext == ".java") or "license" in facets
+    with (scratch_directory() if needs_source_file else nullcontext()) as scratch_dir:
+        source_path = None
+        if scratch_dir:
+            source_path = os.path.join(scratch_dir, source_name)
+            with open(source_path, "w", encoding="utf-8") as source_file:
+                source_file.write(file_content)
+        if "linters" in facets:
+            if ext == ".py":
+                try:
+                    pylint_result = _run_linter("pylint", ["pylint", "--output-format=json", "--from-stdin", source_name], ext, tool_errors, input_text=file_content)
+                    if pylint_result.stdout:
+                        try:
+                            pylint_issues = json.loads(pylint_result.stdout)
+                            issues.extend([
+                                {"tool": "pylint", "message": i.get("message"), "line": i.get("line"), "type": i.get("type"), "symbol": i.get("symbol")}
+                                for i in pylint_issues
+                            ])
+                        except json.JSONDecodeError:
+                            logger.warning(f"Pylint output was not valid JSON for {source_name}: {pylint_result.stdout[:200]}...")
+                except Exception as e:
+                    logger.warning(f"Pylint failed for {source_name}: {str(e)}", exc_info=True)
 
-        try:
-            bandit_result = subprocess.run(
-                ["bandit", "-r", temp_file_path, "-f", "json"],
-                capture_output=True, text=True, check=False
-            )
-            if bandit_result.stdout:
                 try:
-                    bandit_output = json.loads(bandit_result.stdout)
-                    if "results" in bandit_output:
-                        issues.extend([
-                            {"tool": "bandit", "message": r.get("issue_text"), "line": r.get("line_number"), "severity": r.get("issue_severity"), "confidence": r.get("issue_confidence")}
-                            for r in bandit_output["results"]
-                        ])
-                except json.JSONDecodeError:
-                    logger.warning(f"Bandit output was not valid JSON for {temp_file_path}: {bandit_result.stdout[:200]}...")
-            if bandit_result.stderr:
-                logger.warning(f"Bandit stderr for {temp_file_path}: {bandit_result.stderr}")
-        except FileNotFoundError:
-            logger.warning("Bandit not found. Please install it (`pip install bandit`).")
-        except Exception as e:
-            logger.warning(f"Bandit failed for {temp_file_path}: {str(e)}", exc_info=True)
-        finally:
-            os.unlink(temp_file_path)
+                    bandit_result = _run_linter("bandit", ["bandit", "-f", "json", "-"], ext, tool_errors, input_text=file_content)
+                    if bandit_result.stdout:
+                        try:
+                            bandit_output = json.loads(bandit_result.stdout)
+                            if "results" in bandit_output:
+                                issues.extend([
+                                    {"tool": "bandit", "message": r.get("issue_text"), "line": r.get("line_number"), "severity": r.get("issue_severity"), "confidence": r.get("issue_confidence")}
+                                    for r in bandit_output["results"]
+                                ])
+                        except json.JSONDecodeError:
+                            logger.warning(f"Bandit output was not valid JSON for {source_name}: {bandit_result.stdout[:200]}...")
+                    if bandit_result.stderr:
+                        logger.warning(f"Bandit stderr for {source_name}: {bandit_result.stderr}")
+                except FileNotFoundError:
+                    logger.warning("Bandit not found. Please install it (`pip install bandit`).")
+                except Exception as e:
+                    logger.warning(f"Bandit failed for {source_name}: {str(e)}", exc_info=True)
 
 
-    elif ext == ".js" or ext == ".ts":
-        with tempfile.NamedTemporaryFile(mode='w+', delete=False, suffix=ext, encoding='utf-8') as temp_file:
-            temp_file.write(file_content)
-            temp_file_path = temp_file.name
-        try:
-            eslint_result = subprocess.run(
-                ["eslint", "--stdin", "--stdin-filename", temp_file_path, "--format=json"], 
-                capture_output=True, text=True, check=False
-            )
-            if eslint_result.stdout:
+            elif ext == ".js" or ext == ".ts":
                 try:
-                    eslint_output = json.loads(eslint_result.stdout)
-                    if eslint_output and isinstance(eslint_output, list) and len(eslint_output) > 0:
-                        issues.extend([
-                            {"tool": "eslint", "message": m.get("message"), "line": m.get("line"), "severity": m.get("severity")}
-                            for m in eslint_output[0].get("messages", [])
-                        ])
-                except json.JSONDecodeError:
-                    logger.warning(f"ESLint output was not valid JSON for {temp_file_path}: {eslint_result.stdout[:200]}...")
-        except Exception as e:
-            logger.warning(f"ESLint failed for {temp_file_path}: {str(e)}", exc_info=True)
-        finally:
-            os.unlink(temp_file_path)
+                    eslint_result = _run_linter("eslint", ["eslint", "--stdin", "--stdin-filename", source_name, "--format=json"], ext, tool_errors, input_text=file_content)
+                    if eslint_result.stdout:
+                        try:
+                            eslint_output = json.loads(eslint_result.stdout)
+                            if eslint_output and isinstance(eslint_output, list) and len(eslint_output) > 0:
+                                issues.extend([
+                                    {"tool": "eslint", "message": m.get("message"), "line": m.get("line"), "severity": m.get("severity")}
+                                    for m in eslint_output[0].get("messages", [])
+                                ])
+                        except json.JSONDecodeError:
+                            logger.warning(f"ESLint output was not valid JSON for {source_name}: {eslint_result.stdout[:200]}...")
+                except Exception as e:
+                    logger.warning(f"ESLint failed for {source_name}: {str(e)}", exc_info=True)
 
 
-    elif ext == ".java":
-        with tempfile.NamedTemporaryFile(mode='w+', delete=False, suffix=ext, encoding='utf-8') as temp_file:
-            temp_file.write(file_content)
-            temp_file_path = temp_file.name
-        try:
-            checkstyle_result = subprocess.run(
-                ["checkstyle", "-c", "/google_checks.xml", temp_file_path], # Use temp file path
-                capture_output=True, text=True, check=False
-            )
-            if checkstyle_result.stdout:
+            elif ext == ".java":
                 try:
-                    # Checkstyle output can be XML or plain text. Parsing XML if available.
-                    if checkstyle_result.stdout.strip().startswith("<"): # Check if it's XML
-                        root = ET.fromstring(checkstyle_result.stdout)
-                        for error in root.findall(".//error"):
-                            issues.append({
-                                "tool": "checkstyle", 
-                                "message": error.get("message"), 
-                                "line": error.get("line"), 
-                                "severity": error.get("severity")
-                            })
-                    else: # Fallback to parsing plain text output
-                        for line in checkstyle_result.stdout.splitlines():
-                            match = re.match(r'\[(\w+)\] (.+):(\d+):(.+)', line)
-                            if match:
-                                issues.append({
-                                    "tool": "checkstyle",
-                                    "severity": match.group(1),
-                                    "message": match.group(4).strip(),
-                                    "line": int(match.group(3))
-                                })
-                except ET.ParseError:
-                    logger.warning(f"Checkstyle output was not valid XML for {temp_file_path}: {checkstyle_result.stdout[:200]}...")
-            if checkstyle_result.stderr:
-                logger.warning(f"Checkstyle stderr for {temp_file_path}: {checkstyle_result.stderr}")
-        except FileNotFoundError:
-            logger.warning("Checkstyle not found. Please install it and ensure google_checks.xml is accessible.")
-        except Exception as e:
-            logger.warning(f"Checkstyle failed for {temp_file_path}: {str(e)}", exc_info=True)
-        finally:
-            os.unlink(temp_file_path)
+                    checkstyle_result = _run_linter("checkstyle", ["checkstyle", "-c", "/google_checks.xml", source_path], ext, tool_errors) # Checkstyle cannot read stdin
+                    if checkstyle_result.stdout:
+                        try:
+                            # Checkstyle output can be XML or plain text. Parsing XML if available.
+                            if checkstyle_result.stdout.strip().startswith("<"): # Check if it's XML
+                                root = ET.fromstring(checkstyle_result.stdout)
+                                for error in root.findall(".//error"):
+                                    issues.append({
+                                        "tool": "checkstyle", 
+                                        "message": error.get("message"), 
+                                        "line": error.get("line"), 
+                                        "severity": error.get("severity")
+                                    })
+                            else: # Fallback to parsing plain text output
+                                for line in checkstyle_result.stdout.splitlines():
+                                    match = re.match(r'\[(\w+)\] (.+):(\d+):(.+)', line)
+                                    if match:
+                                        issues.append({
+                                            "tool": "checkstyle",
+                                            "severity": match.group(1),
+                                            "message": match.group(4).strip(),
+                                            "line": int(match.group(3))
+                                        })
+                        except ET.ParseError:
+                            logger.warning(f"Checkstyle output was not valid XML for {source_name}: {checkstyle_result.stdout[:200]}...")
+                    if checkstyle_result.stderr:
+                        logger.warning(f"Checkstyle stderr for {source_name}: {checkstyle_result.stderr}")
+                except FileNotFoundError:
+                    logger.warning("Checkstyle not found. Please install it and ensure google_checks.xml is accessible.")
+                except Exception as e:
+                    logger.warning(f"Checkstyle failed for {source_name}: {str(e)}", exc_info=True)
 
 
-    # Reuse for License Compliance (general)
-    # This tool also requires a file path, so use a temporary file.
-    with tempfile.NamedTemporaryFile(mode='w+', delete=False, suffix=ext, encoding='utf-8') as temp_file:
-        temp_file.write(file_content)
-        temp_file_path = temp_file.name
-    try:
-        reuse_result = subprocess.run(
-            ["reuse", "lint", "--json", "--plain", temp_file_path], # Run on temp file
-            capture_output=True, text=True, check=False
-        )
-        if reuse_result.stdout:
+        if "license" in facets:
+            # Reuse for License Compliance (general)
+            # This tool also requires a file path, so it runs on the scratch copy.
             try:
-                reuse_output = json.loads(reuse_result.stdout)
-                if "issues" in reuse_output:
-                    issues.extend([
-                        {"tool": "reuse", "message": i.get("message"), "filename": i.get("filename")}
-                        for i in reuse_output["issues"]
-                    ])
-            except json.JSONDecodeError:
-                logger.warning(f"Reuse output was not JSON for {temp_file_path}: {reuse_result.stdout[:200]}...")
-        if reuse_result.stderr:
-            logger.warning(f"Reuse stderr for {temp_file_path}: {reuse_result.stderr}")
-    except FileNotFoundError:
-        logger.warning("Reuse not found. Please install it (`pip install reuse`).")
-    except Exception as e:
-        logger.warning(f"Reuse failed for {temp_file_path}: {str(e)}", exc_info=True)
-    finally:
-        os.unlink(temp_file_path)
-
-
+                reuse_result = _run_linter("reuse", ["reuse", "lint", "--json", "--plain", source_path], ext, tool_errors)
+                if reuse_result.stdout:
+                    try:
+                        reuse_output = json.loads(reuse_result.stdout)
+                        if "issues" in reuse_output:
+                            issues.extend([
+                                {"tool": "reuse", "message": i.get("message"), "filename": i.get("filename")}
+                                for i in reuse_output["issues"]
+                            ])
+                    except json.JSONDecodeError:
+                        logger.warning(f"Reuse output was not JSON for {source_name}: {reuse_result.stdout[:200]}...")
+                if reuse_result.stderr:
+                    logger.warning(f"Reuse stderr for {source_name}: {reuse_result.stderr}")
+            except FileNotFoundError:
+                logger.warning("Reuse not found. Please install it (`pip install reuse`).")
+            except Exception as e:
+                logger.warning(f"Reuse failed for {source_name}: {str(e)}", exc_info=True)
+
+    if changed_ranges:
+        issues = _filter_issues_to_ranges(issues, changed_ranges, context_radius)
+
+    observe("static_analysis_seconds", time.perf_counter() - analysis_start, language=ext)
     return StaticAnalysisResult(
         cyclomatic_complexity=cyclomatic,
         cognitive_complexity=cognitive,
@@ -469,6 +629,8 @@ def perform_static_analysis(file_content: str, ext: str) -> StaticAnalysisResult
         ast_sexp=ast_sexp,
         function_signatures=function_signatures,
         class_hierarchies=class_hierarchies,
-        module_dependencies=module_dependencies
+        module_dependencies=module_dependencies,
+        tool_errors=tool_errors,
+        facets=sorted(requested_facets)
     )
 
@@ -0,0 +1,160 @@
+from typing import Dict, Any, List, Optional
+import os
+import resource
+import selectors
+import signal
+import subprocess
+import time
+
+_READ_CHUNK_BYTES = 65536
+
+
+def get_linter_limits() -> Dict[str, Any]:
+    """
+    Returns the `run_limited` limits configured for linters and scanners (LINTER_* settings).
+    """
+    # Imported lazily: config imports the static analyzer, which runs its linters through this module.
+    from config import get_settings
+    settings = get_settings()
+    return {
+        "timeout": settings.LINTER_TIMEOUT_SECONDS,
+        "memory_bytes": settings.LINTER_MEMORY_LIMIT_MB * 1024 * 1024,
+        "cpu_seconds": settings.LINTER_CPU_LIMIT_SECONDS,
+        "max_output_bytes": settings.LINTER_MAX_OUTPUT_BYTES,
+    }
+
+
+class SubprocessLimitExceeded(Exception):
+    """
+    Raised when a subprocess is killed for exceeding its wall-clock timeout or output cap.
+    `kind` is "timeout" or "output_limit"; `stdout`/`stderr` hold whatever was read before the kill.
+    """
+
+    def __init__(self, kind: str, message: str, stdout: str = "", stderr: str = ""):
+        super().__init__(message)
+        self.kind = kind
+        self.stdout = stdout
+        self.stderr = stderr
+
+
+def _limit_resources(pid: int, memory_bytes: int, cpu_seconds: int, limit_address_space: bool) -> None:
+    """
+    Applies the memory/CPU rlimits to a started child with prlimit(2). A preexec_fn would run Python between fork
+    and exec, which can deadlock in the child when other threads (the linter and index thread pools) hold locks.
+    """
+    try:
+        if memory_bytes > 0:
+            memory_limit = resource.RLIMIT_AS if limit_address_space else resource.RLIMIT_DATA
+            resource.prlimit(pid, memory_limit, (memory_bytes, memory_bytes))
+        if cpu_seconds > 0:
+            # SIGXCPU at the soft limit, SIGKILL one second later at the hard limit
+            resource.prlimit(pid, resource.RLIMIT_CPU, (cpu_seconds, cpu_seconds + 1))
+        resource.prlimit(pid, resource.RLIMIT_CORE, (0, 0))
+    except ProcessLookupError:
+        pass  # Already exited
+
+
+def _kill_process_group(process: subprocess.Popen) -> None:
+    try:
+        os.killpg(process.pid, signal.SIGKILL)
+    except ProcessLookupError:
+        pass
+    process.wait()
+
+
+def run_limited(command: List[str], timeout: float, memory_bytes: int = 0, cpu_seconds: int = 0,
+                max_output_bytes: int = 0, input_text: Optional[str] = None, limit_address_space: bool = True) -> subprocess.CompletedProcess:
+    """
+    Runs a command in its own process group with a wall-clock timeout, memory/CPU rlimits and a cap on
+    the combined stdout/stderr size. The whole process group is killed when a limit is hit, so helper
+    processes spawned by the tool do not outlive it.
+
+    Args:
+        command (List[str]): The command and its arguments.
+        timeout (float): Wall-clock limit in seconds.
+        memory_bytes (int): RLIMIT_AS (or RLIMIT_DATA, see `limit_address_space`) in bytes; 0 for no limit.
+        cpu_seconds (int): RLIMIT_CPU in seconds; 0 for no limit.
+        max_output_bytes (int): Maximum combined stdout/stderr bytes; 0 for no limit.
+        input_text (str, optional): Text written to the process's stdin.
+        limit_address_space (bool): Use RLIMIT_AS. Runtimes that reserve large virtual address ranges
+            up front (Node, the JVM) fail to start under RLIMIT_AS and should use RLIMIT_DATA instead.
+
+    Returns:
+        subprocess.CompletedProcess: The exit status and decoded output, as with `subprocess.run(..., text=True)`.
+
+    Raises:
+        SubprocessLimitExceeded: If the timeout or output cap was hit.
+        FileNotFoundError: If the executable does not exist.
+    """
+    process = subprocess.Popen(
+        command,
+        stdin=subprocess.PIPE if input_text is not None else subprocess.DEVNULL,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        start_new_session=True,
+    )
+    _limit_resources(process.pid, memory_bytes, cpu_seconds, limit_address_space)
+    deadline = time.monotonic() + timeout
+    chunks = {"stdout": [], "stderr": []}
+    total_bytes = 0
+    limit_kind = None
+    # stdin is written from the same loop that drains stdout/stderr, so a tool that starts printing
+    # before it has read all of its input cannot deadlock on a full pipe
+    pending_input = memoryview(input_text.encode("utf-8")) if input_text is not None else None
+    with selectors.DefaultSelector() as selector:
+        selector.register(process.stdout, selectors.EVENT_READ, "stdout")
+        selector.register(process.stderr, selectors.EVENT_READ, "stderr")
+        if pending_input is not None:
+            if pending_input:
+                os.set_blocking(process.stdin.fileno(), False)
+                selector.register(process.stdin, selectors.EVENT_WRITE, "stdin")
+            else:
+                process.stdin.close()
+        while selector.get_map():
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                limit_kind = "timeout"
+                break
+            for key, _ in selector.select(remaining):
+                if key.data == "stdin":
+                    try:
+                        written = os.write(key.fd, pending_input[:_READ_CHUNK_BYTES])
+                        pending_input = pending_input[written:]
+                    except BlockingIOError:
+                        continue
+                    except BrokenPipeError:
+                        pending_input = pending_input[:0]
+                    if not pending_input:
+                        selector.unregister(key.fileobj)
+                        process.stdin.close()
+                    continue
+                data = os.read(key.fd, _READ_CHUNK_BYTES)
+                if not data:
+                    selector.unregister(key.fileobj)
+                    continue
+                chunks[key.data].append(data)
+                total_bytes += len(data)
+                if max_output_bytes and total_bytes > max_output_bytes:
+                    limit_kind = "output_limit"
+                    break
+            if limit_kind:
+                break
+
+    if limit_kind is None:
+        try:
+            process.wait(timeout=max(deadline - time.monotonic(), 0))
+        except subprocess.TimeoutExpired:
+            limit_kind = "timeout"
+    if limit_kind:
+        _kill_process_group(process)
+    for stream in (process.stdin, process.stdout, process.stderr):
+        if stream is not None and not stream.closed:
+            stream.close()
+
+    stdout = b"".join(chunks["stdout"]).decode("utf-8", errors="replace")
+    stderr = b"".join(chunks["stderr"]).decode("utf-8", errors="replace")
+    if limit_kind == "timeout":
+        raise SubprocessLimitExceeded("timeout", f"{command[0]} timed out after {timeout}s", stdout, stderr)
+    if limit_kind == "output_limit":
+        raise SubprocessLimitExceeded("output_limit", f"{command[0]} produced more than {max_output_bytes} bytes of output", stdout, stderr)
+    return subprocess.CompletedProcess(command, process.returncode, stdout, stderr)
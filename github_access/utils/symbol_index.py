@@ -0,0 +1,409 @@
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+import logging
+import os
+import sqlite3
+import threading
+import time
+
+from config import get_settings
+from github_access.utils.github_fetcher import list_tree_blobs, fetch_blob_text
+from github_access.utils.language_registry import get_supported_languages, get_parser_pool, canonical_extension
+from github_access.utils.metrics import increment, timed
+from github_access.utils.rate_limiter import propagate_github_priority
+from github_access.utils.static_analyzer import extract_code_context
+
+logger = logging.getLogger(__name__)
+
+# Call-site node types and the field holding the called expression, per canonical extension.
+CALL_NODE_FIELDS = {
+    ".py": {"call": "function"},
+    ".js": {"call_expression": "function", "new_expression": "constructor"},
+    ".ts": {"call_expression": "function", "new_expression": "constructor"},
+    ".go": {"call_expression": "function"},
+    ".java": {"method_invocation": "name", "object_creation_expression": "type"},
+}
+
+# Top-level node types indexed as definitions (the class-like ones also have their methods indexed).
+DEFINITION_NODE_TYPES = {
+    "function_definition", "class_definition",                                  # Python
+    "function_declaration", "generator_function_declaration", "class_declaration",  # JavaScript/TypeScript, Go
+    "interface_declaration", "enum_declaration", "type_alias_declaration",      # TypeScript, Java
+    "method_declaration",                                                       # Go
+}
+
+# Fields naming the last component of a qualified callee (`obj.method`, `pkg.Func`).
+MEMBER_NAME_FIELDS = ("attribute", "property", "field", "name")
+
+# Blobs indexed or reused more recently than this are never pruned as orphans: another indexer (thread or worker)
+# may have checked them with `missing_blobs` and not saved the snapshot that references them yet.
+ORPHAN_GRACE_SECONDS = 3600
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS blobs (
+    blob_sha TEXT PRIMARY KEY,
+    language TEXT NOT NULL,
+    last_used_at REAL NOT NULL DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS definitions (
+    blob_sha TEXT NOT NULL,
+    name TEXT NOT NULL,
+    kind TEXT NOT NULL,
+    signature TEXT NOT NULL,
+    start_line INTEGER NOT NULL,
+    end_line INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS definitions_by_name ON definitions (name, blob_sha);
+CREATE INDEX IF NOT EXISTS definitions_by_blob ON definitions (blob_sha, start_line);
+CREATE TABLE IF NOT EXISTS symbol_references (
+    blob_sha TEXT NOT NULL,
+    name TEXT NOT NULL,
+    line INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS symbol_references_by_name ON symbol_references (name, blob_sha);
+CREATE INDEX IF NOT EXISTS symbol_references_by_blob ON symbol_references (blob_sha, line);
+CREATE TABLE IF NOT EXISTS imports (
+    blob_sha TEXT NOT NULL,
+    module TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS imports_by_module ON imports (module, blob_sha);
+CREATE INDEX IF NOT EXISTS imports_by_blob ON imports (blob_sha);
+CREATE TABLE IF NOT EXISTS snapshots (
+    repo TEXT NOT NULL,
+    commit_sha TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    PRIMARY KEY (repo, commit_sha)
+);
+CREATE TABLE IF NOT EXISTS snapshot_files (
+    repo TEXT NOT NULL,
+    commit_sha TEXT NOT NULL,
+    path TEXT NOT NULL,
+    blob_sha TEXT NOT NULL,
+    PRIMARY KEY (repo, commit_sha, path)
+);
+CREATE INDEX IF NOT EXISTS snapshot_files_by_blob ON snapshot_files (blob_sha, repo, commit_sha);
+"""
+
+
+def _node_text(node) -> str:
+    return node.text.decode("utf-8", errors="replace")
+
+
+def _header(node) -> str:
+    """
+    Returns the first line of a definition (its signature line), whitespace-collapsed.
+    """
+    return " ".join(_node_text(node).split("\n", 1)[0].split())[:200]
+
+
+def _callee_name(node) -> Optional[str]:
+    """
+    Returns the called name of a callee expression: the identifier itself, or the last member of a qualified name.
+    """
+    while node is not None and node.type not in ("identifier", "type_identifier", "field_identifier", "property_identifier"):
+        for field in MEMBER_NAME_FIELDS:
+            member = node.child_by_field_name(field)
+            if member is not None:
+                node = member
+                break
+        else:
+            return None
+    return _node_text(node) if node is not None else None
+
+
+def _iter_definition_nodes(root_node) -> Iterator[Tuple[str, Any, Optional[str]]]:
+    """
+    Yields (name, node, enclosing class name) for the top-level definitions and the methods of top-level classes.
+    """
+    for node in root_node.children:
+        # Python decorators and JS/TS exports wrap the definition itself
+        if node.type in ("decorated_definition", "export_statement"):
+            node = node.child_by_field_name("definition") or node.child_by_field_name("declaration") or node
+        name_node = node.child_by_field_name("name") if node.type in DEFINITION_NODE_TYPES else None
+        if name_node is None:
+            continue
+        name = _node_text(name_node)
+        yield name, node, None
+        body_node = node.child_by_field_name("body")
+        if body_node is None or "class" not in node.type:
+            continue
+        for member in body_node.children:
+            if member.type == "decorated_definition":
+                member = member.child_by_field_name("definition") or member
+            member_name = member.child_by_field_name("name")
+            if member_name is not None and member.type in ("function_definition", "method_declaration", "method_definition", "constructor_declaration"):
+                yield _node_text(member_name), member, name
+
+
+def extract_symbols(file_content: str, ext: str) -> Dict[str, List[Any]]:
+    """
+    Parses a file and extracts the rows stored in the symbol index.
+    Functions, classes and imports are classified by the same Tree-sitter extraction as the analysis `context`
+    facet; the parse tree additionally gives their line spans, signature lines, class methods and call sites.
+
+    Returns:
+        Dict[str, List[Any]]: `definitions` as (name, kind, signature, start_line, end_line),
+        `references` as (name, line) and `imports` as module names.
+
+    Raises:
+        KeyError: If the extension has no loaded grammar.
+    """
+    source_ext = ext.lower()
+    ext = canonical_extension(source_ext)
+    with get_parser_pool().acquire(source_ext) as parser, timed("tree_sitter_parse_seconds", language=ext):
+        tree = parser.parse(bytes(file_content, "utf8"))
+    root_node = tree.root_node
+    function_signatures, class_hierarchies, module_dependencies = extract_code_context(root_node, ext)
+    signatures = {signature.name for signature in function_signatures}
+    classes = {hierarchy.name for hierarchy in class_hierarchies}
+
+    definitions = []
+    for name, node, class_name in _iter_definition_nodes(root_node):
+        start_line, end_line = node.start_point[0] + 1, node.end_point[0] + 1
+        # The definition's own first line is the most faithful signature (it keeps annotations and defaults)
+        signature = _header(node)
+        if class_name is not None:
+            definitions.append((f"{class_name}.{name}", "method", signature, start_line, end_line))
+            # Methods are also indexed by their bare name, which is what call sites use
+            definitions.append((name, "method", signature, start_line, end_line))
+        elif node.type == "method_declaration":
+            # Go methods are declared at the top level with a receiver
+            definitions.append((name, "method", signature, start_line, end_line))
+        elif name in classes or "class" in node.type:
+            definitions.append((name, "class", signature, start_line, end_line))
+        elif name in signatures or "function" in node.type:
+            definitions.append((name, "function", signature, start_line, end_line))
+        else:
+            definitions.append((name, "definition", signature, start_line, end_line))
+
+    references = []
+    call_fields = CALL_NODE_FIELDS.get(ext, {})
+    pending = [root_node]
+    while pending:
+        node = pending.pop()
+        field = call_fields.get(node.type)
+        if field is not None:
+            name = _callee_name(node.child_by_field_name(field))
+            if name:
+                references.append((name, node.start_point[0] + 1))
+        pending.extend(node.children)
+    return {"definitions": definitions, "references": references, "imports": module_dependencies}
+
+
+class SymbolIndex:
+    """
+    Persistent, SQLite-backed index of definitions, call-site references and imports per repository and commit.
+
+    Symbols are stored once per git blob SHA, and a commit snapshot only maps paths to blob SHAs, so indexing a
+    new commit fetches and parses only the files whose content changed since an indexed commit. Lookups by
+    symbol name go through B-tree indexes (O(log n)) and never touch the files themselves.
+    """
+
+    def __init__(self, path: str, max_snapshots_per_repo: int = 20):
+        self.path = path
+        self.max_snapshots_per_repo = max_snapshots_per_repo
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        # WAL lets several workers read while one writes
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.execute("PRAGMA synchronous=NORMAL")
+        self._connection.executescript(SCHEMA)
+        # Indexes created before blobs had a last-use time; their blobs count as unused until reused
+        if "last_used_at" not in {row[1] for row in self._connection.execute("PRAGMA table_info(blobs)")}:
+            self._connection.execute("ALTER TABLE blobs ADD COLUMN last_used_at REAL NOT NULL DEFAULT 0")
+
+    def has_snapshot(self, repo: str, commit_sha: str) -> bool:
+        with self._lock:
+            row = self._connection.execute("SELECT 1 FROM snapshots WHERE repo = ? AND commit_sha = ?", (repo, commit_sha)).fetchone()
+        return row is not None
+
+    def missing_blobs(self, blob_shas: List[str]) -> List[str]:
+        """
+        Returns the blob SHAs that have not been indexed yet. The indexed ones are marked as used, which keeps
+        them from being pruned before the snapshot that references them is saved.
+        """
+        now = time.time()
+        with self._lock, self._connection:
+            indexed = set()
+            for start in range(0, len(blob_shas), 500):
+                chunk = blob_shas[start:start + 500]
+                placeholders = ",".join("?" * len(chunk))
+                indexed.update(row[0] for row in self._connection.execute(f"SELECT blob_sha FROM blobs WHERE blob_sha IN ({placeholders})", chunk))
+                self._connection.execute(f"UPDATE blobs SET last_used_at = ? WHERE blob_sha IN ({placeholders})", (now, *chunk))
+        return [blob_sha for blob_sha in blob_shas if blob_sha not in indexed]
+
+    def index_blob(self, blob_sha: str, ext: str, file_content: str) -> None:
+        """
+        Parses and stores the symbols of one blob; a blob that is already indexed is left alone.
+        """
+        symbols = extract_symbols(file_content, ext)
+        with self._lock, self._connection:
+            if self._connection.execute("SELECT 1 FROM blobs WHERE blob_sha = ?", (blob_sha,)).fetchone():
+                return
+            self._connection.execute(
+                "INSERT INTO blobs (blob_sha, language, last_used_at) VALUES (?, ?, ?)", (blob_sha, canonical_extension(ext), time.time())
+            )
+            self._connection.executemany(
+                "INSERT INTO definitions (blob_sha, name, kind, signature, start_line, end_line) VALUES (?, ?, ?, ?, ?, ?)",
+                [(blob_sha, *definition) for definition in symbols["definitions"]],
+            )
+            self._connection.executemany(
+                "INSERT INTO symbol_references (blob_sha, name, line) VALUES (?, ?, ?)",
+                [(blob_sha, *reference) for reference in symbols["references"]],
+            )
+            self._connection.executemany("INSERT INTO imports (blob_sha, module) VALUES (?, ?)", [(blob_sha, module) for module in symbols["imports"]])
+        increment("symbol_index_blobs_indexed_total", language=canonical_extension(ext))
+
+    def save_snapshot(self, repo: str, commit_sha: str, files: Dict[str, str]) -> None:
+        """
+        Records which blob each path of the commit has, then drops the repository's oldest snapshots beyond
+        `max_snapshots_per_repo` and the blobs no snapshot uses any more (unless they were used within
+        ORPHAN_GRACE_SECONDS).
+        """
+        with self._lock, self._connection:
+            self._connection.execute("DELETE FROM snapshot_files WHERE repo = ? AND commit_sha = ?", (repo, commit_sha))
+            self._connection.executemany(
+                "INSERT INTO snapshot_files (repo, commit_sha, path, blob_sha) VALUES (?, ?, ?, ?)",
+                [(repo, commit_sha, path, blob_sha) for path, blob_sha in files.items()],
+            )
+            self._connection.execute("INSERT OR REPLACE INTO snapshots (repo, commit_sha, created_at) VALUES (?, ?, ?)", (repo, commit_sha, time.time()))
+            expired = self._connection.execute(
+                "SELECT commit_sha FROM snapshots WHERE repo = ? ORDER BY created_at DESC LIMIT -1 OFFSET ?", (repo, self.max_snapshots_per_repo)
+            ).fetchall()
+            for (expired_sha,) in expired:
+                self._connection.execute("DELETE FROM snapshot_files WHERE repo = ? AND commit_sha = ?", (repo, expired_sha))
+                self._connection.execute("DELETE FROM snapshots WHERE repo = ? AND commit_sha = ?", (repo, expired_sha))
+            if expired:
+                orphaned = "SELECT blob_sha FROM blobs WHERE last_used_at < ? AND blob_sha NOT IN (SELECT blob_sha FROM snapshot_files)"
+                cutoff = time.time() - ORPHAN_GRACE_SECONDS
+                for table in ("definitions", "symbol_references", "imports", "blobs"):
+                    self._connection.execute(f"DELETE FROM {table} WHERE blob_sha IN ({orphaned})", (cutoff,))
+
+    def lookup_definitions(self, repo: str, commit_sha: str, names: List[str], exclude_path: Optional[str] = None, limit: int = 20) -> List[Dict[str, Any]]:
+        """
+        Returns the definitions of the given symbol names in the commit, outside `exclude_path`.
+        """
+        if not names:
+            return []
+        with self._lock, timed("symbol_index_lookup_seconds", query="definitions"):
+            rows = self._connection.execute(
+                f"""SELECT d.name, d.kind, d.signature, f.path, d.start_line
+                    FROM definitions d JOIN snapshot_files f ON f.blob_sha = d.blob_sha AND f.repo = ? AND f.commit_sha = ?
+                    WHERE d.name IN ({','.join('?' * len(names))}) AND f.path != ?
+                    ORDER BY d.name, f.path LIMIT ?""",
+                (repo, commit_sha, *names, exclude_path or "", limit),
+            ).fetchall()
+        return [{"name": name, "kind": kind, "signature": signature, "path": path, "line": line} for name, kind, signature, path, line in rows]
+
+    def lookup_references(self, repo: str, commit_sha: str, names: List[str], exclude_path: Optional[str] = None, limit: int = 20) -> List[Dict[str, Any]]:
+        """
+        Returns the call sites of the given symbol names in the commit, outside `exclude_path`.
+        """
+        if not names:
+            return []
+        with self._lock, timed("symbol_index_lookup_seconds", query="references"):
+            rows = self._connection.execute(
+                f"""SELECT r.name, f.path, r.line
+                    FROM symbol_references r JOIN snapshot_files f ON f.blob_sha = r.blob_sha AND f.repo = ? AND f.commit_sha = ?
+                    WHERE r.name IN ({','.join('?' * len(names))}) AND f.path != ?
+                    ORDER BY r.name, f.path, r.line LIMIT ?""",
+                (repo, commit_sha, *names, exclude_path or "", limit),
+            ).fetchall()
+        return [{"name": name, "path": path, "line": line} for name, path, line in rows]
+
+    def symbols_in_ranges(self, repo: str, commit_sha: str, path: str, line_ranges: List[Tuple[int, int]]) -> Tuple[List[str], List[str]]:
+        """
+        Returns (names defined in, names referenced from) the given line ranges of a file in the commit.
+        """
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT blob_sha FROM snapshot_files WHERE repo = ? AND commit_sha = ? AND path = ?", (repo, commit_sha, path)
+            ).fetchone()
+            if row is None:
+                return [], []
+            defined, referenced = {}, {}
+            for start, end in line_ranges:
+                for (name,) in self._connection.execute(
+                    "SELECT name FROM definitions WHERE blob_sha = ? AND start_line <= ? AND end_line >= ? AND kind != 'class'", (row[0], end, start)
+                ):
+                    defined[name] = None
+                for (name,) in self._connection.execute(
+                    "SELECT name FROM symbol_references WHERE blob_sha = ? AND line BETWEEN ? AND ?", (row[0], start, end)
+                ):
+                    referenced[name] = None
+        return list(defined), [name for name in referenced if name not in defined]
+
+
+def index_commit(index: SymbolIndex, repo, repo_name: str, commit_sha: str, max_file_bytes: int = 1048576,
+                 max_files: int = 20000, concurrency: int = 8) -> int:
+    """
+    Indexes a commit of a PyGithub repository. Only blobs that are not indexed yet are fetched and parsed;
+    a snapshot that already exists is reused as is.
+
+    Returns:
+        int: The number of blobs fetched and parsed.
+
+    Raises:
+        RuntimeError: If some blobs could not be fetched or parsed. The others stay indexed, but the snapshot is not
+            saved, so the next call for the commit retries only the failed blobs.
+    """
+    if index.has_snapshot(repo_name, commit_sha):
+        return 0
+    with timed("symbol_index_build_seconds", repo=repo_name):
+        files = list_tree_blobs(repo, commit_sha, get_supported_languages(), max_file_bytes, max_files, repo_name)
+        blob_paths = {}
+        for path, blob_sha in files.items():
+            blob_paths.setdefault(blob_sha, path)
+        missing = index.missing_blobs(list(blob_paths))
+        failed: List[str] = []
+
+        def fetch_and_index(blob_sha: str) -> None:
+            path = blob_paths[blob_sha]
+            try:
+                index.index_blob(blob_sha, os.path.splitext(path)[1], fetch_blob_text(repo, blob_sha, repo_name))
+            except Exception as e:
+                failed.append(path)
+                logger.warning(f"Could not index {repo_name}:{path}: {str(e)}")
+
+        # Fetching blobs from GitHub dominates, so a few requests are kept in flight
+        with ThreadPoolExecutor(max_workers=max(1, concurrency), thread_name_prefix="symbol-index") as executor:
+            list(executor.map(propagate_github_priority(fetch_and_index), missing))
+        if failed:
+            raise RuntimeError(f"{len(failed)} of {len(missing)} file(s) of {repo_name}@{commit_sha} could not be indexed, e.g. {failed[0]}")
+        index.save_snapshot(repo_name, commit_sha, files)
+    logger.info(f"Indexed {repo_name}@{commit_sha}: {len(files)} files, {len(missing)} new blob(s) parsed.")
+    return len(missing)
+
+
+def build_symbol_context(index: SymbolIndex, repo_name: str, commit_sha: str, path: str,
+                         changed_ranges: List[Tuple[int, int]], limit: int = 20) -> str:
+    """
+    Describes the cross-file context of a file's changed lines for the review prompt: the signatures of
+    symbols the changed lines call that are defined in other files, and the call sites in other files of
+    functions defined in the changed lines. Returns an empty string when there is none.
+    """
+    defined, referenced = index.symbols_in_ranges(repo_name, commit_sha, path, changed_ranges)
+    sections = []
+    definitions = index.lookup_definitions(repo_name, commit_sha, referenced, exclude_path=path, limit=limit)
+    if definitions:
+        sections.append("Symbols used by the changed lines and defined in other files:\n" + "\n".join(
+            f"- `{definition['signature']}` ({definition['kind']}, {definition['path']}:{definition['line']})" for definition in definitions
+        ))
+    callers = index.lookup_references(repo_name, commit_sha, defined, exclude_path=path, limit=limit)
+    if callers:
+        sections.append("Call sites in other files of functions changed here:\n" + "\n".join(
+            f"- `{caller['name']}` called at {caller['path']}:{caller['line']}" for caller in callers
+        ))
+    return "\n\n".join(sections)
+
+
+@lru_cache
+def get_symbol_index() -> SymbolIndex:
+    """
+    Caches and returns the process-wide symbol index.
+    """
+    settings = get_settings()
+    return SymbolIndex(settings.SYMBOL_INDEX_PATH, max_snapshots_per_repo=settings.SYMBOL_INDEX_MAX_SNAPSHOTS)
@@ -1,12 +1,16 @@
 import hmac
 import hashlib
 import json
+import re
+import threading
+from collections import OrderedDict
 
 from fastapi import HTTPException, Request, status
 
 from config import get_settings
 import logging
-from typing import Dict, Any
+from typing import Dict, Any, Optional
+from functools import lru_cache
 
 logger = logging.getLogger(__name__)
 
@@ -69,3 +73,86 @@ def get_event_type(request: Request) -> str:
         )
     return event_type
 
+
+
+# GitHub serializes `action` as the first key of event payloads, so it can be read without a full JSON parse.
+_ACTION_PATTERN = re.compile(rb'^\s*\{\s*"action"\s*:\s*"([^"\\]*)"')
+_ACTION_PEEK_BYTES = 256
+
+
+def peek_action(body: bytes) -> Optional[str]:
+    """
+    Cheaply extracts the top-level `action` field from a webhook body without parsing the whole payload.
+    Returns None when the action cannot be determined this way; callers should then fall back to a full parse.
+    """
+    match = _ACTION_PATTERN.match(body[:_ACTION_PEEK_BYTES])
+    if not match:
+        return None
+    return match.group(1).decode("utf-8", errors="replace")
+
+
+class DeliveryDeduplicator:
+    """
+    Remembers recently seen `X-GitHub-Delivery` IDs so redelivered webhooks can be dropped.
+    Uses a bounded in-memory LRU by default, or a Redis set (shared by all workers) when a Redis URL is configured.
+    """
+
+    def __init__(self, max_size: int = 10000, redis_url: Optional[str] = None, ttl_seconds: int = 86400):
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self._seen: "OrderedDict[str, None]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._redis = None
+        if redis_url:
+            import redis  # Only required when Redis-backed deduplication is enabled
+            self._redis = redis.Redis.from_url(redis_url)
+
+    def check_and_mark(self, delivery_id: Optional[str]) -> bool:
+        """
+        Records the delivery ID and returns True if it had already been seen.
+        Requests without a delivery ID are never treated as duplicates.
+        """
+        if not delivery_id:
+            return False
+        if self._redis is not None:
+            try:
+                # SET NX returns None when the key already exists
+                return not self._redis.set(f"webhook:delivery:{delivery_id}", 1, nx=True, ex=self.ttl_seconds)
+            except Exception as e:
+                logger.warning(f"Redis delivery deduplication failed, falling back to in-memory LRU: {str(e)}")
+        with self._lock:
+            if delivery_id in self._seen:
+                self._seen.move_to_end(delivery_id)
+                return True
+            self._seen[delivery_id] = None
+            if len(self._seen) > self.max_size:
+                self._seen.popitem(last=False)
+            return False
+
+    def forget(self, delivery_id: Optional[str]):
+        """
+        Removes a delivery ID, e.g. when processing failed and a redelivery should be accepted.
+        """
+        if not delivery_id:
+            return
+        if self._redis is not None:
+            try:
+                self._redis.delete(f"webhook:delivery:{delivery_id}")
+                return
+            except Exception as e:
+                logger.warning(f"Redis delivery deduplication failed to forget {delivery_id}: {str(e)}")
+        with self._lock:
+            self._seen.pop(delivery_id, None)
+
+
+@lru_cache
+def get_delivery_deduplicator() -> DeliveryDeduplicator:
+    """
+    Caches and returns the process-wide webhook delivery deduplicator.
+    """
+    settings = get_settings()
+    return DeliveryDeduplicator(
+        max_size=settings.WEBHOOK_DEDUPE_SIZE,
+        redis_url=settings.REDIS_URL,
+        ttl_seconds=settings.WEBHOOK_DEDUPE_TTL_SECONDS,
+    )
@@ -1,48 +1,75 @@
-from fastapi import FastAPI, HTTPException
-from fastapi.responses import JSONResponse
-from config import CodeAnalysisRequest, GeminiReviewComment,CodeContextResult,CodeSubmission,get_settings,GeminiReviewResponse, GitHubDataRequest
-from github_access.utils.static_analyzer import perform_static_analysis, StaticAnalysisResult, FunctionSignature, ClassHierarchy
+from fastapi import FastAPI, HTTPException, Header, Request
+from fastapi.responses import JSONResponse, PlainTextResponse, FileResponse, StreamingResponse
+from config import CodeAnalysisRequest, StaticAnalysisBatchRequest, GeminiReviewComment,CodeContextResult,CodeSubmission,MultiFileCodeSubmission,get_settings,GeminiReviewResponse, GitHubDataRequest
+from github_access.utils.static_analyzer import resolve_facets, StaticAnalysisResult, FunctionSignature, ClassHierarchy
 import os
 from github_access.utils.github_fetcher import get_repo_installation, fetch_file_content
-from typing import Dict, Any, List, Optional
-from tree_sitter import Parser
-from tree_sitter_languages import get_language
+from github_access.utils.github_commit import commit_files
+from typing import Dict, Any, AsyncIterator, List, Optional
+from github_access.utils.language_registry import get_supported_languages, get_language_name
+from github_access.utils.clients import get_gemini_model, warm_up_clients
+from github_access.routers.webhook import router as webhook_router
+from github_access.utils.metrics import get_metrics_registry, timed, observe, record_gemini_usage
+from github_access.utils.analysis_cache import cached_static_analysis
+from github_access.utils.batch_analyzer import extract_archive_files, iter_batch_analysis, BatchLimitError
+from github_access.utils.scratch import sweep_stale_scratch_dirs
+from github_access.utils.review_scheduler import get_review_scheduler
+from github_access.utils.json_stream import IncrementalArrayParser
+from github_access.utils.profiling import profile_request, should_profile, new_request_id, list_profiles, get_profile_path
+from pydantic import ValidationError
 import logging
 from datetime import datetime
 import json 
-import google.generativeai as genai 
+import time
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-# Configure Gemini API
-genai.configure(api_key=get_settings().GEMINI_API_KEY)
-
-try:
-    PYTHON_LANGUAGE = get_language("python")
-    GO_LANGUAGE = get_language("go")
-    JAVASCRIPT_LANGUAGE = get_language("javascript")
-    JAVA_LANGUAGE = get_language("java")
-    
-    supported_languages = {
-        ".py": PYTHON_LANGUAGE,
-        ".go": GO_LANGUAGE,
-        ".js": JAVASCRIPT_LANGUAGE,
-        ".java": JAVA_LANGUAGE,
-    }
-    logger.info("Tree-sitter languages loaded successfully in main.py.")
-except Exception as e:
-    logger.error(f"Failed to load Tree-sitter languages in main.py: {str(e)} at {datetime.now().strftime('%I:%M %p IST on %B %d, %Y')}. AST parsing might be limited.", exc_info=True)
-    supported_languages = {} 
-
 app = FastAPI(
     title="Code Analysis API",
     description="An API to analyze code snippets and AI-powered code reviews."
 )
+app.include_router(webhook_router)
+
+
+@app.on_event("startup")
+async def warm_up() -> None:
+    """
+    Removes scratch directories leaked by crashed workers, and optionally creates the GitHub client,
+    Gemini client and grammar registry at startup instead of on the first request (controlled by WARM_CLIENTS_ON_STARTUP).
+    """
+    sweep_stale_scratch_dirs(get_settings().SCRATCH_MAX_AGE_SECONDS)
+    if get_settings().WARM_CLIENTS_ON_STARTUP:
+        warm_up_clients()
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics() -> PlainTextResponse:
+    """
+    Exposes per-stage timing histograms, token usage and pipeline counters in the Prometheus text format.
+    """
+    return PlainTextResponse(get_metrics_registry().render_prometheus(), media_type="text/plain; version=0.0.4")
+
+
+@app.get("/metrics/summary", response_model=Dict[str, List[Dict[str, Any]]])
+async def metrics_summary() -> Dict[str, List[Dict[str, Any]]]:
+    """
+    Returns count, mean and estimated p50/p99 per recorded stage, slowest p99 first,
+    for quick bottleneck checks without a Prometheus server.
+    """
+    return get_metrics_registry().summary()
+
+
+@app.get("/review-queue", response_model=Dict[str, Dict[str, int]])
+async def review_queue() -> Dict[str, Dict[str, int]]:
+    """
+    Returns the queued and running webhook review jobs per repository.
+    """
+    return get_review_scheduler().snapshot()
 
 
 @app.post("/static-analyze-code", response_model=StaticAnalysisResult)
-async def static_analyze_code(request: CodeAnalysisRequest) -> StaticAnalysisResult:
+async def static_analyze_code(request: CodeAnalysisRequest, x_profile: Optional[str] = Header(None), x_request_id: Optional[str] = Header(None)) -> StaticAnalysisResult:
     """
     API endpoint to perform comprehensive static analysis on code content directly.
     Returns AST, complexity metrics (Cyclomatic, Cognitive, Halstead), issues
@@ -53,6 +80,9 @@ async def static_analyze_code(request: CodeAnalysisRequest) -> StaticAnalysisRes
         request (CodeAnalysisRequest): A Pydantic model containing:
             - filename (str): The name of the file (e.g., "my_script.py"). The extension is used to detect language.
             - code_content (str): The actual code as a string.
+            - facets (List[str], optional): Analysis facets to compute (ast, complexity, halstead, linters, context, license).
+        x_profile (str, optional): `X-Profile: 1` profiles this request (when PROFILING_ENABLED).
+        x_request_id (str, optional): `X-Request-ID` used to name the saved profile.
 
     Returns:
         StaticAnalysisResult: A Pydantic model containing detailed analysis results.
@@ -65,17 +95,115 @@ async def static_analyze_code(request: CodeAnalysisRequest) -> StaticAnalysisRes
         ext = os.path.splitext(request.filename)[1].lower()
         
         # Call the comprehensive static analysis function
-        analysis_result = perform_static_analysis(request.code_content, ext)
+        with profile_request("static-analyze-code", new_request_id(x_request_id), should_profile(x_profile)):
+            analysis_result = cached_static_analysis(request.code_content, ext, facets=request.facets)
 
         logger.info(f"Successfully performed comprehensive static analysis for {request.filename} at {current_time}")
         return analysis_result
     except HTTPException as e:
         logger.error(f"HTTP Error analyzing code: {e.detail} at {current_time}", exc_info=True)
         raise # Re-raise HTTPExceptions
+    except ValueError as e:
+        # Unknown analysis facets
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         logger.error(f"Unexpected error analyzing code: {str(e)} at {current_time}", exc_info=True)
         raise HTTPException(status_code=500, detail=f"Error analyzing code: {str(e)}")
 
+async def _read_body_limited(request: Request, max_bytes: int) -> bytes:
+    """
+    Reads the request body, failing with 413 as soon as it exceeds `max_bytes`.
+    Chunked requests carry no Content-Length, so the limit has to be enforced while reading.
+    """
+    body = bytearray()
+    async for chunk in request.stream():
+        body += chunk
+        if len(body) > max_bytes:
+            raise HTTPException(status_code=413, detail=f"Batch exceeds {max_bytes} bytes.")
+    return bytes(body)
+
+@app.post("/static-analyze-batch", response_class=StreamingResponse)
+async def static_analyze_batch(request: Request) -> StreamingResponse:
+    """
+    API endpoint to statically analyze many files in one request.
+    Files are analyzed in parallel (STATIC_BATCH_CONCURRENCY) and streamed back as NDJSON, one line per file
+    in completion order: `{"index", "filename", "status": "ok", "seconds", "result": StaticAnalysisResult}`,
+    `{"status": "error", "error"}` or, for archive members that were not analyzed, `{"status": "skipped", "reason"}`.
+    The stream ends with a `{"status": "done", "files", "failed", "skipped", "seconds"}` line.
+
+    Args:
+        request (Request): Either a JSON body (`{"files": [CodeAnalysisRequest, ...]}` or a bare list),
+            or a multipart upload with a zip/tar(.gz) archive in the `archive` field and optional
+            comma-separated `facets` applied to every archive member.
+
+    Returns:
+        StreamingResponse: The `application/x-ndjson` result stream.
+
+    Raises:
+        HTTPException: If the body is invalid or exceeds STATIC_BATCH_MAX_FILES/STATIC_BATCH_MAX_BYTES.
+    """
+    settings = get_settings()
+    current_time = datetime.now().strftime('%I:%M %p IST on %B %d, %Y')
+    content_length = request.headers.get("content-length")
+    if content_length and content_length.isdigit() and int(content_length) > settings.STATIC_BATCH_MAX_BYTES:
+        raise HTTPException(status_code=413, detail=f"Batch exceeds {settings.STATIC_BATCH_MAX_BYTES} bytes.")
+
+    skipped: List[Dict[str, str]] = []
+    body = await _read_body_limited(request, settings.STATIC_BATCH_MAX_BYTES)
+    try:
+        if request.headers.get("content-type", "").startswith("multipart/form-data"):
+            async def replay_body() -> Dict[str, Any]:
+                return {"type": "http.request", "body": body, "more_body": False}
+            form = await Request(request.scope, replay_body).form()
+            upload = form.get("archive")
+            if upload is None or isinstance(upload, str):
+                raise HTTPException(status_code=400, detail="Multipart batch requests need an 'archive' file field.")
+            archive_bytes = await upload.read(settings.STATIC_BATCH_MAX_BYTES + 1)
+            if len(archive_bytes) > settings.STATIC_BATCH_MAX_BYTES:
+                raise HTTPException(status_code=413, detail=f"Archive exceeds {settings.STATIC_BATCH_MAX_BYTES} bytes.")
+            files, skipped = extract_archive_files(
+                archive_bytes, upload.filename or "",
+                max_files=settings.STATIC_BATCH_MAX_FILES,
+                max_file_bytes=settings.STATIC_BATCH_MAX_FILE_BYTES,
+                max_total_bytes=settings.STATIC_BATCH_MAX_BYTES,
+            )
+            facets_field = form.get("facets")
+            archive_facets = [facet.strip() for facet in facets_field.split(",") if facet.strip()] if isinstance(facets_field, str) and facets_field.strip() else None
+            for file in files:
+                file["facets"] = archive_facets
+        else:
+            payload = json.loads(body)
+            batch = StaticAnalysisBatchRequest.model_validate({"files": payload} if isinstance(payload, list) else payload)
+            if len(batch.files) > settings.STATIC_BATCH_MAX_FILES:
+                raise HTTPException(status_code=413, detail=f"Batch contains more than {settings.STATIC_BATCH_MAX_FILES} files.")
+            # Same limits as archive members: oversized files are skipped, the total is capped
+            files = []
+            total_bytes = 0
+            for file in batch.files:
+                size = len(file.code_content.encode("utf-8"))
+                if size > settings.STATIC_BATCH_MAX_FILE_BYTES:
+                    skipped.append({"filename": file.filename, "reason": f"larger than {settings.STATIC_BATCH_MAX_FILE_BYTES} bytes"})
+                    continue
+                total_bytes += size
+                if total_bytes > settings.STATIC_BATCH_MAX_BYTES:
+                    raise HTTPException(status_code=413, detail=f"Batch source files exceed {settings.STATIC_BATCH_MAX_BYTES} bytes.")
+                files.append(file.model_dump())
+        for file in files:
+            resolve_facets(file["facets"])
+    except HTTPException:
+        raise
+    except BatchLimitError as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    except (ValueError, ValidationError) as e:
+        # Also covers malformed JSON (json.JSONDecodeError) and unknown facets
+        raise HTTPException(status_code=400, detail=f"Invalid batch request: {str(e)}")
+
+    logger.info(f"Starting batch static analysis of {len(files)} files ({len(skipped)} skipped) at {current_time}")
+    return StreamingResponse(
+        iter_batch_analysis(files, skipped, settings.STATIC_BATCH_CONCURRENCY),
+        media_type="application/x-ndjson",
+    )
+
 @app.post("/get-ast", response_model=Dict[str, str])
 async def get_ast(request: CodeAnalysisRequest) -> Dict[str, str]:
     """
@@ -96,15 +224,16 @@ async def get_ast(request: CodeAnalysisRequest) -> Dict[str, str]:
     current_time = datetime.now().strftime('%I:%M %p IST on %B %d, %Y')
     try:
         ext = os.path.splitext(request.filename)[1].lower()
+        supported_languages = get_supported_languages()
         if ext not in supported_languages:
             raise HTTPException(status_code=400, detail=f"Unsupported file extension: {ext}. Supported types: {', '.join(supported_languages.keys())}")
 
-        analysis_result = perform_static_analysis(request.code_content, ext)
+        analysis_result = cached_static_analysis(request.code_content, ext, facets={"ast"})
 
         logger.info(f"Successfully extracted AST for {request.filename} at {current_time}")
         return {
             "filename": request.filename,
-            "language": {".py": "Python", ".go": "Go", ".js": "JavaScript", ".java": "Java"}.get(ext, "Unknown"),
+            "language": get_language_name(ext),
             "ast": analysis_result.ast_sexp
         }
     except HTTPException as e:
@@ -134,15 +263,16 @@ async def get_code_context(request: CodeAnalysisRequest) -> CodeContextResult:
     current_time = datetime.now().strftime('%I:%M %p IST on %B %d, %Y')
     try:
         ext = os.path.splitext(request.filename)[1].lower()
+        supported_languages = get_supported_languages()
         if ext not in supported_languages:
             raise HTTPException(status_code=400, detail=f"Unsupported file extension: {ext}. Supported types: {', '.join(supported_languages.keys())}")
 
-        analysis_result = perform_static_analysis(request.code_content, ext)
+        analysis_result = cached_static_analysis(request.code_content, ext, facets={"context"})
 
         logger.info(f"Successfully extracted code context for {request.filename} at {current_time}")
         return CodeContextResult(
             filename=request.filename,
-            language={".py": "Python", ".go": "Go", ".js": "JavaScript", ".java": "Java"}.get(ext, "Unknown"),
+            language=get_language_name(ext),
             function_signatures=analysis_result.function_signatures,
             class_hierarchies=analysis_result.class_hierarchies,
             module_dependencies=analysis_result.module_dependencies
@@ -154,49 +284,137 @@ async def get_code_context(request: CodeAnalysisRequest) -> CodeContextResult:
         logger.error(f"Unexpected error getting code context: {str(e)} at {current_time}", exc_info=True)
         raise HTTPException(status_code=500, detail=f"Error getting code context: {str(e)}")
 
-@app.post("/get-code-context", response_model=CodeContextResult)
-async def get_code_context(request: CodeAnalysisRequest) -> CodeContextResult:
-    """
-    API endpoint to extract and return structural context information from the provided code.
-    This includes function signatures, class hierarchies, and module dependencies.
+# Structured-output settings of the single-file Gemini review (JSON object with summary and comments).
+GEMINI_REVIEW_GENERATION_CONFIG = {
+    "response_mime_type": "application/json",
+    "response_schema": {
+        "type": "object",
+        "properties": {
+            "pr_summary": {"type": "string"},
+            "comments": {
+                "type": "array",
+                "items": {
+                    "type": "object",
+                    "properties": {
+                        "issue_description": {"type": "string"},
+                        "body": {"type": "string"},
+                        "line": {"type": "string"},
+                        "severity": {"type": "string", "enum": ["Critical", "High", "Medium", "Low"]},
+                        "rationale": {"type": "string"},
+                        "suggested_code_diff": {"type": "string", "nullable": True}
+                    },
+                    "required": ["issue_description", "body", "line", "severity", "rationale"]
+                }
+            },
+            "prioritization_algorithm": {"type": "string", "nullable": True} 
+        },
+        "required": ["pr_summary", "comments", "prioritization_algorithm"] 
+    }
+}
 
-    Args:
-        request (CodeAnalysisRequest): A Pydantic model containing:
-            - filename (str): The name of the file (e.g., "my_script.py"). The extension is used to detect language.
-            - code_content (str): The actual code as a string.
 
-    Returns:
-        CodeContextResult: A Pydantic model containing the extracted code structure.
-    
-    Raises:
-        HTTPException: If the file extension is unsupported or an error occurs during context extraction.
+def _build_gemini_review_prompt(filename: str, code_content: str, language: str, static_analysis_result: StaticAnalysisResult) -> str:
     """
-    current_time = datetime.now().strftime('%I:%M %p IST on %B %d, %Y')
-    try:
-        ext = os.path.splitext(request.filename)[1].lower()
-        if ext not in supported_languages:
-            raise HTTPException(status_code=400, detail=f"Unsupported file extension: {ext}. Supported types: {', '.join(supported_languages.keys())}")
-
-        analysis_result = perform_static_analysis(request.code_content, ext)
-
-        logger.info(f"Successfully extracted code context for {request.filename} at {current_time}")
-        return CodeContextResult(
-            filename=request.filename,
-            language={".py": "Python", ".go": "Go", ".js": "JavaScript", ".java": "Java"}.get(ext, "Unknown"),
-            function_signatures=analysis_result.function_signatures,
-            class_hierarchies=analysis_result.class_hierarchies,
-            module_dependencies=analysis_result.module_dependencies
-        )
-    except HTTPException as e:
-        logger.error(f"HTTP Error getting code context: {e.detail} at {current_time}", exc_info=True)
-        raise
-    except Exception as e:
-        logger.error(f"Unexpected error getting code context: {str(e)} at {current_time}", exc_info=True)
-        raise HTTPException(status_code=500, detail=f"Error getting code context: {str(e)}")
+    Builds the multi-level review prompt shared by /gemini-code-review and /gemini-code-review/stream.
+    """
+    patch_lines = [f"--- /dev/null", f"+++ b/{filename}", f"@@ -0,0 +1,{len(code_content.splitlines())} @@"]
+    patch_lines.extend([f"+{line}" for line in code_content.splitlines()])
+    file_patch = '\n'.join(patch_lines)
+
+    prompt = f"""
+        You are an intelligent code review assistant. Your goal is to provide actionable, constructive, and context-aware feedback on code changes.
+        Analyze the provided code, considering the programming language, and the detailed static analysis results.
+
+        **Programming Language**: {language}
+        **File Name**: {filename}
+
+        **Code Content**:
+        ```{language.lower()}
+        {code_content}
+        ```
+
+        **Code Patch (diff format - showing all lines as new for context)**:
+        ```diff
+        {file_patch}
+        ```
+
+        **Detailed Static Analysis Results**:
+        - **AST (S-expression)**:
+          ```
+          {static_analysis_result.ast_sexp}
+          ```
+        - **Cyclomatic Complexity**: {static_analysis_result.cyclomatic_complexity}
+        - **Cognitive Complexity**: {static_analysis_result.cognitive_complexity}
+        - **Halstead Metrics**: {json.dumps(static_analysis_result.halstead_metrics, indent=2)}
+        - **Issues from Linters/Scanners**:
+        ```json
+        {json.dumps(static_analysis_result.issues, indent=2)}
+        ```
+        - **Function Signatures**:
+        ```json
+        {json.dumps([fs.dict() for fs in static_analysis_result.function_signatures], indent=2)}
+        ```
+        - **Class Hierarchies**:
+        ```json
+        {json.dumps([ch.dict() for ch in static_analysis_result.class_hierarchies], indent=2)}
+        ```
+        - **Module Dependencies**:
+        ```json
+        {json.dumps(static_analysis_result.module_dependencies, indent=2)}
+        ```
+
+        **Review Focus Areas (Multi-level Analysis)**:
+        1.  **Syntax Level**:
+            * Style violations (e.g., inconsistent indentation, trailing whitespace).
+            * Naming conventions (e.g., snake_case for functions, PascalCase for classes).
+            * Formatting issues (e.g., line length, spacing around operators).
+        2.  **Logic Level**:
+            * Edge case handling (e.g., null/empty inputs, division by zero).
+            * Error handling gaps (e.g., missing try-except, inadequate error messages).
+            * Potential bugs or unexpected behavior.
+        3.  **Architecture Level**:
+            * Design pattern violations or opportunities.
+            * Adherence to SOLID principles (Single Responsibility, Open/Closed, Liskov Substitution, Interface Segregation, Dependency Inversion).
+            * Identification of code duplication and suggestions for refactoring.
+            * Modularity and separation of concerns.
+            * Maintainability and extensibility.
+        4.  **Performance Optimization**:
+            * Algorithm efficiency (e.g., time and space complexity).
+            * Database query optimization (e.g., N+1 queries, missing indexes, inefficient joins).
+            * Memory leak detection (e.g., unreleased resources, circular references).
+            * Async/await patterns (e.g., proper use of non-blocking I/O, avoiding blocking calls in async functions).
+        5.  **Security**: Common vulnerabilities (e.g., SQL injection, XSS, insecure deserialization, weak cryptography).
+        6.  **Readability**: Clarity, comments, complexity.
+        7.  **Testability**: Suggestions for improving test coverage or structure.
+        8.  **Type Safety**: Validate type hints/annotations.
+        9.  **Control Flow**: Analyze potential issues in the flow of execution, infinite loops, unreachable code.
+        10. **Data Flow**: Identify potential issues with data propagation, uninitialized variables, data leaks.
+
+        **Output Format**:
+        Provide a JSON object with three top-level keys: `pr_summary`, `comments`, and `prioritization_algorithm`.
+
+        -   `pr_summary`: (string) A concise, overall summary of the code review for the entire file/pull request. Highlight key strengths, major findings across syntax, logic, architecture, and performance, and overall maintainability/quality.
+        -   `comments`: (array of objects) A JSON array of individual review comments. Each object in this array MUST have the following properties:
+            -   `issue_description`: (string) A concise, one-sentence description of the issue.
+            -   `body`: (string) The detailed review comment. Begin the comment with the analysis level (e.g., "Syntax: ...", "Logic: ...", "Architecture: ...", "Performance: ...") to explicitly categorize it. Include code suggestions if applicable (use markdown code blocks for suggestions).
+            -   `line`: (string) The exact line of code (from the `code_content` provided) that the comment applies to. This line MUST be present in the provided `code_content`. If the comment is a file-level observation (not tied to a specific line), set `line` to "File-level".
+            -   `severity`: (string) The severity level of the issue. Choose one of: "Critical", "High", "Medium", "Low".
+            -   `rationale`: (string) A concise explanation of *why* this change is suggested and its impact.
+            -   `suggested_code_diff`: (string, optional) A code suggestion in unified diff format (e.g., `--- a/file.py\n+++ b/file.py\n@@ -L1,C1 +L2,C2 @@\n-old code\n+new code`). Only include if a specific code change is recommended.
+        -   `prioritization_algorithm`: (string) Describe the algorithm or criteria used to prioritize the generated comments (e.g., "Comments are prioritized by severity (Critical > High > Medium > Low), then by impact on functionality or security.").
+
+        **Constraints**:
+        -   Ensure the `line` property refers to an *actual line* from the `code_content` or is "File-level".
+        -   Keep comments concise but informative.
+        -   Prioritize critical and high-severity issues.
+        -   If no significant issues are found, the `comments` array can be empty `[]`, but the `pr_summary` and `prioritization_algorithm` should still provide an overall assessment.
+        -   Do not include any conversational text outside the JSON object.
+        """
+    return prompt
 
 
 @app.post("/gemini-code-review", response_model=GeminiReviewResponse) # Changed response_model
-async def gemini_code_review(request: CodeAnalysisRequest) -> GeminiReviewResponse:
+async def gemini_code_review(request: CodeAnalysisRequest, x_profile: Optional[str] = Header(None), x_request_id: Optional[str] = Header(None)) -> GeminiReviewResponse:
     """
     API endpoint to perform a multi-level code review using Google Gemini.
     This includes analysis at the syntax, logic, and architecture levels,
@@ -206,6 +424,8 @@ async def gemini_code_review(request: CodeAnalysisRequest) -> GeminiReviewRespon
         request (CodeAnalysisRequest): A Pydantic model containing:
             - filename (str): The name of the file (e.g., "my_script.py"). The extension is used to detect language.
             - code_content (str): The actual code as a string.
+        x_profile (str, optional): `X-Profile: 1` profiles this request (when PROFILING_ENABLED).
+        x_request_id (str, optional): `X-Request-ID` used to name the saved profile.
 
     Returns:
         GeminiReviewResponse: A Pydantic model containing a PR-level summary and a list of AI-generated review comments.
@@ -216,142 +436,34 @@ async def gemini_code_review(request: CodeAnalysisRequest) -> GeminiReviewRespon
     current_time = datetime.now().strftime('%I:%M %p IST on %B %d, %Y')
     try:
         ext = os.path.splitext(request.filename)[1].lower()
-        language = {'.py': 'Python', '.go': 'Go', '.js': 'JavaScript', '.java': 'Java', '.ts': 'TypeScript'}.get(ext, 'Unknown')
+        language = get_language_name(ext)
 
+        supported_languages = get_supported_languages()
         if ext not in supported_languages:
             raise HTTPException(status_code=400, detail=f"Unsupported file extension for Gemini review: {ext}. Supported types: {', '.join(supported_languages.keys())}")
 
-        static_analysis_result = perform_static_analysis(request.code_content, ext)
-
-        patch_lines = [f"--- /dev/null", f"+++ b/{request.filename}", f"@@ -0,0 +1,{len(request.code_content.splitlines())} @@"]
-        patch_lines.extend([f"+{line}" for line in request.code_content.splitlines()])
-        file_patch = '\n'.join(patch_lines)
-
-        prompt = f"""
-            You are an intelligent code review assistant. Your goal is to provide actionable, constructive, and context-aware feedback on code changes.
-            Analyze the provided code, considering the programming language, and the detailed static analysis results.
-
-            **Programming Language**: {language}
-            **File Name**: {request.filename}
-
-            **Code Content**:
-            ```{language.lower()}
-            {request.code_content}
-            ```
-
-            **Code Patch (diff format - showing all lines as new for context)**:
-            ```diff
-            {file_patch}
-            ```
-
-            **Detailed Static Analysis Results**:
-            - **AST (S-expression)**:
-              ```
-              {static_analysis_result.ast_sexp}
-              ```
-            - **Cyclomatic Complexity**: {static_analysis_result.cyclomatic_complexity}
-            - **Cognitive Complexity**: {static_analysis_result.cognitive_complexity}
-            - **Halstead Metrics**: {json.dumps(static_analysis_result.halstead_metrics, indent=2)}
-            - **Issues from Linters/Scanners**:
-            ```json
-            {json.dumps(static_analysis_result.issues, indent=2)}
-            ```
-            - **Function Signatures**:
-            ```json
-            {json.dumps([fs.dict() for fs in static_analysis_result.function_signatures], indent=2)}
-            ```
-            - **Class Hierarchies**:
-            ```json
-            {json.dumps([ch.dict() for ch in static_analysis_result.class_hierarchies], indent=2)}
-            ```
-            - **Module Dependencies**:
-            ```json
-            {json.dumps(static_analysis_result.module_dependencies, indent=2)}
-            ```
-
-            **Review Focus Areas (Multi-level Analysis)**:
-            1.  **Syntax Level**:
-                * Style violations (e.g., inconsistent indentation, trailing whitespace).
-                * Naming conventions (e.g., snake_case for functions, PascalCase for classes).
-                * Formatting issues (e.g., line length, spacing around operators).
-            2.  **Logic Level**:
-                * Edge case handling (e.g., null/empty inputs, division by zero).
-                * Error handling gaps (e.g., missing try-except, inadequate error messages).
-                * Potential bugs or unexpected behavior.
-            3.  **Architecture Level**:
-                * Design pattern violations or opportunities.
-                * Adherence to SOLID principles (Single Responsibility, Open/Closed, Liskov Substitution, Interface Segregation, Dependency Inversion).
-                * Identification of code duplication and suggestions for refactoring.
-                * Modularity and separation of concerns.
-                * Maintainability and extensibility.
-            4.  **Performance Optimization**:
-                * Algorithm efficiency (e.g., time and space complexity).
-                * Database query optimization (e.g., N+1 queries, missing indexes, inefficient joins).
-                * Memory leak detection (e.g., unreleased resources, circular references).
-                * Async/await patterns (e.g., proper use of non-blocking I/O, avoiding blocking calls in async functions).
-            5.  **Security**: Common vulnerabilities (e.g., SQL injection, XSS, insecure deserialization, weak cryptography).
-            6.  **Readability**: Clarity, comments, complexity.
-            7.  **Testability**: Suggestions for improving test coverage or structure.
-            8.  **Type Safety**: Validate type hints/annotations.
-            9.  **Control Flow**: Analyze potential issues in the flow of execution, infinite loops, unreachable code.
-            10. **Data Flow**: Identify potential issues with data propagation, uninitialized variables, data leaks.
-
-            **Output Format**:
-            Provide a JSON object with three top-level keys: `pr_summary`, `comments`, and `prioritization_algorithm`.
-
-            -   `pr_summary`: (string) A concise, overall summary of the code review for the entire file/pull request. Highlight key strengths, major findings across syntax, logic, architecture, and performance, and overall maintainability/quality.
-            -   `comments`: (array of objects) A JSON array of individual review comments. Each object in this array MUST have the following properties:
-                -   `issue_description`: (string) A concise, one-sentence description of the issue.
-                -   `body`: (string) The detailed review comment. Begin the comment with the analysis level (e.g., "Syntax: ...", "Logic: ...", "Architecture: ...", "Performance: ...") to explicitly categorize it. Include code suggestions if applicable (use markdown code blocks for suggestions).
-                -   `line`: (string) The exact line of code (from the `code_content` provided) that the comment applies to. This line MUST be present in the provided `code_content`. If the comment is a file-level observation (not tied to a specific line), set `line` to "File-level".
-                -   `severity`: (string) The severity level of the issue. Choose one of: "Critical", "High", "Medium", "Low".
-                -   `rationale`: (string) A concise explanation of *why* this change is suggested and its impact.
-                -   `suggested_code_diff`: (string, optional) A code suggestion in unified diff format (e.g., `--- a/file.py\n+++ b/file.py\n@@ -L1,C1 +L2,C2 @@\n-old code\n+new code`). Only include if a specific code change is recommended.
-            -   `prioritization_algorithm`: (string) Describe the algorithm or criteria used to prioritize the generated comments (e.g., "Comments are prioritized by severity (Critical > High > Medium > Low), then by impact on functionality or security.").
-
-            **Constraints**:
-            -   Ensure the `line` property refers to an *actual line* from the `code_content` or is "File-level".
-            -   Keep comments concise but informative.
-            -   Prioritize critical and high-severity issues.
-            -   If no significant issues are found, the `comments` array can be empty `[]`, but the `pr_summary` and `prioritization_algorithm` should still provide an overall assessment.
-            -   Do not include any conversational text outside the JSON object.
-            """
-
-        model = genai.GenerativeModel('gemini-1.5-flash')
-        response = await model.generate_content_async(
-            contents=[{"role": "user", "parts": [{"text": prompt}]}],
-            generation_config={
-                "response_mime_type": "application/json",
-                "response_schema": {
-                    "type": "object",
-                    "properties": {
-                        "pr_summary": {"type": "string"},
-                        "comments": {
-                            "type": "array",
-                            "items": {
-                                "type": "object",
-                                "properties": {
-                                    "issue_description": {"type": "string"},
-                                    "body": {"type": "string"},
-                                    "line": {"type": "string"},
-                                    "severity": {"type": "string", "enum": ["Critical", "High", "Medium", "Low"]},
-                                    "rationale": {"type": "string"},
-                                    "suggested_code_diff": {"type": "string", "nullable": True}
-                                },
-                                "required": ["issue_description", "body", "line", "severity", "rationale"]
-                            }
-                        },
-                        "prioritization_algorithm": {"type": "string", "nullable": True} 
-                    },
-                    "required": ["pr_summary", "comments", "prioritization_algorithm"] 
-                }
-            }
-        )
-        
+        # Only the synchronous analysis and prompt building are profiled: a profiler left running across the `await`
+        # would also record every other coroutine the event loop runs meanwhile, including other profiled requests
+        with profile_request("gemini-code-review", new_request_id(x_request_id), should_profile(x_profile)):
+            static_analysis_result = cached_static_analysis(request.code_content, ext)
+
+            prompt_start = time.perf_counter()
+            prompt = _build_gemini_review_prompt(request.filename, request.code_content, language, static_analysis_result)
+            observe("prompt_build_seconds", time.perf_counter() - prompt_start, language=language)
+
+        model_name = get_settings().REVIEW_MODEL
+        # Direct API requests have no repository; the label is kept so every series has the same label set
+        with timed("gemini_request_seconds", model=model_name, repo=""):
+            response = await get_gemini_model(model_name).generate_content_async(
+                contents=[{"role": "user", "parts": [{"text": prompt}]}],
+                generation_config=GEMINI_REVIEW_GENERATION_CONFIG,
+            )
+        record_gemini_usage(response, model_name, repo="")
+    
         raw_response = json.loads(response.candidates[0].content.parts[0].text)
-        
+    
         parsed_comments = [GeminiReviewComment(**comment) for comment in raw_response.get("comments", [])]
-        
+    
         return GeminiReviewResponse(
             pr_summary=raw_response.get("pr_summary", "No summary provided."),
             comments=parsed_comments,
@@ -365,8 +477,82 @@ async def gemini_code_review(request: CodeAnalysisRequest) -> GeminiReviewRespon
         raise HTTPException(status_code=500, detail=f"Error performing Gemini code review: {str(e)}")
 
 
+def _sse_event(event: str, data: Dict[str, Any]) -> str:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+async def _stream_gemini_review(prompt: str, language: str) -> AsyncIterator[str]:
+    """
+    Streams the Gemini review as server-sent events: one `comment` event per review comment as soon as the
+    model has finished writing it, then a `summary` event, or an `error` event if generation fails midway.
+    """
+    request_start = time.perf_counter()
+    parser = IncrementalArrayParser("comments")
+    comment_count = 0
+    model_name = get_settings().REVIEW_MODEL
+    try:
+        response = await get_gemini_model(model_name).generate_content_async(
+            contents=[{"role": "user", "parts": [{"text": prompt}]}],
+            generation_config=GEMINI_REVIEW_GENERATION_CONFIG,
+            stream=True,
+        )
+        async for chunk in response:
+            for comment in parser.feed(chunk.text):
+                if comment_count == 0:
+                    observe("gemini_first_comment_seconds", time.perf_counter() - request_start, language=language)
+                comment_count += 1
+                yield _sse_event("comment", GeminiReviewComment(**comment).model_dump())
+        observe("gemini_request_seconds", time.perf_counter() - request_start, model=model_name, repo="")
+        record_gemini_usage(response, model_name, repo="")
+
+        raw_response = parser.result()
+        yield _sse_event("summary", {
+            "pr_summary": raw_response.get("pr_summary", "No summary provided."),
+            "prioritization_algorithm": raw_response.get("prioritization_algorithm"),
+            "comment_count": comment_count,
+        })
+    except Exception as e:
+        # Headers are already sent, so failures are reported in-band
+        logger.error(f"Error while streaming Gemini code review: {str(e)}", exc_info=True)
+        yield _sse_event("error", {"detail": f"Error performing Gemini code review: {str(e)}", "comment_count": comment_count})
+
+
+@app.post("/gemini-code-review/stream")
+async def gemini_code_review_stream(request: CodeAnalysisRequest, x_profile: Optional[str] = Header(None), x_request_id: Optional[str] = Header(None)) -> StreamingResponse:
+    """
+    Streaming variant of /gemini-code-review. Returns `text/event-stream` with one `comment` event per
+    GeminiReviewComment, sent as soon as the model has finished generating that comment, followed by a
+    `summary` event with `pr_summary`, `prioritization_algorithm` and `comment_count`. A failure after the
+    stream has started is sent as an `error` event.
+
+    Raises:
+        HTTPException: If the file extension is unsupported or the static analysis fails (before streaming starts).
+    """
+    current_time = datetime.now().strftime('%I:%M %p IST on %B %d, %Y')
+    ext = os.path.splitext(request.filename)[1].lower()
+    supported_languages = get_supported_languages()
+    if ext not in supported_languages:
+        raise HTTPException(status_code=400, detail=f"Unsupported file extension for Gemini review: {ext}. Supported types: {', '.join(supported_languages.keys())}")
+    language = get_language_name(ext)
+    try:
+        # Only the analysis and prompt are profiled; the model call runs after the response has started
+        with profile_request("gemini-code-review-stream", new_request_id(x_request_id), should_profile(x_profile)):
+            static_analysis_result = cached_static_analysis(request.code_content, ext)
+            prompt_start = time.perf_counter()
+            prompt = _build_gemini_review_prompt(request.filename, request.code_content, language, static_analysis_result)
+            observe("prompt_build_seconds", time.perf_counter() - prompt_start, language=language)
+    except Exception as e:
+        logger.error(f"Unexpected error preparing streamed Gemini code review: {str(e)} at {current_time}", exc_info=True)
+        raise HTTPException(status_code=500, detail=f"Error performing Gemini code review: {str(e)}")
+    return StreamingResponse(
+        _stream_gemini_review(prompt, language),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
 @app.post("/submit-github-file", response_model=Dict[str, Any])
-async def submit_github_file(request: CodeSubmission) -> Dict[str, Any]:
+def submit_github_file(request: CodeSubmission) -> Dict[str, Any]:
     """
     API endpoint to submit and commit a file to a specified GitHub repository and branch.
 
@@ -387,39 +573,98 @@ async def submit_github_file(request: CodeSubmission) -> Dict[str, Any]:
     current_time = datetime.now().strftime('%I:%M %p IST on %B %d, %Y')
     try:
         github_instance = get_repo_installation(request.repo_full_name)
-        repo = github_instance.get_repo(request.repo_full_name)
-
-        ref = repo.get_git_ref(f"heads/{request.branch}")
-        
-        commit_sha = ref.object.sha
-        commit = repo.get_git_commit(commit_sha)
-        
-        blob = repo.create_git_blob(request.file_content, "utf-8")
-        base_tree = repo.get_git_tree(commit.tree.sha)
-        tree = repo.create_git_tree([
-            {
-                "path": request.filename,
-                "mode": "100644", # File mode (blob)
-                "type": "blob",
-                "sha": blob.sha
-            }
-        ], base_tree=base_tree)
-        
-        new_commit = repo.create_git_commit(
-            message=request.commit_message,
-            tree=tree,
-            parents=[commit]
-        )
-        
-        ref.edit(new_commit.sha)
+        repo = github_instance.get_repo(request.repo_full_name, lazy=True)
+        settings = get_settings()
+        result = commit_files(repo, request.repo_full_name, request.branch, {request.filename: request.file_content}, request.commit_message,
+                              max_attempts=settings.COMMIT_MAX_ATTEMPTS)
 
         logger.info(f"Successfully committed file {request.filename} to {request.repo_full_name}/{request.branch} at {current_time}")
-        return {"status": "success", "message": f"File '{request.filename}' committed successfully to '{request.repo_full_name}/{request.branch}'.", "commit_sha": new_commit.sha}
+        return {"status": "success", "message": f"File '{request.filename}' committed successfully to '{request.repo_full_name}/{request.branch}'.", "commit_sha": result.commit_sha}
 
     except HTTPException as e:
         logger.error(f"HTTP Error submitting file to GitHub: {e.detail} at {current_time}", exc_info=True)
         raise 
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         logger.error(f"Unexpected error submitting file to GitHub: {str(e)} at {current_time}", exc_info=True)
         raise HTTPException(status_code=500, detail=f"Error submitting file to GitHub: {str(e)}")
 
+
+@app.post("/submit-github-files", response_model=Dict[str, Any])
+def submit_github_files(request: MultiFileCodeSubmission) -> Dict[str, Any]:
+    """
+    API endpoint to commit many files to a GitHub repository branch as a single commit.
+    Files whose content is already on the branch are skipped; if none changed, no commit is made.
+    A plain `def`: the commit blocks on GitHub requests and retry backoff, so FastAPI runs it in its thread pool.
+
+    Args:
+        request (MultiFileCodeSubmission): A Pydantic model containing:
+            - repo_full_name (str): The full name of the repository (e.g., "owner/repo").
+            - files (List[SubmittedFile]): The files to commit, each with `filename` and `file_content`.
+            - commit_message (str): The commit message.
+            - branch (str): The target branch (default: "main").
+
+    Returns:
+        Dict[str, Any]: The commit SHA and the changed and unchanged files.
+
+    Raises:
+        HTTPException: 400 for an empty or invalid file list, 500 if the commit fails.
+    """
+    current_time = datetime.now().strftime('%I:%M %p IST on %B %d, %Y')
+    if not request.files:
+        raise HTTPException(status_code=400, detail="No files to commit.")
+    try:
+        github_instance = get_repo_installation(request.repo_full_name)
+        repo = github_instance.get_repo(request.repo_full_name, lazy=True)
+        settings = get_settings()
+        files = {}
+        for submitted in request.files:
+            if submitted.filename in files:
+                raise ValueError(f"File path given more than once: {submitted.filename!r}")
+            files[submitted.filename] = submitted.file_content
+        result = commit_files(repo, request.repo_full_name, request.branch, files, request.commit_message,
+                              concurrency=settings.COMMIT_BLOB_CONCURRENCY, max_attempts=settings.COMMIT_MAX_ATTEMPTS)
+
+        logger.info(f"Committed {len(result.changed_files)} of {len(files)} files to {request.repo_full_name}/{request.branch} at {current_time}")
+        message = (f"{len(result.changed_files)} file(s) committed to '{request.repo_full_name}/{request.branch}'." if result.changed_files
+                   else f"All files are already up to date on '{request.repo_full_name}/{request.branch}'; nothing committed.")
+        return {"status": "success", "message": message, **result.model_dump()}
+
+    except HTTPException as e:
+        logger.error(f"HTTP Error submitting files to GitHub: {e.detail} at {current_time}", exc_info=True)
+        raise
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        logger.error(f"Unexpected error submitting files to GitHub: {str(e)} at {current_time}", exc_info=True)
+        raise HTTPException(status_code=500, detail=f"Error submitting files to GitHub: {str(e)}")
+
+
+@app.get("/debug/profiles", response_model=List[Dict[str, Any]])
+async def debug_list_profiles() -> List[Dict[str, Any]]:
+    """
+    Lists saved request profiles (newest first) with their duration and subprocess timings.
+
+    Raises:
+        HTTPException: If profiling is disabled.
+    """
+    if not get_settings().PROFILING_ENABLED:
+        raise HTTPException(status_code=404, detail="Profiling is disabled.")
+    return list_profiles()
+
+
+@app.get("/debug/profiles/{request_id}")
+async def debug_download_profile(request_id: str) -> FileResponse:
+    """
+    Downloads a saved profile in pstats format (open with `python -m pstats` or snakeviz).
+
+    Raises:
+        HTTPException: If profiling is disabled or no profile exists for the request ID.
+    """
+    if not get_settings().PROFILING_ENABLED:
+        raise HTTPException(status_code=404, detail="Profiling is disabled.")
+    profile_path = get_profile_path(request_id)
+    if profile_path is None:
+        raise HTTPException(status_code=404, detail=f"No profile found for request ID '{request_id}'.")
+    return FileResponse(profile_path, media_type="application/octet-stream", filename=f"{request_id}.prof")
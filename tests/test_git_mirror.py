@@ -0,0 +1,84 @@
+import os
+import subprocess
+
+import pytest
+
+from github_access.utils.git_mirror import GitMirrorCache
+
+REPO = "fixture/repo"
+
+
+def git(cwd, *args):
+    env = dict(os.environ, GIT_AUTHOR_NAME="t", GIT_AUTHOR_EMAIL="t@example.com", GIT_COMMITTER_NAME="t",
+               GIT_COMMITTER_EMAIL="t@example.com", GIT_CONFIG_GLOBAL=os.devnull, GIT_CONFIG_NOSYSTEM="1")
+    return subprocess.run(["git", *args], cwd=cwd, env=env, check=True, capture_output=True).stdout.decode().strip()
+
+
+def write(directory, path, content):
+    with open(os.path.join(directory, path), "wb") as f:
+        f.write(content if isinstance(content, bytes) else content.encode("utf-8"))
+
+
+@pytest.fixture
+def fixture_repo(tmp_path):
+    """
+    A local repository with a base commit and a head commit that edits, renames, binary-edits, type-changes
+    (file to symlink) and adds a submodule.
+    """
+    work = tmp_path / "remote" / "fixture" / "repo"
+    work.mkdir(parents=True)
+    git(work, "init", "--quiet", "-b", "main")
+    write(work, "a.py", "def f():\n    return 1\n")
+    write(work, "big.py", "".join(f"line_{i} = {i}\n" for i in range(50)))
+    write(work, "t.py", "x = 1\n")
+    write(work, "image.bin", b"\x00\x01\x02" * 100)
+    git(work, "add", "-A")
+    git(work, "commit", "--quiet", "-m", "base")
+    base = git(work, "rev-parse", "HEAD")
+
+    write(work, "a.py", "def f():\n    return 2\n")
+    git(work, "mv", "big.py", "moved.py")
+    os.remove(work / "t.py")
+    os.symlink("a.py", work / "t.py")
+    write(work, "image.bin", b"\x00\x03\x02" * 100)
+    git(work, "update-index", "--add", "--cacheinfo", f"160000,{base},vendor/lib")
+    git(work, "add", "-A")
+    git(work, "commit", "--quiet", "-m", "head")
+    head = git(work, "rev-parse", "HEAD")
+
+    mirror = GitMirrorCache(str(tmp_path / "mirrors"), max_bytes=1 << 30, remote_url_template=f"file://{tmp_path}/remote/{{repo}}")
+    mirror.sync(REPO, ["+refs/heads/main:refs/heads/main"])
+    return mirror, base, head
+
+
+def test_diff_covers_renames_binaries_type_changes_and_submodules(fixture_repo):
+    mirror, base, head = fixture_repo
+    files = {file.filename: file for file in mirror.diff(REPO, base, head)}
+
+    assert set(files) == {"a.py", "moved.py", "t.py", "image.bin"}
+
+    assert files["a.py"].status == "modified"
+    assert files["a.py"].patch.startswith("@@")
+    assert (files["a.py"].additions, files["a.py"].deletions) == (1, 1)
+    assert files["a.py"].decoded_content == b"def f():\n    return 2\n"
+
+    assert files["moved.py"].status == "renamed"
+    assert files["moved.py"].previous_filename == "big.py"
+    assert files["moved.py"].patch is None
+
+    assert files["t.py"].status == "changed"
+    assert files["t.py"].patch == "@@ -0,0 +1 @@\n+a.py\n\\ No newline at end of file"
+    assert (files["t.py"].additions, files["t.py"].deletions) == (1, 1)
+
+    assert files["image.bin"].status == "modified"
+    assert files["image.bin"].patch is None
+    assert files["image.bin"].decoded_content == b"\x00\x03\x02" * 100
+
+
+def test_diff_without_merge_base_and_file_reads(fixture_repo):
+    mirror, base, head = fixture_repo
+    assert mirror.has_commit(REPO, head)
+    assert mirror.commit_parent(REPO, head) == base
+    assert [file.filename for file in mirror.diff(REPO, head, base, merge_base=False) if file.status == "renamed"] == ["big.py"]
+    assert mirror.read_text(REPO, base, "t.py") == "x = 1\n"
+    assert mirror.read_text(REPO, head, "missing.py") is None